@@ -0,0 +1,297 @@
+"""Flet アプリを画面なしで動かして計測する仕組み
+
+本物の ft.Page と部品をそのまま使い、クライアント（Flutter）との通信だけを
+RecordingConnection に差し替える。ページが送ろうとした命令はここで数えて捨てる。
+
+AppDriver はイベントループとスレッドプールを持ち、
+    driver.start(main)                   # main(page) を呼ぶ
+    driver.click(button)                 # クリックなどのイベントを送る
+のように操作すると、操作ごとに
+    latency   イベントを送ってから、それが起こした処理（run_task / run_thread）が全部終わるまでの時間
+    commands  クライアントに送った命令の数、bytes はその JSON の大きさ
+    controls  ページ上の部品の数
+    peak      その操作の間に確保されたメモリの最大値（tracemalloc）
+を記録する。
+"""
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import flet as ft
+from flet.core.event import Event
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import CommandEncoder, PageCommandResponsePayload, PageCommandsBatchResponsePayload
+
+
+# --- 📡 通信の記録 ---
+
+class RecordingConnection(LocalConnection):
+    """ページが送る命令を数えるだけの接続（部品の id は本物と同じ手順で振る）"""
+
+    def __init__(self):
+        super().__init__()
+        self.commands = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def _process_get_command(self, values):
+        return "", None  # ページの大きさなどの問い合わせには空で答える
+
+    def _record(self, messages):
+        size = len(json.dumps(messages, cls=CommandEncoder, separators=(",", ":"))) if messages else 0
+        with self._lock:
+            self.commands += len(messages)
+            self.bytes += size
+
+    def send_command(self, session_id, command):
+        result, message = self._process_command(command)
+        self._record([message] if message else [])
+        return PageCommandResponsePayload(result=result or "", error="")
+
+    def send_commands(self, session_id, commands):
+        results = []
+        messages = []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        self._record(messages)
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+# --- 🚗 アプリの操作 ---
+
+class Interaction:
+    """1回の操作の計測結果"""
+    __slots__ = ("name", "latency", "commands", "bytes", "controls", "peak", "errors")
+
+    def __init__(self, name, latency, commands, bytes_, controls, peak, errors):
+        self.name = name
+        self.latency = latency
+        self.commands = commands
+        self.bytes = bytes_
+        self.controls = controls
+        self.peak = peak
+        self.errors = errors
+
+
+class AppDriver:
+    """ft.Page を1つ作り、イベントを送って計測する"""
+
+    def __init__(self, max_workers=8, trace_memory=True):
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.conn = RecordingConnection()
+        self.page = ft.Page(self.conn, "bench", self.loop, self.executor)
+        self.trace_memory = trace_memory
+        self.interactions = []
+
+        # ページが始めた処理を覚えておき、操作ごとに終わるまで待つ
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._errors = []
+        run_task = self.page.run_task
+
+        def tracked_run_task(handler, *args, **kwargs):
+            return self._track(run_task(handler, *args, **kwargs))
+
+        def tracked_run_thread(handler, *args, **kwargs):
+            self._track(self.executor.submit(handler, *args, **kwargs))
+
+        self.page.run_task = tracked_run_task
+        self.page.run_thread = tracked_run_thread
+
+    def _track(self, future):
+        with self._pending_lock:
+            self._pending.add(future)
+        return future
+
+    def _wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._pending_lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            for future in pending:
+                try:
+                    future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except CancelledError:
+                    pass  # 新しい操作で取り消された読み込みなど
+                except TimeoutError:
+                    raise
+                except Exception as ex:
+                    self._errors.append(ex)
+                with self._pending_lock:
+                    self._pending.discard(future)
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """with の中の処理（と、それが起こした処理）を1回の操作として計測する"""
+        commands, bytes_ = self.conn.commands, self.conn.bytes
+        self._errors = []
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        latency = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - base if self.trace_memory else 0
+        self.interactions.append(Interaction(
+            name, latency, self.conn.commands - commands, self.conn.bytes - bytes_,
+            len(self.page.index), peak, list(self._errors),
+        ))
+
+    def _dispatch(self, control, event, data):
+        coro = self.page.on_event_async(Event(control.uid, event, data))
+        asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def start(self, main, name="open", timeout=30):
+        """main(page) を呼ぶ（本物と同じく、同期の main はスレッドで動かす）"""
+        with self.measure(name):
+            if asyncio.iscoroutinefunction(main):
+                self._track(asyncio.run_coroutine_threadsafe(main(self.page), self.loop))
+            else:
+                self._track(self.executor.submit(main, self.page))
+            self._wait_idle(timeout)
+
+    def fire(self, control, event, data="", name=None, timeout=30):
+        """control にイベントを送り、処理が全部終わるまで待つ"""
+        with self.measure(name or event):
+            self._dispatch(control, event, data)
+            self._wait_idle(timeout)
+
+    def click(self, control, name=None):
+        self.fire(control, "click", name=name or "click")
+
+    def type_text(self, field, text, name="type", submit=False):
+        """1文字ずつ入力する（入力のたびに change を送る）。最後に submit も送れる
+
+        1文字ごとの処理の終わりは待たない（入力中の検索のキャンセルも含めて計測するため）。
+        """
+        with self.measure(name):
+            for i in range(1 if text else 0, len(text) + 1):
+                field.value = text[:i]
+                self._dispatch(field, "change", text[:i])
+            if submit:
+                self._dispatch(field, "submit", text)
+            self._wait_idle(30)
+
+    def scroll(self, column, pixels, max_extent, name="scroll"):
+        data = json.dumps({"t": "update", "p": pixels, "minse": 0, "maxse": max_extent, "vd": 500})
+        self.fire(column, "onScroll", data, name=name)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join(timeout=5)
+
+
+# --- 🔎 部品を探す ---
+
+def walk(control):
+    """control とその子孫を順にたどる"""
+    yield control
+    for child in control._get_children():
+        yield from walk(child)
+
+
+def find_all(page, cls, **attrs):
+    """cls のうち、属性が attrs と一致する部品"""
+    return [c for c in walk(page) if isinstance(c, cls) and all(getattr(c, k, None) == v for k, v in attrs.items())]
+
+
+def find(page, cls, **attrs):
+    found = find_all(page, cls, **attrs)
+    if not found:
+        raise LookupError(f"{cls.__name__} {attrs} が見つかりません")
+    return found[0]
+
+
+# --- 📦 アプリの読み込み ---
+
+@contextlib.contextmanager
+def working_dir(path):
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def load_app(path, module_name):
+    """アプリのファイルを module_name として読み込む
+
+    アプリのフォルダを sys.path の先頭に入れる（同じフォルダのモジュールを import できるように）。
+    ファイルの最後で ft.app(main) をそのまま呼んでいるアプリもあるので、読み込みの間だけ ft.app を止める。
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    app = ft.app
+    ft.app = lambda *args, **kwargs: None
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        ft.app = app
+    sys.modules[module_name] = module
+    return module
+
+
+# --- 📋 集計 ---
+
+def percentile(values, p):
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def summarize(interactions):
+    """操作名ごとに {name: {...}} へまとめる（出てきた順）"""
+    groups = {}
+    for it in interactions:
+        groups.setdefault(it.name, []).append(it)
+    summary = {}
+    for name, items in groups.items():
+        latencies = [it.latency for it in items]
+        summary[name] = {
+            "n": len(items),
+            "p50_ms": percentile(latencies, 50) * 1e3,
+            "p90_ms": percentile(latencies, 90) * 1e3,
+            "p99_ms": percentile(latencies, 99) * 1e3,
+            "max_ms": max(latencies) * 1e3,
+            "commands": statistics.mean(it.commands for it in items),
+            "kib_sent": statistics.mean(it.bytes for it in items) / 1024,
+            "controls": items[-1].controls,
+            "peak_kib": max(it.peak for it in items) / 1024,
+            "errors": sum(len(it.errors) for it in items),
+        }
+    return summary
+
+
+def format_summary(app, summary):
+    lines = [f"[{app}]",
+             f"  {'操作':<18} {'回数':>4} {'p50':>9} {'p90':>9} {'p99':>9} {'命令':>6} {'送信':>9} {'部品':>6} {'メモリ':>10}"]
+    for name, s in summary.items():
+        lines.append(
+            f"  {name:<18} {s['n']:>4} {s['p50_ms']:>7.1f}ms {s['p90_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms "
+            f"{s['commands']:>6.0f} {s['kib_sent']:>7.1f}KiB {s['controls']:>6} {s['peak_kib']:>8.0f}KiB"
+            + (f"  エラー {s['errors']}" if s["errors"] else "")
+        )
+    return "\n".join(lines)
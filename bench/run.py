@@ -0,0 +1,90 @@
+"""Flet アプリのベンチマーク（画面なし）
+
+    python bench/run.py                       # 全部のアプリ
+    python bench/run.py weather3 dashboard    # 指定したアプリだけ
+    python bench/run.py --repeat 50 --latency 0.05 --profile prof/ --json result.json
+    python bench/run.py weather3 --archive 個人課題３/weather_archive   # アプリが残した本物のレスポンスで
+
+アプリ: hello（hello-world）、calc（lecture-4）、weather2（個人課題2）、weather3（個人課題３）、
+dashboard（最終課題）。各アプリは一時フォルダを作業フォルダにして動かし、
+気象庁の代わりにローカルのHTTPサーバー、物件DBの代わりに疑似データのDBを使う。
+
+操作ごとに、反応までの時間（p50 / p90 / p99）、クライアントに送った命令の数と大きさ、
+部品の数、メモリのピーク（tracemalloc）を表示する。
+--profile を付けると、アプリごとに cProfile の結果（.prof）を保存し、上位の関数を表示する。
+（Python 3.12 以降では、イベントループとスレッドプールの処理もまとめて計測される）
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import tracemalloc
+
+from harness import AppDriver, format_summary, summarize, working_dir
+from scenarios import SCENARIOS
+
+
+def run_app(name, options):
+    with tempfile.TemporaryDirectory() as tmp, working_dir(tmp):
+        driver = AppDriver()
+        profiler = cProfile.Profile() if options.profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            note = SCENARIOS[name](driver, tmp, options)
+        finally:
+            if profiler:
+                profiler.disable()
+            driver.close()
+
+    summary = summarize(driver.interactions)
+    print(format_summary(name, summary))
+    if note:
+        print(f"  {note}")
+    if profiler:
+        os.makedirs(options.profile, exist_ok=True)
+        path = os.path.join(options.profile, f"{name}.prof")
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(options.sort).print_stats(options.top)
+        print(f"  cProfile: {path}")
+        print("\n".join("    " + line for line in out.getvalue().strip().splitlines()[-options.top - 1:]))
+    print()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flet アプリのベンチマーク（画面なし）")
+    parser.add_argument("apps", nargs="*", choices=[[]] + list(SCENARIOS), help="対象のアプリ（省略で全部）")
+    parser.add_argument("--repeat", type=int, default=20, help="各操作のくり返し回数")
+    parser.add_argument("--latency", type=float, default=0.02, help="代役サーバーの応答の遅さ（秒）")
+    parser.add_argument("--archive", metavar="DIR",
+                        help="代役サーバーが返すレスポンスを取るアーカイブ（個人課題３ の weather_archive など）")
+    parser.add_argument("--rows", type=int, default=20000, help="物件DBの疑似データの件数")
+    parser.add_argument("--profile", metavar="DIR", help="cProfile の結果を保存するフォルダ")
+    parser.add_argument("--top", type=int, default=15, help="表示する cProfile の関数の数")
+    parser.add_argument("--sort", default="tottime",
+                        help="cProfile の並べ方（tottime / cumulative など。cumulative は待ち時間も含む）")
+    parser.add_argument("--json", metavar="FILE", help="集計結果を JSON で保存する")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc を使わない（時間だけ測る）")
+    options = parser.parse_args(argv)
+    options.profile = os.path.abspath(options.profile) if options.profile else None
+    options.archive = os.path.abspath(options.archive) if options.archive else None
+
+    if not options.no_memory:
+        tracemalloc.start()
+    results = {}
+    for name in options.apps or SCENARIOS:
+        results[name] = run_app(name, options)
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main() and 0)
@@ -0,0 +1,160 @@
+"""アプリごとの操作の台本
+
+各関数は (driver, tmp, options) を受け取り、driver.start() で main を呼んでから操作を送る。
+作業フォルダは tmp（アプリが作るDBやキャッシュはここにできる）。
+結果の表のあとに添える一言があれば、文字列で返す。
+"""
+import os
+import re
+
+import flet as ft
+
+from harness import find, find_all, load_app
+from standins import ROOT, JmaServer, seed_property_db
+
+
+def hello_world(driver, tmp, options):
+    app = load_app(os.path.join(ROOT, "hello-world", "src", "main.py"), "hello_world_main")
+    driver.start(app.main)
+    button = driver.page.floating_action_button
+    for _ in range(options.repeat):
+        driver.click(button, name="increment")
+
+
+def calculator(driver, tmp, options):
+    app = load_app(os.path.join(ROOT, "lecture-4", "calc.py"), "lecture4_calc")
+    driver.start(app.main)
+    buttons = {b.text: b for b in find_all(driver.page, app.CalcButton)}
+    sequences = ["12+34*5=", "1/3=", "200+10%=", "7", "+/-", "*6=", "AC"]
+    for i in range(options.repeat):
+        for key in re.findall(r"\+/-|AC|.", sequences[i % len(sequences)]):
+            driver.click(buttons[key], name="key")
+
+
+def _area_clicks(driver, tiles, count, name):
+    for i in range(count):
+        driver.click(tiles[i % len(tiles)], name=name)
+
+
+def _expand_regions(driver):
+    """サイドバーの地方をすべて開く（地域のタイルは開いたときに作られる）"""
+    for group in find_all(driver.page, ft.ExpansionTile):
+        driver.fire(group, "change", "true", name="expand region")
+    return find_all(driver.page, ft.ListTile)
+
+
+def weather_basic(driver, tmp, options):
+    server = JmaServer(latency=options.latency)
+    try:
+        app = load_app(os.path.join(ROOT, "個人課題2", "weather_app.py"), "weather_app_basic")
+        app.FORECAST_BASE_URL = server.base_url
+        driver.start(app.main)
+        tiles = find_all(driver.page, ft.ListTile)
+        _area_clicks(driver, tiles, options.repeat, "area click")
+        # 読み込み中に別の地域を選ぶ（前の読み込みはキャンセルされる）
+        for i in range(max(1, options.repeat // 4)):
+            with driver.measure("area switch"):
+                driver._dispatch(tiles[i], "click", "")
+                driver._dispatch(tiles[i + 1], "click", "")
+                driver._wait_idle(30)
+        return f"JMA の代役: {server.requests} 回のリクエスト"
+    finally:
+        server.close()
+
+
+def _close_weather_app(app):
+    """個人課題３のアプリが開いたDB・キャッシュ・アーカイブを閉じる"""
+    import fetcher
+    if app.store is not None:
+        app.store.close()
+        app.store = None
+    if app.response_cache is not None:
+        app.response_cache.close()
+    if fetcher.archive is not None:
+        fetcher.archive.close()
+        fetcher.archive = None
+
+
+def weather_sqlite(driver, tmp, options):
+    server = JmaServer(latency=options.latency, archive=options.archive)
+    app = load_app(os.path.join(ROOT, "個人課題３", "weather_app.py"), "weather_app_sqlite")
+    import fetcher
+    fetcher.FORECAST_BASE_URL = server.base_url
+    fetcher.AREA_URL = server.area_url
+    fetcher.archive = None   # アーカイブは作業フォルダ（tmp）に作り直す
+    # 裏の更新は終わらないタスクなので止める（操作ごとに「起こした処理が全部終わるまで」を測るため）
+    app.BACKGROUND_REFRESH = False
+    try:
+        driver.start(app.main)
+        tiles = _expand_regions(driver)
+        count = min(options.repeat, len(tiles))
+        # 初回（通信 + 保存）、2回目（キャッシュの TTL 内なので通信なし）
+        _area_clicks(driver, tiles, count, "area click (cold)")
+        _area_clicks(driver, tiles, count, "area click (warm)")
+        refresh = find(driver.page, ft.IconButton, icon=ft.Icons.REFRESH)
+        driver.click(refresh, name="refresh all")
+        return f"JMA の代役: {server.requests} 回のリクエスト（304: {server.not_modified}）"
+    finally:
+        server.close()
+        _close_weather_app(app)
+
+
+def weather_offline(driver, tmp, options):
+    """気象庁につながらなくなったあと、保存済みのデータがどれだけ早く出るか"""
+    server = JmaServer(latency=options.latency, archive=options.archive)
+    app = load_app(os.path.join(ROOT, "個人課題３", "weather_app.py"), "weather_app_offline")
+    import fetcher
+    fetcher.FORECAST_BASE_URL = server.base_url
+    fetcher.AREA_URL = server.area_url
+    fetcher.archive = None   # アーカイブは作業フォルダ（tmp）に作り直す
+    app.BACKGROUND_REFRESH = False
+    metrics_enabled = app.metrics.enabled
+    try:
+        driver.start(app.main)
+        tiles = _expand_regions(driver)
+        count = min(options.repeat, len(tiles))
+        _area_clicks(driver, tiles, count, "area click (online)")
+
+        server.close()               # ここから先はつながらない
+        app.get_response_cache().ttl = 0   # TTL 内のキャッシュで済ませず、毎回確認しに行かせる
+        app.metrics.enabled = True
+        app.metrics.reset()
+        _area_clicks(driver, tiles, count, "area click (offline)")
+        shown = app.metrics.snapshot()["stages"]["area.select"]
+        return f"オフライン時、保存済みのデータを表示するまで p50 {shown['p50_ms']:.1f}ms / 最大 {shown['max_ms']:.1f}ms"
+    finally:
+        app.metrics.enabled = metrics_enabled
+        server.close()
+        _close_weather_app(app)
+
+
+def dashboard(driver, tmp, options):
+    seed_property_db(os.path.join(tmp, "最終課題", "最終課題.db"), options.rows)
+    app = load_app(os.path.join(ROOT, "最終課題", "最終課題可視化.py"), "property_dashboard")
+    driver.start(app.main)
+
+    field = find(driver.page, ft.TextField)
+    for keyword in ["吉祥寺", "グリーンヒル", "つくば", "渋谷"][:max(1, options.repeat)]:
+        driver.type_text(field, keyword, name="search (type)")
+    driver.type_text(field, "", name="search (clear)")
+
+    column = next(c for c in find_all(driver.page, ft.Column) if c.on_scroll is not None)
+    for _ in range(options.repeat):
+        driver.scroll(column, pixels=950, max_extent=1000, name="scroll down")
+    for _ in range(options.repeat):
+        driver.scroll(column, pixels=0, max_extent=1000, name="scroll up")
+
+    kind = find(driver.page, ft.Dropdown)
+    for value in ["floor_plan", "station"]:
+        kind.value = value
+        driver.fire(kind, "change", value, name="stats kind")
+
+
+SCENARIOS = {
+    "hello": hello_world,
+    "calc": calculator,
+    "weather2": weather_basic,
+    "weather3": weather_sqlite,
+    "weather3-offline": weather_offline,
+    "dashboard": dashboard,
+}
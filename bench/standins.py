@@ -0,0 +1,150 @@
+"""ベンチマーク用の代役（気象庁の代わりのHTTPサーバー、疑似データ入りのDB）"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_from(folder, name):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return __import__(name)
+
+
+def make_area_json(n_areas=4, n_municipalities=3):
+    """area.json と同じ形の疑似データ
+
+    地方と府県は 個人課題３/areas.json の表から作り、一次細分区域は疑似予報JSONと同じコードにする。
+    """
+    sub_area_codes = _import_from("個人課題３", "bench_parser").sub_area_codes
+    with open(os.path.join(ROOT, "個人課題３", "areas.json"), encoding="utf-8") as f:
+        regions = json.load(f)["regions"]
+    data = {level: {} for level in ("centers", "offices", "class10s", "class15s", "class20s")}
+    for r, region in enumerate(regions):
+        center = f"{r + 1:02d}0100"
+        data["centers"][center] = {"name": region["name"], "children": [code for code, _ in region["areas"]]}
+        for office, name in region["areas"]:
+            class10s = sub_area_codes(n_areas, office)
+            data["offices"][office] = {"name": name, "parent": center, "children": class10s}
+            for a, class10 in enumerate(class10s):
+                class15 = class10[:5] + "1"
+                data["class10s"][class10] = {"name": f"{name}地域{a}", "parent": office, "children": [class15]}
+                class20s = [f"{class10}{m}" for m in range(n_municipalities)]
+                data["class15s"][class15] = {"name": f"{name}地域{a}", "parent": class10, "children": class20s}
+                for m, class20 in enumerate(class20s):
+                    data["class20s"][class20] = {"name": f"{name}{a}{m}市", "parent": class15}
+    return data
+
+
+class JmaServer:
+    """/forecast/<地域コード>.json に予報JSONと同じ形の疑似データ、/area.json に地域の階層を返すサーバー
+
+    ETag を付けて返し、If-None-Match が一致すれば 304 を返す。
+    latency 秒だけ待ってから答える（本物の通信の遅さの代わり）。
+    archive（アプリが残したレスポンスのフォルダ）を渡すと、そこにある地域は一番新しい本物のレスポンスを返す。
+    fail に入れた地域コードには 500 を返す（テストで1地域だけ失敗させる用）。
+    max_active は同時に処理していたリクエストの最大数、peers はつないできた接続（クライアントのポート）の集合。
+    """
+
+    def __init__(self, latency=0.0, n_areas=4, archive=None, fail=()):
+        make_payload = _import_from("個人課題３", "bench_parser").make_payload
+        archive = _import_from("pipeline", "archive").Archive(archive) if archive else None
+        self.latency = latency
+        self.fail = set(fail)
+        self.requests = 0
+        self.not_modified = 0
+        self.active = 0
+        self.max_active = 0
+        self.peers = set()
+        self._bodies = {}
+        self._lock = threading.Lock()
+        server = self
+
+        def body_for(code):
+            with server._lock:
+                body = server._bodies.get(code)
+                if body is None:
+                    record = archive and archive.latest("jma.area" if code == "area" else "jma.forecast", code)
+                    if record:
+                        data = archive.read(record)
+                    else:
+                        payload = make_area_json(n_areas) if code == "area" else make_payload(n_areas, int(code), code)
+                        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                    body = server._bodies[code] = (data, '"' + hashlib.md5(data).hexdigest() + '"')
+                return body
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                    server.peers.add(self.client_address)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    self._answer()
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _answer(self):
+                name = self.path.rsplit("/", 1)[-1]
+                if not (self.path.startswith("/forecast/") or self.path == "/area.json") or not name.endswith(".json"):
+                    self.send_error(404)
+                    return
+                if name[:-5] in server.fail:
+                    self.send_error(500)
+                    return
+                data, etag = body_for(name[:-5])
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/forecast/"
+
+    @property
+    def area_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/area.json"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def seed_property_db(path, n_rows, seed=0):
+    """疑似データの properties テーブルを作る（最終課題/bench_search.py と同じデータ）"""
+    make_db = _import_from("最終課題", "bench_search").make_db
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    make_db(path, n_rows, seed).close()
@@ -0,0 +1,146 @@
+"""天気予報アプリ（個人課題３）の起動の速さを測る
+
+新しいプロセスを --repeat 回起動し、それぞれで
+    flet      import flet にかかった時間
+    app       アプリのモジュール（weather_app と同じフォルダのモジュール）の import にかかった時間
+    paint     main(page) を呼んでから、最初の画面（page.add）をクライアントに送るまでの時間
+    main      main(page) が起こした処理が全部終わるまでの時間（地域の階層は代役サーバーから読む）
+    sent      最初の画面で送った JSON の大きさと部品の数
+を測って中央値を出す。最後に python -X importtime で、import に時間のかかっているモジュールを並べる。
+
+    python bench/startup.py
+    python bench/startup.py --repeat 10 --app /path/to/old/個人課題３/weather_app.py   # 別の版と比べる
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_APP = os.path.join(ROOT, "個人課題３", "weather_app.py")
+
+
+# --- 👶 1回ぶんの計測（新しいプロセスの中で動く） ---
+
+def child(app_path):
+    t0 = time.perf_counter()
+    import flet  # noqa: F401
+    t_flet = time.perf_counter()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from harness import AppDriver, load_app
+    t_harness = time.perf_counter()
+    app = load_app(app_path, "weather_app")
+    t_app = time.perf_counter()
+    # 裏の更新は終わらないタスクなので止める（main が起こした処理の終わりを待てるように）
+    app.BACKGROUND_REFRESH = False
+    # main が裏で取りに行く area.json などは、気象庁ではなく手元の代役サーバーに向ける
+    from standins import JmaServer
+    server = JmaServer()
+    fetcher = sys.modules.get("fetcher")
+    if fetcher is not None:
+        fetcher.FORECAST_BASE_URL = server.base_url
+        fetcher.AREA_URL = server.area_url
+
+    driver = AppDriver(trace_memory=False)
+    first_add = []
+    send_commands = driver.conn.send_commands
+
+    def recording_send_commands(session_id, commands):
+        result = send_commands(session_id, commands)
+        if not first_add and any(command.name == "add" for command in commands):
+            first_add.append((time.perf_counter(), driver.conn.bytes))
+        return result
+
+    driver.conn.send_commands = recording_send_commands
+    t_main = time.perf_counter()
+    driver.start(app.main)
+    t_idle = time.perf_counter()
+    controls = len(driver.page.index)
+    driver.close()
+    server.close()
+
+    t_paint, sent = first_add[0]
+    print(json.dumps({
+        "flet_ms": (t_flet - t0) * 1e3,
+        "app_ms": (t_app - t_harness) * 1e3,
+        "paint_ms": (t_paint - t_main) * 1e3,
+        "main_ms": (t_idle - t_main) * 1e3,
+        "kib_sent": sent / 1024,
+        "controls": controls,
+    }))
+
+
+# --- 📋 集計 ---
+
+def run_child(app_path):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--app", app_path],
+            cwd=tmp, capture_output=True, text=True, check=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def import_times(app_path, top):
+    """python -X importtime の結果から、(累計マイクロ秒, 深さ, モジュール名) を重い順に"""
+    folder = os.path.dirname(os.path.abspath(app_path))
+    module = os.path.splitext(os.path.basename(app_path))[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=folder)
+        err = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True,
+        ).stderr
+    # 子のモジュールは親より先に出てくるので、深さ0の行ごとに区切るとアプリの import だけが取り出せる
+    rows = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(parts[1]), depth, name.strip()))
+        if depth == 0:
+            if name.strip() == module:
+                break
+            rows = []
+    # アプリ自身と、アプリが直接 import したもの（とその1つ下）
+    rows = [row for row in rows if row[1] <= 2]
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=DEFAULT_APP, help="測る weather_app.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="import の重いモジュールをいくつ表示するか")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        child(options.app)
+        return
+
+    runs = [run_child(options.app) for _ in range(options.repeat)]
+    print(f"[起動] {options.app}（{options.repeat} 回の中央値）")
+    labels = [
+        ("flet_ms", "import flet"), ("app_ms", "import アプリ"),
+        ("paint_ms", "最初の画面まで"), ("main_ms", "main の終わりまで"),
+    ]
+    for key, label in labels:
+        values = [run[key] for run in runs]
+        print(f"  {label:<16} {statistics.median(values):>8.1f}ms  (最小 {min(values):.1f}ms / 最大 {max(values):.1f}ms)")
+    print(f"  {'最初の画面':<16} {runs[-1]['kib_sent']:>6.1f}KiB  部品 {runs[-1]['controls']} 個")
+
+    print(f"\n[import の重いもの] python -X importtime（累計）")
+    for cumulative, depth, name in import_times(options.app, options.top):
+        print(f"  {cumulative / 1e3:>8.1f}ms  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main()
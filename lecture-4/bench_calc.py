@@ -0,0 +1,106 @@
+"""計算エンジン（calc_engine.py）のベンチマーク
+
+    python bench_calc.py [式の数]      # 既定は 20,000
+
+同じ式のリストを次の方法で計算し、時間を比べる。
+    engine (cache)     evaluate_many（命令列のキャッシュあり）
+    engine (no cache)  毎回 字句分け → 命令列 → 計算
+    ast + Decimal      ast.parse した木を再帰でたどって Decimal で計算（素朴な安全な方法）
+    eval (float)       eval()。安全でなく、0.1 + 0.2 も 0.30000000000000004 になる（参考）
+
+式は「全部ちがう式」と「500 種類の式のくり返し」の2通りで試す。
+"""
+import ast
+import operator
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+import calc_engine
+
+_AST_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+def make_expressions(n, distinct=None, seed=0):
+    rnd = random.Random(seed)
+
+    def one():
+        terms = [f"{rnd.randint(1, 999)}.{rnd.randint(0, 99):02d}" for _ in range(rnd.randint(2, 8))]
+        expr = terms[0]
+        for term in terms[1:]:
+            expr += rnd.choice("+-*/") + term
+        if rnd.random() < 0.3:
+            expr = f"({expr})*{rnd.randint(2, 9)}"
+        return expr
+
+    if distinct is None:
+        return [one() for _ in range(n)]
+    pool = [one() for _ in range(distinct)]
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def ast_eval(expr):
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant):
+            return Decimal(str(node.value))
+        if isinstance(node, ast.BinOp) and type(node.op) in _AST_OPS:
+            return _AST_OPS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -walk(node.operand)
+        raise ValueError(expr)
+    return walk(ast.parse(expr, mode="eval"))
+
+
+def engine_cached(expressions):
+    calc_engine.evaluate_many(expressions)
+
+
+def engine_uncached(expressions):
+    compile_expr = calc_engine.compile_expr.__wrapped__
+    for expr in expressions:
+        calc_engine.run(compile_expr(expr))
+
+
+def ast_decimal(expressions):
+    for expr in expressions:
+        ast_eval(expr)
+
+
+def eval_float(expressions):
+    for expr in expressions:
+        eval(expr)  # noqa: S307（比較用）
+
+
+def timed(func, expressions, repeat=5):
+    times = []
+    for _ in range(repeat):
+        calc_engine.compile_expr.cache_clear()
+        start = time.perf_counter()
+        func(expressions)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(n=20_000):
+    # 結果が ast + Decimal と一致することを先に確かめる
+    sample = make_expressions(200, seed=1)
+    results, errors = calc_engine.evaluate_many(sample)
+    for expr, result in zip(sample, results):
+        assert result == +ast_eval(expr), expr
+
+    methods = (("engine (cache)", engine_cached), ("engine (no cache)", engine_uncached),
+               ("ast + Decimal", ast_decimal), ("eval (float)", eval_float))
+    for label, expressions in (("全部ちがう式", make_expressions(n)),
+                               ("500 種類のくり返し", make_expressions(n, distinct=500))):
+        print(f"{label}（{n:,} 式）")
+        for name, func in methods:
+            seconds = timed(func, expressions)
+            print(f"  {name:<18} {seconds * 1e3:>8.1f}ms  {seconds / n * 1e6:>6.2f}µs/式")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -1,30 +1,33 @@
 import flet as ft
 
+from calc_engine import Calculator
+
 
 class CalcButton(ft.ElevatedButton):
-    def __init__(self, text, expand=1):
+    def __init__(self, text, expand=1, on_click=None):
         super().__init__()
         self.text = text
         self.expand = expand
+        self.on_click = on_click
 
 
 class DigitButton(CalcButton):
-    def __init__(self, text, expand=1):
-        CalcButton.__init__(self, text, expand)
+    def __init__(self, text, expand=1, on_click=None):
+        CalcButton.__init__(self, text, expand, on_click)
         self.bgcolor = ft.Colors.WHITE24
         self.color = ft.Colors.WHITE
 
 
 class ActionButton(CalcButton):
-    def __init__(self, text):
-        CalcButton.__init__(self, text)
+    def __init__(self, text, on_click=None):
+        CalcButton.__init__(self, text, on_click=on_click)
         self.bgcolor = ft.Colors.ORANGE
         self.color = ft.Colors.WHITE
 
 
 class ExtraActionButton(CalcButton):
-    def __init__(self, text):
-        CalcButton.__init__(self, text)
+    def __init__(self, text, on_click=None):
+        CalcButton.__init__(self, text, on_click=on_click)
         self.bgcolor = ft.Colors.BLUE_GREY_100
         self.color = ft.Colors.BLACK
 
@@ -32,6 +35,16 @@ class ExtraActionButton(CalcButton):
 def main(page: ft.Page):
     page.title = "Simple Calculator"
     result = ft.Text(value="0", color=ft.Colors.WHITE, size=20)
+    # 直前の計算（式 = 結果）
+    last = ft.Text(value="", color=ft.Colors.WHITE54, size=12)
+    calculator = Calculator()
+
+    def button_clicked(e):
+        result.value = calculator.press(e.control.text)
+        if calculator.history:
+            expr, value = calculator.history[0]
+            last.value = f"{expr} = {value}"
+        page.update(result, last)
 
     page.add(
         ft.Container(
@@ -41,44 +54,45 @@ def main(page: ft.Page):
             padding=20,
             content=ft.Column(
                 controls=[
-                    ft.Row(controls=[result]),
+                    ft.Row(controls=[last], alignment=ft.MainAxisAlignment.END),
+                    ft.Row(controls=[result], alignment=ft.MainAxisAlignment.END),
                     ft.Row(
                         controls=[
-                            ExtraActionButton(text="AC"),
-                            ExtraActionButton(text="+/-"),
-                            ExtraActionButton(text="%"),
-                            ActionButton(text="/"),
+                            ExtraActionButton(text="AC", on_click=button_clicked),
+                            ExtraActionButton(text="+/-", on_click=button_clicked),
+                            ExtraActionButton(text="%", on_click=button_clicked),
+                            ActionButton(text="/", on_click=button_clicked),
                         ]
                     ),
                     ft.Row(
                         controls=[
-                            DigitButton(text="7"),
-                            DigitButton(text="8"),
-                            DigitButton(text="9"),
-                            ActionButton(text="*"),
+                            DigitButton(text="7", on_click=button_clicked),
+                            DigitButton(text="8", on_click=button_clicked),
+                            DigitButton(text="9", on_click=button_clicked),
+                            ActionButton(text="*", on_click=button_clicked),
                         ]
                     ),
                     ft.Row(
                         controls=[
-                            DigitButton(text="4"),
-                            DigitButton(text="5"),
-                            DigitButton(text="6"),
-                            ActionButton(text="-"),
+                            DigitButton(text="4", on_click=button_clicked),
+                            DigitButton(text="5", on_click=button_clicked),
+                            DigitButton(text="6", on_click=button_clicked),
+                            ActionButton(text="-", on_click=button_clicked),
                         ]
                     ),
                     ft.Row(
                         controls=[
-                            DigitButton(text="1"),
-                            DigitButton(text="2"),
-                            DigitButton(text="3"),
-                            ActionButton(text="+"),
+                            DigitButton(text="1", on_click=button_clicked),
+                            DigitButton(text="2", on_click=button_clicked),
+                            DigitButton(text="3", on_click=button_clicked),
+                            ActionButton(text="+", on_click=button_clicked),
                         ]
                     ),
                     ft.Row(
                         controls=[
-                            DigitButton(text="0", expand=2),
-                            DigitButton(text="."),
-                            ActionButton(text="="),
+                            DigitButton(text="0", expand=2, on_click=button_clicked),
+                            DigitButton(text=".", on_click=button_clicked),
+                            ActionButton(text="=", on_click=button_clicked),
                         ]
                     ),
                 ]
@@ -0,0 +1,271 @@
+"""電卓の計算エンジン（画面なしでも使える）
+
+    >>> evaluate("1 + 2 * 3")
+    Decimal('7')
+    >>> evaluate("200 + 10%")        # 200 の 10% を足す
+    Decimal('220')
+    >>> evaluate_many(["1/3", "2/0"])
+    ([Decimal('0.3333333333333333333333333333'), None], {1: '0で割ることはできません'})
+
+式は「字句に分ける → 操車場アルゴリズムで逆ポーランド記法の命令列にする → スタックで計算する」の順に処理する。
+eval() は使わず、数・演算子・括弧以外の文字はエラーにする。
+計算は Decimal で行うので、0.1 + 0.2 は 0.3 になる。
+同じ式は命令列をキャッシュして使い回す。
+"""
+import re
+from collections import deque
+from decimal import Decimal, DecimalException, DivisionByZero, localcontext
+from functools import lru_cache
+
+PRECISION = 28
+HISTORY_SIZE = 100
+
+
+class CalcError(ValueError):
+    """式が正しくない、または計算できないとき"""
+
+
+# --- ✂️ 字句に分ける ---
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|(.))")
+
+# 二項演算子の優先順位
+_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+
+def tokenize(expr):
+    """式を ('num', Decimal) と ('op', 記号) の並びにする"""
+    tokens = []
+    for number, symbol in _TOKEN.findall(expr):
+        if number:
+            tokens.append(("num", Decimal(number)))
+        elif symbol in "+-*/%()":
+            tokens.append(("op", symbol))
+        elif not symbol.isspace():
+            raise CalcError(f"使えない文字です: {symbol}")
+    return tokens
+
+
+# --- 🔧 命令列にする ---
+
+# 命令（数値で持つと計算ループの比較が速い）
+PUSH, ADD, SUB, MUL, DIV, NEG, PCT, ADD_PCT, SUB_PCT = range(9)
+_BINARY = {"+": ADD, "-": SUB, "*": MUL, "/": DIV}
+
+
+@lru_cache(maxsize=1024)
+def compile_expr(expr):
+    """式を逆ポーランド記法の命令列 ((命令, 値), ...) にする（結果はキャッシュする）
+
+    % は直前の数を 100 で割る。ただし a + b% と a - b% は電卓と同じく a の b% を足し引きする。
+    """
+    program = []
+    ops = []          # 演算子のスタック
+    percent = []      # 出力済みの各項が b% の形か（+ と - の扱いを決めるため）
+    expect_operand = True
+
+    def emit(op):
+        if op == "neg":
+            program.append((NEG, None))  # -b% も b% として扱う
+            return
+        if len(percent) < 2:
+            raise CalcError("式が正しくありません")
+        right_is_percent = percent.pop()
+        percent[-1] = False
+        if right_is_percent and op in ("+", "-"):
+            program.append((ADD_PCT if op == "+" else SUB_PCT, None))
+        else:
+            program.append((_BINARY[op], None))
+
+    for kind, value in tokenize(expr):
+        if kind == "num":
+            if not expect_operand:
+                raise CalcError("式が正しくありません")
+            program.append((PUSH, value))
+            percent.append(False)
+            expect_operand = False
+        elif value == "(":
+            if not expect_operand:
+                raise CalcError("式が正しくありません")
+            ops.append(value)
+        elif value == ")":
+            while ops and ops[-1] != "(":
+                emit(ops.pop())
+            if not ops or expect_operand:
+                raise CalcError("括弧が正しくありません")
+            ops.pop()
+        elif value == "%":
+            if expect_operand:
+                raise CalcError("式が正しくありません")
+            # 単項マイナスより先に効かせる（-50% は -(50%)）
+            program.append((PCT, None))
+            percent[-1] = True
+        elif expect_operand:
+            # 項の先頭の + / - は符号
+            if value == "-":
+                ops.append("neg")
+            elif value != "+":
+                raise CalcError("式が正しくありません")
+        else:
+            while ops and ops[-1] != "(" and (ops[-1] == "neg" or _PRECEDENCE[ops[-1]] >= _PRECEDENCE[value]):
+                emit(ops.pop())
+            ops.append(value)
+            expect_operand = True
+
+    if expect_operand:
+        raise CalcError("式が正しくありません")
+    while ops:
+        op = ops.pop()
+        if op == "(":
+            raise CalcError("括弧が正しくありません")
+        emit(op)
+    return tuple(program)
+
+
+# --- 🧮 計算 ---
+
+def run(program):
+    """命令列を計算する"""
+    stack = []
+    push, pop = stack.append, stack.pop
+    hundred = Decimal(100)
+    with localcontext() as ctx:
+        ctx.prec = PRECISION
+        try:
+            for op, value in program:
+                if op == PUSH:
+                    push(value)
+                elif op == NEG:
+                    push(-pop())
+                elif op == PCT:
+                    push(pop() / hundred)
+                else:
+                    b = pop()
+                    a = pop()
+                    if op == ADD:
+                        push(a + b)
+                    elif op == SUB:
+                        push(a - b)
+                    elif op == MUL:
+                        push(a * b)
+                    elif op == DIV:
+                        push(a / b)
+                    elif op == ADD_PCT:
+                        push(a + a * b)
+                    else:
+                        push(a - a * b)
+        except DivisionByZero:
+            raise CalcError("0で割ることはできません") from None
+        except DecimalException:
+            raise CalcError("計算できません") from None
+        # 単項の + で精度を超えた桁を丸め（これだけでは 220.0 の末尾の 0 は残る）、_normalize で 0 を取る
+        return _normalize(+pop())
+
+
+def _normalize(value):
+    """末尾の 0 を取る（220.0 → 220、2.50 → 2.5）。Decimal.normalize() と違い 2.2E+2 のような指数にはしない"""
+    if not value:
+        return Decimal(0)
+    value = value.normalize()
+    if value.as_tuple().exponent > 0 and value.adjusted() < PRECISION:
+        value = value.quantize(Decimal(1))
+    return value
+
+
+def evaluate(expr):
+    """式を計算して Decimal を返す"""
+    return run(compile_expr(expr))
+
+
+def evaluate_many(expressions):
+    """式をまとめて計算する。(結果のリスト, {番号: エラー}) を返す
+
+    エラーになった式の結果は None にして、残りの式は続けて計算する。
+    """
+    results = []
+    errors = {}
+    for i, expr in enumerate(expressions):
+        try:
+            results.append(run(compile_expr(expr)))
+        except CalcError as e:
+            results.append(None)
+            errors[i] = str(e)
+    return results, errors
+
+
+def format_number(value):
+    """表示用の文字列（指数表記を避け、末尾の 0 を取る）"""
+    if not value:
+        return "0"
+    return f"{value.normalize():f}"
+
+
+# --- 🖩 電卓のボタン操作 ---
+
+_LAST_NUMBER = re.compile(r"(\d+\.?\d*|\.\d+)%?$")
+_BARE_NUMBER = re.compile(r"-?(\d+\.?\d*|\.\d+)")
+
+
+class Calculator:
+    """ボタンの押下を受け取って式を組み立て、= で計算する
+
+    history には (式, 結果の文字列) を新しい順に残す（数だけのまま = を押したときは残さない）。
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.entry = ""
+        self.history = deque(maxlen=history_size)
+        self.just_evaluated = False
+
+    @property
+    def display(self):
+        return self.entry or "0"
+
+    def press(self, key):
+        """ボタンを1つ押す。表示する文字列を返す"""
+        if key == "AC":
+            self.entry = ""
+        elif key == "=":
+            return self.equals()
+        elif key == "+/-":
+            self.toggle_sign()
+        elif key == "%" and self.entry[-1:] in ("+", "-", "*", "/", "("):
+            pass  # 演算子の直後の % はかける数が無いので無視する
+        elif key in "+-*/%":
+            if not self.entry and key != "-":
+                self.entry = "0"
+            if self.entry and self.entry[-1] in "+-*/" and key != "%":
+                self.entry = self.entry[:-1]  # 演算子を押し直したら置き換える
+            self.entry += key
+        else:
+            if self.just_evaluated:
+                self.entry = ""  # 計算のあとに数字を押したら新しい式にする
+            self.entry += key
+        self.just_evaluated = False
+        return self.display
+
+    def toggle_sign(self):
+        """最後の数の符号を反転する"""
+        match = _LAST_NUMBER.search(self.entry)
+        if not match:
+            return
+        start = match.start()
+        if self.entry[start - 1:start] == "-" and (start == 1 or self.entry[start - 2] in "+-*/("):
+            self.entry = self.entry[:start - 1] + self.entry[start:]
+        else:
+            self.entry = self.entry[:start] + "-" + self.entry[start:]
+
+    def equals(self):
+        if not self.entry:
+            return self.display
+        expr = self.entry
+        try:
+            result = format_number(evaluate(expr))
+        except CalcError as e:
+            self.entry = ""
+            return str(e)
+        if not _BARE_NUMBER.fullmatch(expr):
+            self.history.appendleft((expr, result))
+        self.entry = result
+        self.just_evaluated = True
+        return self.display
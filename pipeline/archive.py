@@ -0,0 +1,276 @@
+"""取得した生のレスポンス（気象庁の JSON、SUUMO の HTML）を残しておくアーカイブ
+
+    python pipeline/archive.py アーカイブのフォルダ     # 中身の集計を表示する
+
+解析して捨てていたレスポンスを圧縮して追記しておけば、パーサーを直したあとに
+ネットワークに行かずに同じデータから作り直せる（ingest_forecasts.py --archive、scraper.replay）。
+
+    フォルダ/
+        index.db          レコードの索引（SQLite）: 種類, キー, 取得時刻, どのセグメントの何バイト目か
+        000001.seg ...    レスポンスを1件ずつ圧縮して後ろに足していくだけのファイル（segment_bytes を超えたら次へ）
+
+- 1件ずつ別々に圧縮しているので、どのレコードも (セグメント, 位置, 長さ) だけで読み出せる
+- 圧縮は zstd（Python 3.14 の compression.zstd か zstandard パッケージ）、無ければ gzip。方式はレコードごとに記録する
+- 中身が同じレスポンス（ハッシュが同じ）は書き足さず、索引だけ追加して前のバイト列を指す
+- 読み出しはセグメントを mmap して、必要な範囲だけを展開する。
+  Ref（パス, 位置, 長さ, 方式）は pickle できるので、解析プロセスに渡してそこで読ませる（ingest.py と組み合わせる）
+- 書き込むのは1つのプロセスだけの想定（スレッドはロックで直列化する）
+"""
+import gzip
+import hashlib
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+# --- 🗜 圧縮方式 ---
+
+def _zstd_codec(level=3):
+    """使える zstd の (圧縮, 展開)。どちらも無ければ None"""
+    try:
+        from compression import zstd
+        return (lambda data: zstd.compress(data, level)), zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    # compress() はフレームに元の長さを書くので、decompress() はそのまま展開できる
+    return zstandard.ZstdCompressor(level=level).compress, (lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+CODECS = {"gzip": ((lambda data: gzip.compress(data, 6, mtime=0)), gzip.decompress)}
+_zstd = _zstd_codec()
+if _zstd is not None:
+    CODECS["zstd"] = _zstd
+DEFAULT_CODEC = "zstd" if "zstd" in CODECS else "gzip"
+
+
+# --- 📖 読み出し（mmap） ---
+
+Ref = namedtuple("Ref", "path offset length codec")
+Record = namedtuple("Record", "id source key fetched_at size ref")
+
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def _map(path, end):
+    """セグメントの mmap（追記されて end まで届いていなければ開き直す）"""
+    with _maps_lock:
+        mapped = _maps.get(path)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(path, "rb") as f:
+                mapped = _maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+
+
+def read_ref(ref):
+    """Ref の指すレスポンスを展開して bytes で返す（どのプロセスからでも呼べる）"""
+    codec = CODECS.get(ref.codec)
+    if codec is None:
+        raise RuntimeError(f"{ref.codec} で圧縮されたレコードです（zstandard を入れてください）")
+    mapped = _map(ref.path, ref.offset + ref.length)
+    return codec[1](mapped[ref.offset:ref.offset + ref.length])
+
+
+def close_maps():
+    with _maps_lock:
+        for mapped in _maps.values():
+            mapped.close()
+        _maps.clear()
+
+
+# --- 🗄 アーカイブ ---
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS records (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        key TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        segment INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        codec TEXT NOT NULL,
+        digest BLOB NOT NULL
+    )
+'''
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_records_source ON records (source, fetched_at)',
+    'CREATE INDEX IF NOT EXISTS idx_records_digest ON records (digest)',
+)
+SCHEMA_VERSION = 1
+
+INSERT_SQL = '''
+    INSERT INTO records (source, key, fetched_at, segment, offset, length, size, codec, digest)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class Archive:
+    """追記専用のレスポンスのアーカイブ
+
+    フォルダや索引は最初に読み書きするときに開くので、作るだけなら何もしない（アプリの起動を遅くしない）。
+    """
+
+    def __init__(self, folder, codec=None, segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.folder = folder
+        self.codec = codec or DEFAULT_CODEC
+        if self.codec not in CODECS:
+            raise ValueError(f"使えない圧縮方式です: {self.codec}")
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._file = None
+        self._segment = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.folder, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.folder, "index.db"), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                conn.execute(SCHEMA)
+                for sql in INDEXES:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def segment_path(self, segment):
+        return os.path.join(self.folder, f"{segment:06d}.seg")
+
+    def _open_segment(self, size):
+        """size バイトを書き足すセグメントのファイル（いっぱいなら次のセグメントへ）"""
+        if self._file is None:
+            last = self._db().execute("SELECT MAX(segment) FROM records").fetchone()[0]
+            self._segment = last or 1
+            self._file = open(self.segment_path(self._segment), "ab")
+        if self._file.tell() and self._file.tell() + size > self.segment_bytes:
+            self._file.close()
+            self._segment += 1
+            self._file = open(self.segment_path(self._segment), "ab")
+        return self._file
+
+    def append(self, source, key, body, fetched_at=None):
+        """レスポンスを1件追記し、レコードの id を返す
+
+        source はレスポンスの種類（'jma.forecast' など）、key はその中での名前（地域コードなど）。
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        with self._lock:
+            conn = self._db()
+            same = conn.execute(
+                "SELECT segment, offset, length, codec FROM records WHERE digest = ? AND size = ? LIMIT 1",
+                (digest, len(body)),
+            ).fetchone()
+            if same is not None:
+                segment, offset, length, codec = same
+            else:
+                data = CODECS[self.codec][0](body)
+                f = self._open_segment(len(data))
+                offset = f.tell()
+                f.write(data)
+                # 索引が先に入ると、落ちたときに存在しないバイト列を指してしまう
+                f.flush()
+                segment, length, codec = self._segment, len(data), self.codec
+            cursor = conn.execute(INSERT_SQL, (source, key, fetched_at, segment, offset, length, len(body), codec, digest))
+        return cursor.lastrowid
+
+    def records(self, source=None, key=None, since=None, until=None, disk_order=False):
+        """条件に合うレコードのリスト（既定は取得した順。disk_order=True ならセグメントの並び順で、読むのが速い）"""
+        where, params = [], []
+        for column, op, value in (("source", "=", source), ("key", "=", key),
+                                  ("fetched_at", ">=", since), ("fetched_at", "<", until)):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                params.append(value)
+        sql = "SELECT id, source, key, fetched_at, size, segment, offset, length, codec FROM records"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY segment, offset, id" if disk_order else " ORDER BY fetched_at, id"
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [
+            Record(id_, source_, key_, fetched_at, size, Ref(self.segment_path(segment), offset, length, codec))
+            for id_, source_, key_, fetched_at, size, segment, offset, length, codec in rows
+        ]
+
+    def latest(self, source, key):
+        """その種類・キーで一番新しいレコード（無ければ None）"""
+        records = self.records(source, key)
+        return records[-1] if records else None
+
+    def read(self, record):
+        """レコードの中身（bytes）"""
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+        return read_ref(record.ref)
+
+    def replay(self, source=None, since=None, until=None):
+        """(Record, 中身) をセグメントの並び順に返す（ネットワークなしで解析をやり直す用）"""
+        for record in self.records(source, since=since, until=until, disk_order=True):
+            yield record, read_ref(record.ref)
+
+    def stats(self):
+        """種類ごとの {件数, 中身の合計バイト数} と、セグメントの合計バイト数"""
+        with self._lock:
+            conn = self._db()
+            sources = {
+                source: {"records": count, "bytes": size}
+                for source, count, size in conn.execute(
+                    "SELECT source, COUNT(*), SUM(size) FROM records GROUP BY source ORDER BY source")
+            }
+            stored = conn.execute(
+                "SELECT COALESCE(SUM(length), 0) FROM (SELECT DISTINCT segment, offset, length FROM records)"
+            ).fetchone()[0]
+        return {"sources": sources, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        return
+    with Archive(sys.argv[1]) as archive:
+        stats = archive.stats()
+    total = sum(s["bytes"] for s in stats["sources"].values())
+    for source, s in stats["sources"].items():
+        print(f"{source:<16} {s['records']:>8} 件  {s['bytes'] / 1024:>10.1f}KiB")
+    if total:
+        print(f"{'保存しているサイズ':<12} {stats['stored_bytes'] / 1024:>18.1f}KiB（元の {stats['stored_bytes'] / total:.1%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""取り込み（ingest.py）の速さを、解析プロセスの数を変えて測る
+
+    python pipeline/bench_ingest.py [--files 400] [--workers 1 2 4 8]
+    python pipeline/bench_ingest.py --archive 個人課題３/weather_archive   # アプリが残した本物のレスポンスで
+
+一時フォルダに疑似データのファイルを作り、空のDBに取り込むまでの rows/sec を出す。
+    weather   予報JSON（個人課題３/bench_parser.py の疑似データ。府県ごとに発表時刻を変える）→ forecast_history
+    weather (archive)  同じ予報JSONを archive.py のアーカイブに入れ、そこから取り込み直す（replay）
+    suumo     SUUMO の一覧ページに似せた HTML → properties（bs4 と requests が無ければ飛ばす）
+--archive を付けると、疑似データの代わりにアーカイブにある本物のレスポンスを使う。
+比べるために、プールを使わず1つのプロセスで「解析 → 書き込み」を順に行う場合（serial）も測る。
+解析プロセスを増やして速くなるのは CPU のコア数まで（os.cpu_count() も表示する）。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "個人課題３"))
+sys.path.insert(0, os.path.join(ROOT, "最終課題"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ingest  # noqa: E402
+from archive import Archive  # noqa: E402
+
+
+# --- 🧪 疑似データ ---
+
+def make_weather_files(folder, n_files, n_areas=12):
+    """府県コード入りのファイル名で予報JSONを書き出し、(府県コード, パス) のリストを返す"""
+    from bench_parser import make_payload
+    from ingest_forecasts import AREA_NAMES
+
+    offices = list(AREA_NAMES)
+    items = []
+    for i in range(n_files):
+        code = offices[i % len(offices)]
+        data = make_payload(n_areas, seed=i, office_code=code)
+        data[0]["reportDatetime"] = f"2026-01-{1 + i // len(offices) % 28:02d}T{5 + i // (28 * len(offices)) % 12:02d}:00:00+09:00"
+        path = os.path.join(folder, f"{code}_{i:05d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        items.append((code, path))
+    return items
+
+
+LISTING = """<div class="cassetteitem">
+<div class="cassetteitem_content-title">{name}</div>
+<div class="cassetteitem_detail-col1">{station}</div>
+<table class="cassetteitem_other"><tbody>{rooms}</tbody></table>
+</div>"""
+ROOM = """<tr><td></td><td>{floor}階</td><td>{plan}</td><td><ul><li>{price}万円</li><li>0.3万円</li></ul></td><td><a href="#">詳細</a></td></tr>"""
+
+
+def make_suumo_files(folder, n_files, per_page=30, rooms=3):
+    """一覧ページに似せた HTML を書き出し、(run_id, ページ番号, パス) のリストを返す"""
+    rnd = random.Random(0)
+    stations = ["JR山手線/渋谷駅 歩5分", "東急東横線/代官山駅 歩8分", "京王井の頭線/神泉駅 歩3分"]
+    plans = ["ワンルーム", "1K", "1DK", "1LDK", "2LDK"]
+    items = []
+    for page in range(1, n_files + 1):
+        listings = [
+            LISTING.format(
+                name=f"物件{page}-{i}", station=rnd.choice(stations),
+                rooms="".join(
+                    ROOM.format(floor=r + 1, plan=rnd.choice(plans), price=rnd.randint(50, 200) / 10)
+                    for r in range(rooms)
+                ),
+            )
+            for i in range(per_page)
+        ]
+        header = "<header>" + "<p>広告</p>" * 200 + "</header>"
+        path = os.path.join(folder, f"page_{page}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<html><body>{header}{''.join(listings)}</body></html>")
+        items.append(("2026-01-12", page, path))
+    return items
+
+
+def archive_files(folder, items):
+    """予報JSONのファイルをアーカイブに入れ、(府県コード, Ref) の items を返す"""
+    started = time.perf_counter()
+    raw = 0
+    with Archive(folder) as archive:
+        for code, path in items:
+            with open(path, "rb") as f:
+                body = f.read()
+            raw += len(body)
+            archive.append("jma.forecast", code, body)
+        appended = time.perf_counter() - started
+        records = archive.records("jma.forecast", disk_order=True)
+        stored = archive.stats()["stored_bytes"]
+        started = time.perf_counter()
+        for record in records:
+            archive.read(record)
+        read = time.perf_counter() - started
+    print(f"[archive] {archive.codec}: {raw / 1024:.0f}KiB → {stored / 1024:.0f}KiB（{stored / raw:.1%}）"
+          f"  追記 {raw / appended / 2**20:.1f}MiB/s  読み出し（mmap + 展開）{raw / read / 2**20:.1f}MiB/s")
+    return [(record.key, record.ref) for record in records]
+
+
+# --- ⏱ 計測 ---
+
+def run_serial(items, db_path, parse, open_db, write, finish):
+    """比べる用：1つのプロセスで解析と書き込みを順に行う（トランザクションは1つ）"""
+    started = time.perf_counter()
+    conn = open_db(db_path)
+    conn.isolation_level = None
+    rows = 0
+    conn.execute("BEGIN IMMEDIATE")
+    for item in items:
+        key, batch = parse(item)
+        write(conn, key, batch)
+        rows += len(batch)
+    conn.execute("COMMIT")
+    if finish is not None:
+        finish(conn)
+    conn.close()
+    return rows, time.perf_counter() - started
+
+
+def measure(label, items, parse, open_db, write, finish, workers_list, tmp):
+    print(f"[{label}] {len(items)} 件")
+    db_path = os.path.join(tmp, f"{label}-serial.db")
+    rows, seconds = run_serial(items, db_path, parse, open_db, write, finish)
+    print(f"  {'serial':>10}  {rows:>8} 行  {seconds:>7.2f}s  {rows / seconds:>10,.0f} rows/s")
+    for workers in workers_list:
+        db_path = os.path.join(tmp, f"{label}-{workers}.db")
+        stats, errors = ingest.ingest(items, db_path, parse, open_db, write, finish, workers=workers)
+        note = f"  失敗 {len(errors)}" if errors else ""
+        print(f"  {f'workers={workers}':>10}  {stats['rows']:>8} 行  {stats['seconds']:>7.2f}s  "
+              f"{stats['rows'] / stats['seconds']:>10,.0f} rows/s  (コミット {stats['commits']} 回){note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--archive", metavar="DIR", help="疑似データの代わりに使うアーカイブ")
+    options = parser.parse_args()
+    print(f"CPU: {os.cpu_count()} コア")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import ingest_forecasts
+        weather = (ingest_forecasts.parse_item, ingest_forecasts.open_db, ingest_forecasts.write, ingest_forecasts.finish)
+        if options.archive:
+            items = ingest_forecasts.archive_items(options.archive)
+            measure("weather (archive)", items, *weather, options.workers, tmp)
+        else:
+            items = make_weather_files(tmp, options.files)
+            measure("weather", items, *weather, options.workers, tmp)
+            items = archive_files(os.path.join(tmp, "archive"), items)
+            measure("weather (archive)", items, *weather, options.workers, tmp)
+
+        try:
+            import scraper
+        except ImportError as ex:
+            print(f"[suumo] 飛ばします（{ex.name} がありません）")
+            return
+        if options.archive:
+            with Archive(options.archive) as archive:
+                records = archive.records(scraper.ARCHIVE_SOURCE, disk_order=True)
+            items = [(r.key.rpartition("/")[0], int(r.key.rpartition("/")[2]), r.ref) for r in records]
+        else:
+            items = make_suumo_files(tmp, options.files)
+        measure("suumo", items, scraper.parse_saved_page, scraper.open_ingest_db,
+                scraper.write_page, None, options.workers, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""複数プロセスで解析し、1つのプロセスだけが SQLite に書き込む取り込みの仕組み
+
+HTML や JSON の解析は CPU を使うので、スレッドでは GIL のせいで1コアしか使えない。
+ここでは
+    メインプロセス       解析する材料（ファイルのパスや生のレスポンス）を ProcessPoolExecutor に渡す
+    解析プロセス × N     parse(item) で行のまとまりに変換し、書き込み用のキューに直接入れる
+    書き込みプロセス × 1  キューから受け取った行を、commit_every 行ごとの大きなトランザクションで保存する
+と分ける。解析した行はメインプロセスを通らない。SQLite への書き込みは1本の接続に集まるので、ロックの取り合いも起きない。
+
+使い方（parse / open_db / write / finish はモジュールの関数。別プロセスに名前で渡すため lambda は不可）
+
+    with Ingestor(db_path, parse, open_db, write, workers=4) as ingestor:
+        for path in paths:
+            ingestor.submit(path)
+    print(ingestor.stats)
+
+    parse(item)              -> (key, rows)   解析プロセスで呼ばれる。key は書き込み側に渡す目印（ページ番号など）
+    open_db(db_path)         -> conn          書き込みプロセスで1回だけ呼ばれる（テーブルの準備もここで）
+    write(conn, key, rows)   -> 変えた行数     トランザクションの中で呼ばれる（BEGIN / COMMIT は呼ばない）
+    finish(conn)                              最後のコミットのあとに1回呼ばれる（集計の更新など。省略可）
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+DEFAULT_COMMIT_EVERY = 20000   # 行
+DEFAULT_QUEUE_SIZE = 64        # 書き込み待ちの行のまとまりの数（書き込みが遅いときは解析側が待つ）
+_STOP = None
+
+
+# --- 🔧 解析プロセス ---
+
+_parse = None
+_rows_queue = None
+
+
+def _init_worker(parse, rows_queue):
+    global _parse, _rows_queue
+    _parse = parse
+    _rows_queue = rows_queue
+
+
+def _parse_one(item):
+    """1件を解析して書き込みプロセスへ送る。メインプロセスには行数だけを返す"""
+    key, rows = _parse(item)
+    _rows_queue.put((key, rows))
+    return len(rows)
+
+
+# --- 🗄 書き込みプロセス ---
+
+def _writer_main(db_path, open_db, write, finish, rows_queue, result_conn, commit_every):
+    stats = {"rows": 0, "changed": 0, "batches": 0, "commits": 0}
+    conn = None
+    try:
+        conn = open_db(db_path)
+        conn.isolation_level = None  # BEGIN / COMMIT はここで呼ぶ
+        pending = 0
+        conn.execute("BEGIN IMMEDIATE")
+        while True:
+            message = rows_queue.get()
+            if message is _STOP:
+                break
+            key, rows = message
+            stats["changed"] += write(conn, key, rows) or 0
+            stats["rows"] += len(rows)
+            stats["batches"] += 1
+            pending += len(rows)
+            if pending >= commit_every:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN IMMEDIATE")
+                stats["commits"] += 1
+                pending = 0
+        conn.execute("COMMIT")
+        stats["commits"] += 1
+        if finish is not None:
+            finish(conn)
+        result_conn.send(("ok", stats))
+    except BaseException as ex:
+        if conn is not None and conn.in_transaction:
+            conn.execute("ROLLBACK")
+        result_conn.send(("error", f"{type(ex).__name__}: {ex}"))
+    finally:
+        if conn is not None:
+            conn.close()
+        result_conn.close()
+
+
+# --- 🚀 取り込み ---
+
+class Ingestor:
+    """解析プロセスの pool と書き込みプロセスをまとめて管理する
+
+    submit() は解析中の件数が workers * 4 を超えないように待つので、材料をいくらでも流し込める。
+    解析に失敗した材料は errors に (item, 例外) で残り、残りの取り込みは続ける。
+    """
+
+    def __init__(self, db_path, parse, open_db, write, finish=None, workers=None,
+                 commit_every=DEFAULT_COMMIT_EVERY, queue_size=DEFAULT_QUEUE_SIZE, context=None):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = self.workers * 4
+        self.errors = []
+        self.stats = None
+        self.parsed_rows = 0
+        self._ctx = context or multiprocessing.get_context()
+        self._queue = self._ctx.Queue(maxsize=queue_size)
+        self._result_recv, result_send = self._ctx.Pipe(duplex=False)
+        self._writer = self._ctx.Process(
+            target=_writer_main, name="ingest-writer",
+            args=(db_path, open_db, write, finish, self._queue, result_send, commit_every),
+        )
+        self._writer.start()
+        result_send.close()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._ctx,
+            initializer=_init_worker, initargs=(parse, self._queue),
+        )
+        self._in_flight = {}
+        self._started = time.perf_counter()
+
+    def _collect(self, return_when):
+        """解析の終わりを待って結果を集める
+
+        書き込みプロセスが止まると解析プロセスがキューの空きを待ったままになるので、
+        ときどき書き込みプロセスが生きているかを確かめる。
+        """
+        while self._in_flight:
+            done, _ = wait(self._in_flight, timeout=1.0, return_when=return_when)
+            for future in done:
+                item = self._in_flight.pop(future)
+                try:
+                    self.parsed_rows += future.result()
+                except Exception as ex:
+                    self.errors.append((item, ex))
+            if done and return_when == FIRST_COMPLETED:
+                return
+            if not done and not self._writer.is_alive():
+                self.abort()
+                raise RuntimeError(f"書き込みプロセスが終了しました（終了コード {self._writer.exitcode}）")
+
+    def submit(self, item):
+        """材料を1件渡す（解析中が多すぎるときは、どれかが終わるまで待つ）"""
+        if len(self._in_flight) >= self.max_in_flight:
+            self._collect(FIRST_COMPLETED)
+        self._in_flight[self._pool.submit(_parse_one, item)] = item
+
+    def close(self):
+        """解析と書き込みが終わるのを待ち、集計（stats）を返す"""
+        if self.stats is not None:
+            return self.stats
+        self._collect(ALL_COMPLETED)
+        self._pool.shutdown(wait=True)
+        self._queue.put(_STOP)
+        try:
+            status, result = self._result_recv.recv()
+        except EOFError:
+            status, result = "error", f"書き込みプロセスが終了しました（終了コード {self._writer.exitcode}）"
+        self._writer.join()
+        self._queue.close()
+        if status != "ok":
+            raise RuntimeError(f"書き込みに失敗しました: {result}")
+        result["seconds"] = time.perf_counter() - self._started
+        result["errors"] = len(self.errors)
+        self.stats = result
+        return result
+
+    def abort(self):
+        """取り込みを途中でやめる（書き込み中のトランザクションは捨てる）"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._writer.is_alive():
+            self._writer.terminate()
+        self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def ingest(items, db_path, parse, open_db, write, finish=None, workers=None, commit_every=DEFAULT_COMMIT_EVERY):
+    """items をすべて取り込み、(stats, errors) を返す"""
+    with Ingestor(db_path, parse, open_db, write, finish, workers, commit_every) as ingestor:
+        for item in items:
+            ingestor.submit(item)
+    return ingestor.stats, ingestor.errors
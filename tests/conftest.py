@@ -0,0 +1,81 @@
+"""テストの共通設定
+
+課題ごとのフォルダはパッケージになっていない（アプリも `python weather_app.py` のように直接起動する）ので、
+アプリと同じように各フォルダを sys.path に入れてから import する。
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("bench", "pipeline", "lecture-4", "最終課題", "個人課題３"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture
+def jma_server():
+    """気象庁の代わりのHTTPサーバー（bench/standins.py）を作る関数。テストの終わりに止める"""
+    import standins
+
+    servers = []
+
+    def start(**options):
+        server = standins.JmaServer(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def weather_app(jma_server, tmp_path, monkeypatch):
+    """個人課題３の天気アプリを、作業フォルダを tmp_path・気象庁を代役サーバーにして読み込む"""
+    import fetcher
+    from harness import load_app
+
+    # 個人課題2 にも weather_app.py があるので、名前を分けて読み込む
+    app = sys.modules.get("weather_app_sqlite") or load_app(
+        os.path.join(ROOT, "個人課題３", "weather_app.py"), "weather_app_sqlite")
+    server = jma_server()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fetcher, "FORECAST_BASE_URL", server.base_url)
+    monkeypatch.setattr(fetcher, "AREA_URL", server.area_url)
+    monkeypatch.setattr(fetcher, "archive", None)
+    monkeypatch.setattr(app, "ARCHIVE_DIR", "")
+    # 裏の更新は終わらないタスクなので止める
+    monkeypatch.setattr(app, "BACKGROUND_REFRESH", False)
+    for name in ("store", "response_cache", "area_index"):
+        monkeypatch.setattr(app, name, None)
+    app.server = server
+    yield app
+    if app.store is not None:
+        app.store.close()
+    if app.response_cache is not None:
+        app.response_cache.close()
+
+
+@pytest.fixture
+def driver():
+    """Flet のページを画面なしで動かす（bench/harness.py）"""
+    from harness import AppDriver
+
+    driver = AppDriver(max_workers=4, trace_memory=False)
+    yield driver
+    driver.close()
+
+
+@pytest.fixture
+def properties_db(tmp_path):
+    """疑似データの properties テーブル（最終課題/bench_search.py と同じデータ）のパス"""
+    from bench_search import make_db
+
+    path = str(tmp_path / "properties.db")
+    make_db(path, 3000).close()
+    return path
@@ -0,0 +1,138 @@
+"""analytics.py の集計表と、それを読むダッシュボード（最終課題可視化.py）"""
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+
+analytics = pytest.importorskip("analytics")   # numpy が必要
+
+COLUMNS = analytics.STATS_COLUMNS
+
+
+def full_summary(conn):
+    """全物件を読み直して集計した 'all' の行（以前のやり方。答え合わせ用）"""
+    rows = conn.execute("SELECT price, coalesce(age, -1) FROM properties WHERE price IS NOT NULL").fetchall()
+    prices, ages = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    return analytics.summarize(prices, ages)
+
+
+def stored(conn, kind, value=""):
+    return conn.execute(f"SELECT {COLUMNS} FROM price_stats WHERE kind = ? AND value = ?", (kind, value)).fetchone()
+
+
+def assert_same(row, expected):
+    assert row[2:-1] == pytest.approx(expected[:-1])
+    assert row[-1] == expected[-1]
+
+
+@pytest.fixture
+def conn(properties_db):
+    conn = sqlite3.connect(properties_db)
+    # 築年数や家賃が無い物件も混ぜる
+    conn.execute("UPDATE properties SET age = NULL WHERE id % 7 = 0")
+    conn.execute("UPDATE properties SET price = NULL WHERE id % 11 = 0")
+    conn.commit()
+    analytics.refresh(conn)
+    yield conn
+    conn.close()
+
+
+def test_overall_stats_match_a_full_reload(conn):
+    assert_same(stored(conn, "all"), full_summary(conn))
+
+
+def test_overall_stats_follow_changes_without_reading_every_row(conn):
+    conn.execute("UPDATE properties SET price = price + 150000 WHERE id <= 40")
+    conn.execute("DELETE FROM properties WHERE id BETWEEN 41 AND 80")
+    conn.execute("INSERT INTO properties (name, station, price, age, floor_plan) "
+                 "VALUES ('新築', 'JR山手線/渋谷駅 歩1分', 410000, 0, '5LDK')")
+    conn.commit()
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    analytics.refresh(conn)
+    conn.set_trace_callback(None)
+
+    assert_same(stored(conn, "all"), full_summary(conn))
+    # 'all' のために全物件を読む文（price の索引をたどる分位点以外）は無い
+    assert not [sql for sql in statements if "FROM properties" in sql
+                and "WHERE price IS NOT NULL AND" not in sql and "LIMIT 2 OFFSET" not in sql
+                and "COUNT(*)" not in sql and "sqlite_master" not in sql]
+
+
+def test_percentiles_read_the_price_index(conn):
+    plans = [
+        conn.execute("EXPLAIN QUERY PLAN SELECT price FROM properties WHERE price IS NOT NULL "
+                     "ORDER BY price LIMIT 2 OFFSET 10").fetchall(),
+        conn.execute("EXPLAIN QUERY PLAN SELECT age FROM properties WHERE age >= 0 AND price IS NOT NULL "
+                     "ORDER BY age LIMIT 2 OFFSET 10").fetchall(),
+    ]
+    assert "COVERING INDEX idx_properties_price" in plans[0][0][-1]
+    assert "COVERING INDEX idx_properties_age_price" in plans[1][0][-1]
+
+
+def test_indexes_are_added_to_an_existing_summary(conn):
+    conn.execute("DROP INDEX idx_properties_price")
+    conn.execute("DROP INDEX idx_properties_age_price")
+    analytics.ensure_stats(conn)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_properties_price", "idx_properties_age_price"} <= names
+
+
+def test_overall_stats_disappear_with_the_last_listing(conn):
+    conn.execute("DELETE FROM properties")
+    conn.commit()
+    analytics.refresh(conn)
+    assert conn.execute("SELECT COUNT(*) FROM price_stats").fetchone()[0] == 0
+
+
+# --- 📊 ダッシュボード ---
+
+def open_dashboard(driver, tmp_path, monkeypatch, make_db):
+    import flet as ft
+    from harness import find_all, load_app
+
+    os.makedirs(tmp_path / "最終課題")
+    make_db(str(tmp_path / "最終課題" / "最終課題.db"))
+    monkeypatch.chdir(tmp_path)
+    app = load_app(os.path.join(ROOT, "最終課題", "最終課題可視化.py"), "property_dashboard_test")
+    refreshed = []
+    refresh = analytics.refresh
+
+    def recording_refresh(conn):
+        refreshed.append(conn)
+        return refresh(conn)
+
+    monkeypatch.setattr(analytics, "refresh", recording_refresh)
+    opened = []
+    connect = app.connect
+    monkeypatch.setattr(app, "connect", lambda *args: opened.append(connect(*args)) or opened[-1])
+    driver.start(app.main)
+    texts = [c.value for c in find_all(driver.page, ft.Text) if isinstance(c.value, str)]
+    for conn in opened:
+        conn.close()
+    return texts, refreshed, opened
+
+
+def test_dashboard_refreshes_stats_on_its_own_connection(driver, tmp_path, monkeypatch):
+    from bench_search import make_db
+
+    texts, refreshed, opened = open_dashboard(driver, tmp_path, monkeypatch, lambda path: make_db(path, 500).close())
+    assert len(refreshed) == 1 and refreshed[0] is not opened[0]
+    assert any(text.startswith("全データ 500 件") for text in texts)
+    assert any(text.startswith("全 500 件") for text in texts)   # 分析タブ（集計は開いた後に作られる）
+
+
+def test_dashboard_keeps_the_no_data_message(driver, tmp_path, monkeypatch):
+    def empty_db(path):
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE properties (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, station TEXT, "
+                     "price INTEGER, age INTEGER, floor_plan TEXT)")
+        conn.close()
+
+    texts, _, _ = open_dashboard(driver, tmp_path, monkeypatch, empty_db)
+    assert "データがありません。" in texts
+    assert not any(text.startswith("全データ") for text in texts)
@@ -0,0 +1,64 @@
+"""pipeline/archive.py のレスポンスのアーカイブ"""
+import pickle
+
+import pytest
+
+import archive as archive_module
+from archive import CODECS, Archive, read_ref
+
+FORECAST = '{"publishingOffice": "気象庁", "timeSeries": []}'.encode("utf-8")
+
+
+@pytest.fixture(params=sorted(CODECS))
+def archive(request, tmp_path):
+    archive = Archive(str(tmp_path / "archive"), codec=request.param, segment_bytes=200)
+    yield archive
+    archive.close()
+    archive_module.close_maps()
+
+
+def test_round_trip_and_deduplication(archive):
+    first = archive.append("jma.forecast", "130000", FORECAST, fetched_at=100.0)
+    archive.append("jma.forecast", "130000", FORECAST, fetched_at=200.0)   # 同じ中身は書き足さない
+    archive.append("jma.forecast", "270000", "大阪" * 10, fetched_at=150.0)
+    records = archive.records("jma.forecast")
+    assert [(r.key, r.fetched_at) for r in records] == [("130000", 100.0), ("270000", 150.0), ("130000", 200.0)]
+    assert records[0].id == first and records[0].ref == records[2].ref
+    assert archive.read(records[1]) == ("大阪" * 10).encode("utf-8")
+
+    stats = archive.stats()
+    assert stats["sources"] == {"jma.forecast": {"records": 3, "bytes": 2 * len(FORECAST) + 60}}
+    assert stats["stored_bytes"] == records[0].ref.length + records[1].ref.length
+
+
+def test_filters_and_latest(archive):
+    for t, key in enumerate(["130000", "270000", "130000"]):
+        archive.append("jma.forecast", key, f"{key} {t}", fetched_at=float(t))
+    archive.append("suumo.list", "2026-10-18/1", "<html></html>", fetched_at=1.5)
+    assert [r.key for r in archive.records(since=1.0, until=2.0)] == ["270000", "2026-10-18/1"]
+    assert archive.read(archive.latest("jma.forecast", "130000")) == b"130000 2"
+    assert archive.latest("jma.area", "area") is None
+
+
+def test_segments_roll_over_and_survive_reopening(archive, tmp_path):
+    bodies = [bytes(range(256)) * (i + 1) for i in range(4)]   # 圧縮しても segment_bytes を超える
+    for i, body in enumerate(bodies):
+        archive.append("raw", str(i), body, fetched_at=float(i))
+    archive.close()
+
+    reopened = Archive(archive.folder, codec=archive.codec)
+    try:
+        records = reopened.records("raw", disk_order=True)
+        assert len({r.ref.path for r in records}) > 1
+        # Ref だけを別プロセスに渡して読める（pickle できる）
+        assert [read_ref(pickle.loads(pickle.dumps(r.ref))) for r in records] == bodies
+        assert [body for _, body in reopened.replay("raw")] == bodies
+        reopened.append("raw", "4", b"next")
+        assert reopened.read(reopened.latest("raw", "4")) == b"next"
+    finally:
+        reopened.close()
+
+
+def test_unknown_codec_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Archive(str(tmp_path), codec="lz4")
@@ -0,0 +1,66 @@
+"""個人課題３/area_index.py の地域の階層と、それを使う起動の計測（bench/startup.py）"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from area_index import AreaIndex
+from conftest import ROOT
+from standins import make_area_json
+
+TOKYO = "130000"
+
+
+def test_index_walks_offices_to_municipalities():
+    data = make_area_json(n_areas=2, n_municipalities=3)
+    index = AreaIndex.from_json(data)
+    sub_areas = index.sub_areas(TOKYO)
+    assert [area.code for area in sub_areas] == data["offices"][TOKYO]["children"]
+    assert [area.name for area in index.municipalities(sub_areas[0].code)] == ["東京00市", "東京01市", "東京02市"]
+    assert index.sub_areas("999999") == []
+
+
+def test_index_round_trips_through_the_store(tmp_path):
+    from storage import WeatherStore
+
+    index = AreaIndex.from_json(make_area_json(n_areas=2))
+    store = WeatherStore(str(tmp_path / "weather.db"))
+    try:
+        store.save_areas(index.rows(), 100.0)
+        rows, fetched_at = store.load_areas()
+    finally:
+        store.close()
+    restored = AreaIndex.from_rows(rows)
+    assert fetched_at == 100.0 and len(restored) == len(index)
+    assert [a.code for a in restored.sub_areas(TOKYO)] == [a.code for a in index.sub_areas(TOKYO)]
+    class10 = index.sub_areas(TOKYO)[1].code
+    assert [a.name for a in restored.municipalities(class10)] == [a.name for a in index.municipalities(class10)]
+
+
+def test_weather_app_shows_every_sub_area(weather_app):
+    weather_app.init_db()
+    assert weather_app.load_area_index() is weather_app.area_index
+    assert weather_app.server.requests == 1   # area.json は代役サーバーから
+    sections = weather_app.refresh_area(TOKYO, "東京都", force=True)
+    assert [title for title, _, _ in sections] == [area.name for area in weather_app.area_index.sub_areas(TOKYO)]
+    assert sections[0][1] == "東京00市・東京01市・東京02市"
+    # 保存した階層は次の起動で読み直し、取りに行かない
+    weather_app.area_index = None
+    weather_app.load_area_index()
+    assert weather_app.area_index is not None and weather_app.server.requests == 2
+
+
+def test_startup_child_reads_the_area_hierarchy_from_the_stand_in(tmp_path):
+    out = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "bench", "startup.py"), "--child"],
+        cwd=tmp_path, capture_output=True, text=True, check=True, timeout=120,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["controls"] > 0
+    conn = sqlite3.connect(tmp_path / "weather.db")
+    try:
+        # 本物の気象庁に行っていれば（テストの環境では）取れず、階層は保存されない
+        assert conn.execute("SELECT COUNT(*) FROM jma_areas WHERE level = 'offices'").fetchone()[0] > 0
+    finally:
+        conn.close()
@@ -0,0 +1,73 @@
+"""lecture-4/calc_engine.py の計算エンジンと電卓のボタン操作"""
+import doctest
+from decimal import Decimal
+
+import pytest
+
+import calc_engine
+from calc_engine import CalcError, Calculator, evaluate, evaluate_many
+
+
+def test_docstring_examples():
+    failures, _ = doctest.testmod(calc_engine)
+    assert failures == 0
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("1 + 2 * 3", "7"),
+    ("(1 + 2) * 3", "9"),
+    ("200 + 10%", "220"),
+    ("200 - 10%", "180"),
+    ("50% * 4", "2"),
+    ("-50%", "-0.5"),
+    ("0.1 + 0.2", "0.3"),
+    ("2.50 * 1", "2.5"),
+    ("100 * 100", "10000"),
+    ("8 - -2", "10"),
+])
+def test_evaluate(expr, expected):
+    result = evaluate(expr)
+    assert str(result) == expected   # 220.0 や 1E+4 のような形にはしない
+
+
+@pytest.mark.parametrize("expr", ["1 +", "(1 + 2", "1 + 2)", "2 3", "%5", "import os", "* 2"])
+def test_invalid_expressions(expr):
+    with pytest.raises(CalcError):
+        evaluate(expr)
+
+
+def test_evaluate_many_keeps_going_after_errors():
+    results, errors = evaluate_many(["1/0", "1 +", "6/4"])
+    assert results == [None, None, Decimal("1.5")]
+    assert errors == {0: "0で割ることはできません", 1: "式が正しくありません"}
+
+
+def press_all(calculator, keys):
+    for key in keys:
+        shown = calculator.press(key)
+    return shown
+
+
+def test_calculator_history():
+    calculator = Calculator(history_size=2)
+    assert press_all(calculator, ["2", "0", "0", "+", "1", "0", "%", "="]) == "220"
+    # 結果のまま = を押しても、履歴は増えない
+    assert press_all(calculator, ["=", "="]) == "220"
+    assert list(calculator.history) == [("200+10%", "220")]
+    assert press_all(calculator, ["*", "2", "="]) == "440"
+    assert press_all(calculator, ["7", "="]) == "7"
+    assert list(calculator.history) == [("220*2", "440"), ("200+10%", "220")]
+
+
+def test_calculator_sign_and_operator_replacement():
+    calculator = Calculator()
+    assert press_all(calculator, ["5", "+", "*", "3", "+/-"]) == "5*-3"
+    assert press_all(calculator, ["+/-", "="]) == "15"
+    assert press_all(calculator, ["1", "/", "0", "="]) == "0で割ることはできません"
+    assert calculator.display == "0" and len(calculator.history) == 1
+
+
+def test_percent_right_after_an_operator_is_ignored():
+    calculator = Calculator()
+    assert press_all(calculator, ["5", "+", "%"]) == "5+"
+    assert press_all(calculator, ["1", "0", "%", "="]) == "5.5"
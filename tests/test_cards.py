@@ -0,0 +1,41 @@
+"""cards.py（天気アイコンのキャッシュとカードの使い回し）"""
+import flet as ft
+
+from cards import ForecastCard, SectionPool, get_weather_icon
+
+ROWS = [("2026-10-18T00:00:00+09:00", "晴れ　時々　くもり", "12", "22"),
+        ("2026-10-19T00:00:00+09:00", "くもり　一時　雨", "13", "20")]
+
+
+def test_weather_icon_is_memoized():
+    get_weather_icon.cache_clear()
+    assert get_weather_icon("晴れ　時々　くもり") == ft.Icons.WB_SUNNY
+    assert get_weather_icon("くもり　一時　雨") == ft.Icons.UMBRELLA
+    assert get_weather_icon("晴れ　時々　くもり") == ft.Icons.WB_SUNNY
+    info = get_weather_icon.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_card_reports_only_changed_controls():
+    card = ForecastCard()
+    assert len(card.set(*ROWS[0])) == 5
+    assert card.set(*ROWS[0]) == []
+    assert card.set(ROWS[0][0], ROWS[0][1], "10", "22") == [card.min_text]
+
+
+def test_section_pool_reuses_cards_between_areas(driver):
+    display = ft.Column()
+    driver.page.add(display)
+    pool = SectionPool(driver.page, display)
+
+    pool.show([("東京地方", None, ROWS)])
+    columns = list(display.controls)
+    cards = [card for _, _, _, cards in pool.sections for card in cards.cards]
+
+    # 同じ枚数なら部品を作り直さず、変わった値だけを送る
+    warmer = ROWS[1][:3] + ("21",)
+    assert pool.show([("東京地方", None, [ROWS[0], warmer])]) == 1
+    assert display.controls == columns
+    assert [card for _, _, _, cards in pool.sections for card in cards.cards] == cards
+    assert pool.sections[0][3].cards[1].max_text.value == "21°C"
+    assert pool.show([("東京地方", None, [ROWS[0], warmer])]) == 0
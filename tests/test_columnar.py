@@ -0,0 +1,75 @@
+"""columnar.py の列ごとの書き出しと読み込み"""
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+columnar = pytest.importorskip("columnar")   # numpy が必要
+
+
+@pytest.fixture
+def snapshot(properties_db, tmp_path):
+    conn = sqlite3.connect(properties_db)
+    conn.execute("UPDATE properties SET age = NULL, floor_plan = NULL WHERE id % 9 = 0")
+    conn.commit()
+    out_dir = str(tmp_path / "snapshot" / "properties")
+    assert columnar.export(conn, "properties", out_dir, chunk_rows=700) == 3000
+    rows = conn.execute("SELECT id, name, station, price, age, floor_plan FROM properties").fetchall()
+    conn.close()
+    return columnar.load(out_dir), rows
+
+
+def test_round_trip_matches_the_table(snapshot):
+    snap, rows = snapshot
+    ids, names, stations, prices, ages, plans = zip(*rows)
+    assert len(snap) == 3000
+    assert snap.columns == ["id", "name", "station", "price", "age", "floor_plan"]
+    assert isinstance(snap["price"], np.memmap) and not snap["price"].flags.writeable
+    assert snap["price"].tolist() == list(prices)
+    assert snap["name"].decode().tolist() == list(names)
+    assert snap["floor_plan"].decode().tolist() == list(plans)
+    # NULL は別のマスクで持つ（NULL の無い列はマスクを作らない）
+    assert snap.nulls("price") is None
+    assert np.flatnonzero(snap.nulls("age")).tolist() == [i for i, age in enumerate(ages) if age is None]
+
+
+def test_dict_column_compares_by_code(snapshot):
+    snap, rows = snapshot
+    plans = [row[5] for row in rows]
+    assert (snap["floor_plan"] == "1K").sum() == plans.count("1K")
+    assert not (snap["floor_plan"] == "存在しない間取り").any()
+    assert snap["floor_plan"].decode(slice(0, 10)).tolist() == plans[:10]
+
+
+def test_export_selects_columns_and_replaces_the_old_version(properties_db, tmp_path):
+    out_dir = str(tmp_path / "prices")
+    conn = sqlite3.connect(properties_db)
+    columnar.export(conn, "properties", out_dir)
+    conn.execute("DELETE FROM properties WHERE id > 100")
+    conn.commit()
+    assert columnar.export(conn, "properties", out_dir, columns=["price"]) == 100
+    conn.close()
+    snap = columnar.load(out_dir, mmap=False)
+    assert snap.columns == ["price"] and len(snap["price"]) == 100
+    assert sorted(os.listdir(tmp_path)) == ["prices", "properties.db"]   # 一時ディレクトリは残らない
+
+
+def test_unknown_table_and_format(tmp_path, properties_db):
+    conn = sqlite3.connect(properties_db)
+    with pytest.raises(ValueError):
+        columnar.export(conn, "no_such_table", str(tmp_path / "x"))
+    conn.close()
+    os.makedirs(tmp_path / "future")
+    (tmp_path / "future" / "meta.json").write_text('{"format": 99}')
+    with pytest.raises(ValueError):
+        columnar.load(str(tmp_path / "future"))
+
+
+def test_to_pandas_keeps_nulls_and_categories(snapshot):
+    pytest.importorskip("pandas")
+    snap, rows = snapshot
+    frame = snap.to_pandas(["age", "floor_plan"])
+    assert frame["age"].isna().sum() == sum(row[4] is None for row in rows)
+    assert str(frame["floor_plan"].dtype) == "category"
+    assert frame["floor_plan"].isna().sum() == sum(row[5] is None for row in rows)
@@ -0,0 +1,81 @@
+"""fetcher.fetch_all を手元の代役サーバーに向けて確かめる"""
+import fetcher
+
+CODES = ["130000", "140000", "270000", "016000", "400000", "471000", "230000", "260000",
+         "110000", "120000", "280000", "340000"]
+
+
+def test_fetch_all_runs_requests_concurrently(jma_server, monkeypatch):
+    server = jma_server(latency=0.05)
+    monkeypatch.setattr(fetcher, "FORECAST_BASE_URL", server.base_url)
+
+    results, errors = fetcher.fetch_all(CODES, max_workers=4)
+
+    assert errors == {}
+    assert sorted(results) == sorted(CODES)
+    assert all(results[code][0]["publishingOffice"] for code in CODES)
+    assert 1 < server.max_active <= 4
+
+
+def test_fetch_all_reuses_the_shared_session_connections(jma_server):
+    server = jma_server(latency=0.02)
+
+    results, errors = fetcher.fetch_all(CODES, base_url=server.base_url, max_workers=3)
+
+    assert not errors and len(results) == len(CODES)
+    assert server.requests == len(CODES)
+    # keep-alive のコネクションを使い回すので、接続は同時接続数ぶんまでしか増えない
+    assert len(server.peers) <= 3
+
+
+def test_fetch_all_does_not_leave_sessions_behind(jma_server, monkeypatch):
+    server = jma_server()
+    real_create_session = fetcher.create_session
+    created, closed = [], []
+
+    def create_session(max_workers=fetcher.DEFAULT_MAX_WORKERS):
+        session = real_create_session(max_workers)
+        real_close = session.close
+
+        def close():
+            closed.append(session)
+            real_close()
+
+        session.close = close
+        created.append(session)
+        return session
+
+    monkeypatch.setattr(fetcher, "create_session", create_session)
+    monkeypatch.setattr(fetcher, "_session", None)
+
+    for _ in range(3):
+        fetcher.fetch_all(CODES[:4], base_url=server.base_url, max_workers=2)
+    # 毎回作らず、共有の Session を使い回す
+    assert created == [fetcher.get_session()] and closed == []
+
+    # 共有の Session の上限より多く並べるときだけ専用に作り、終わったら閉じる
+    fetcher.fetch_all(CODES[:4], base_url=server.base_url, max_workers=fetcher.DEFAULT_MAX_WORKERS + 4)
+    assert len(created) == 2 and closed == [created[1]]
+    created[0].close()
+
+
+def test_fetch_all_uses_the_session_it_is_given(jma_server):
+    server = jma_server()
+    session = fetcher.create_session(2)
+
+    for _ in range(2):
+        fetcher.fetch_all(CODES[:4], base_url=server.base_url, max_workers=2, session=session)
+
+    assert server.requests == 8
+    assert len(server.peers) <= 2
+    session.close()
+
+
+def test_one_failing_area_does_not_stop_the_others(jma_server):
+    server = jma_server(fail={"270000"})
+
+    results, errors = fetcher.fetch_all(CODES, base_url=server.base_url, max_workers=4)
+
+    assert list(errors) == ["270000"]
+    assert "500" in str(errors["270000"])
+    assert sorted(results) == sorted(code for code in CODES if code != "270000")
@@ -0,0 +1,59 @@
+"""bench/harness.py（画面なしでアプリを動かす仕組み）と bench/run.py"""
+import json
+import os
+
+import flet as ft
+import pytest
+
+from conftest import ROOT
+from harness import Interaction, find, load_app, percentile, summarize
+
+
+def test_percentile_and_summary():
+    assert percentile([0.5], 99) == 0.5
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    interactions = [Interaction("click", latency / 1000, 2, 2048, 10, 4096, []) for latency in range(1, 101)]
+    interactions.append(Interaction("open", 0.2, 30, 0, 10, 0, [RuntimeError()]))
+    summary = summarize(interactions)
+    assert list(summary) == ["click", "open"]
+    click = summary["click"]
+    assert click["n"] == 100 and click["max_ms"] == pytest.approx(100)
+    assert click["p50_ms"] == pytest.approx(50.5) and click["p99_ms"] == pytest.approx(99.01)
+    assert click["kib_sent"] == 2 and click["peak_kib"] == 4
+    assert summary["open"]["errors"] == 1
+
+
+def test_driver_counts_commands_and_controls(driver):
+    app = load_app(os.path.join(ROOT, "hello-world", "src", "main.py"), "hello_world_test")
+    driver.start(app.main)
+    button = driver.page.floating_action_button
+    for _ in range(3):
+        driver.click(button, name="increment")
+    assert find(driver.page, ft.Text, value="3")
+    opened, *clicks = driver.interactions
+    assert opened.name == "open" and opened.commands > 0 and opened.controls > 1
+    assert [it.name for it in clicks] == ["increment"] * 3
+    assert all(it.commands >= 1 and it.bytes > 0 and not it.errors for it in clicks)
+
+
+def test_driver_collects_handler_errors(driver):
+    def main(page):
+        def fail(e):
+            raise RuntimeError("boom")
+        page.add(ft.ElevatedButton("x", on_click=fail))
+
+    driver.start(main)
+    driver.click(find(driver.page, ft.ElevatedButton), name="broken")
+    assert [type(ex) for ex in driver.interactions[-1].errors] == [RuntimeError]
+
+
+def test_run_writes_json_and_profiles(tmp_path, capsys):
+    import run
+
+    out = tmp_path / "result.json"
+    results = run.main(["hello", "calc", "--repeat", "2", "--no-memory",
+                        "--json", str(out), "--profile", str(tmp_path / "prof"), "--top", "3"])
+    assert set(results) == {"hello", "calc"}
+    assert json.loads(out.read_text(encoding="utf-8"))["calc"]["key"]["n"] > 0
+    assert sorted(os.listdir(tmp_path / "prof")) == ["calc.prof", "hello.prof"]
+    assert "[calc]" in capsys.readouterr().out
@@ -0,0 +1,143 @@
+"""http_cache.ResponseCache を手元の代役サーバーに向けて確かめる"""
+import threading
+
+import pytest
+
+import fetcher
+import http_cache
+from http_cache import ResponseCache
+
+
+@pytest.fixture
+def session():
+    session = fetcher.create_session(4)
+    yield session
+    session.close()
+
+
+def test_ttl_hit_does_not_touch_the_network(jma_server, session, tmp_path):
+    server = jma_server()
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=600)
+    url = server.base_url + "130000.json"
+
+    data, changed = cache.fetch("130000", url, session)
+    cache.confirm("130000")
+    again, changed_again = cache.fetch("130000", url, session)
+
+    assert changed and not changed_again
+    assert again is data
+    assert server.requests == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_expired_entry_is_revalidated_with_304(jma_server, session, tmp_path):
+    server = jma_server()
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=0)
+    url = server.base_url + "130000.json"
+
+    cache.fetch("130000", url, session)
+    cache.confirm("130000")
+    data, changed = cache.fetch("130000", url, session)
+
+    assert not changed and data[0]["publishingOffice"]
+    assert server.requests == 2 and server.not_modified == 1
+    assert cache.stats()["revalidated"] == 1
+    cache.close()
+
+
+def test_304_after_restart_does_not_parse_when_not_needed(jma_server, session, tmp_path, monkeypatch):
+    server = jma_server()
+    path = str(tmp_path / "cache.db")
+    url = server.base_url + "130000.json"
+    cache = ResponseCache(path, ttl=0)
+    cache.fetch("130000", url, session)
+    cache.confirm("130000")
+    cache.close()
+
+    cache = ResponseCache(path, ttl=0)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("json.loads was called")
+
+    monkeypatch.setattr(http_cache.json, "loads", fail)
+    data, changed = cache.fetch("130000", url, session, parse_unchanged=False)
+
+    assert (data, changed) == (None, False)
+    assert server.not_modified == 1
+    cache.close()
+
+
+def test_content_is_registered_only_after_confirm(jma_server, session, tmp_path):
+    server = jma_server()
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=600)
+    url = server.base_url + "130000.json"
+
+    cache.fetch("130000", url, session)             # 保存に失敗したので confirm しない
+    data, changed = cache.fetch("130000", url, session)
+
+    assert changed and data[0]["publishingOffice"]
+    assert server.requests == 2 and server.not_modified == 0
+    assert cache.get("130000") is None
+    cache.confirm("130000")
+    cache.confirm("130000")                          # 登録待ちが無ければ何もしない
+    assert cache.fetch("130000", url, session) == (data, False)
+    assert server.requests == 2
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(jma_server, session, tmp_path):
+    server = jma_server()
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, ttl=600, max_entries=2)
+    for code in ("130000", "140000"):
+        cache.fetch(code, server.base_url + f"{code}.json", session)
+        cache.confirm(code)
+    cache.get("130000")
+    cache.fetch("270000", server.base_url + "270000.json", session)
+    cache.confirm("270000")
+
+    assert cache.get("140000") is None
+    assert cache.get("130000") is not None and cache.get("270000") is not None
+    cache.close()
+
+    # 再起動しても捨てたものは戻らない
+    cache = ResponseCache(path, ttl=600, max_entries=2)
+    assert cache.get("140000") is None and cache.stats()["entries"] == 2
+    cache.close()
+
+
+def test_hits_are_remembered_across_restarts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, max_entries=2)
+    cache.put("a", b"[1]")
+    cache.put("b", b"[2]")
+    changes = cache._conn.total_changes
+    cache.get("a")    # a のほうが最近使われた
+    assert cache._conn.total_changes == changes     # ヒットではコミットしない（close で書く）
+    cache.close()
+
+    cache = ResponseCache(path, max_entries=2)
+    cache.put("c", b"[3]")
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    cache.close()
+
+
+def test_counters_are_exact_under_concurrency(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=600)
+    cache.put("130000", b"[]")
+
+    def hit():
+        for _ in range(200):
+            cache.fetch("130000", "http://unused.invalid/", session=None)
+
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats()["hits"] == 800
+    cache.close()
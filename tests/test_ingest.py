@@ -0,0 +1,71 @@
+"""pipeline/ingest.py の複数プロセスの取り込みと、それを使う scraper.backfill"""
+import os
+import sqlite3
+
+import pytest
+
+import ingest
+from conftest import FIXTURES
+
+scraper = pytest.importorskip("scraper")   # requests と bs4 が必要
+
+DAY1 = [os.path.join(FIXTURES, "suumo", "day1", f"page_{n}.html") for n in (1, 2, 3)]
+
+
+def test_backfill_saves_pages_and_skips_them_next_time(tmp_path, capsys):
+    db_path = str(tmp_path / "suumo.db")
+    missing = str(tmp_path / "page_4.html")
+    stats, failed = scraper.backfill(DAY1 + [missing], db_path, run_id="backfill", workers=2,
+                                     commit_every=3, seen_on="2026-10-17")
+    assert failed == [("backfill", 4)]
+    # 9行のうち、2ページに載っていた物件は1回だけ書く
+    assert (stats["rows"], stats["changed"], stats["batches"], stats["errors"]) == (9, 8, 3, 1)
+    assert stats["commits"] >= 3
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert scraper.done_pages(conn, "backfill") == {1, 2, 3}
+        assert conn.execute("SELECT COUNT(*), MIN(last_seen), MAX(last_seen) FROM properties").fetchone() == (
+            8, "2026-10-17", "2026-10-17")
+        # 最後に集計も更新されている
+        assert conn.execute("SELECT n FROM price_stats WHERE kind = 'all'").fetchone() == (8,)
+    finally:
+        conn.close()
+
+    stats, failed = scraper.backfill(DAY1, db_path, run_id="backfill", workers=2)
+    assert stats["rows"] == 0 and failed == []
+    assert "Page 4 の解析に失敗" in capsys.readouterr().out
+
+
+# --- 書き込みプロセスが失敗したとき（別プロセスに名前で渡すので、モジュールの関数にする） ---
+
+def parse_number(item):
+    return item, [(item,)]
+
+
+def open_numbers(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS numbers (n INTEGER)")
+    return conn
+
+
+def write_numbers(conn, key, rows):
+    if key == 13:
+        raise ValueError("13 は書けません")
+    conn.executemany("INSERT INTO numbers VALUES (?)", rows)
+    return len(rows)
+
+
+def test_writer_failure_rolls_back_and_raises(tmp_path):
+    db_path = str(tmp_path / "numbers.db")
+    stats, errors = ingest.ingest(range(10), db_path, parse_number, open_numbers, write_numbers, workers=2)
+    assert (stats["rows"], stats["changed"], errors) == (10, 10, [])
+
+    with pytest.raises(RuntimeError, match="13 は書けません"):
+        ingest.ingest(range(10, 20), db_path, parse_number, open_numbers, write_numbers, workers=2)
+    conn = sqlite3.connect(db_path)
+    try:
+        # 失敗したトランザクションの分は残らない
+        assert conn.execute("SELECT COUNT(*) FROM numbers").fetchone()[0] == 10
+    finally:
+        conn.close()
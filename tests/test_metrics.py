@@ -0,0 +1,91 @@
+"""個人課題３/metrics.py の段階ごとの計測"""
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from metrics import _NULL_TIMER, Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    assert metrics.timer("db.get") is _NULL_TIMER
+    with metrics.timer("db.get"):
+        pass
+    metrics.count("error.Timeout")
+    metrics.observe("parse", 1.0)
+    assert metrics.snapshot() == {"stages": {}, "counters": {}, "gauges": {}}
+
+
+def test_stage_statistics_use_the_recent_samples():
+    metrics = Metrics(enabled=True, capacity=10)
+    for ms in range(1, 101):
+        metrics.observe("parse", ms / 1000)
+    with pytest.raises(KeyError):
+        with metrics.timer("parse"):
+            raise KeyError("x")
+    stage = metrics.snapshot()["stages"]["parse"]
+    # 回数・平均・最大はすべて、分位点は最後の capacity 件から
+    assert stage["count"] == 101 and stage["failed"] == 1
+    assert stage["max_ms"] == pytest.approx(100)
+    # 最後の10件は 92〜100ms と失敗した1回（ほぼ 0ms）
+    assert stage["p50_ms"] == pytest.approx(96)
+    assert stage["mean_ms"] == pytest.approx(50.5 * 100 / 101, rel=1e-3)
+
+
+def test_counters_are_thread_safe():
+    metrics = Metrics(enabled=True)
+
+    def work():
+        for _ in range(1000):
+            metrics.count("hits")
+            metrics.observe("db.get", 0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = metrics.snapshot()
+    assert snap["counters"] == {"hits": 8000}
+    assert snap["stages"]["db.get"]["count"] == 8000
+    metrics.reset()
+    assert metrics.snapshot()["counters"] == {}
+
+
+def test_collectors_and_exports(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.add_collector(lambda: {"cache.hits": 3, "db.path": "weather.db"})
+
+    def broken():
+        raise OSError("closed")
+
+    metrics.add_collector(broken)
+    metrics.observe("render", 0.002)
+    metrics.count("refresh.unchanged", 2)
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges == {"cache.hits": 3, "db.path": "weather.db", "collector_error.broken": "closed"}
+    text = metrics.to_prometheus()
+    assert 'weather_app_stage_count{stage="render"} 1' in text
+    assert 'weather_app_counter{name="refresh.unchanged"} 2' in text
+    assert 'weather_app_gauge{name="cache.hits"} 3' in text
+    assert "db.path" not in text   # 数値でない値は Prometheus には出さない
+    assert json.loads(open(metrics.dump(str(tmp_path / "m.json")), encoding="utf-8").read())["counters"]
+    assert open(metrics.dump(str(tmp_path / "m.prom")), encoding="utf-8").read() == text
+
+
+def test_serve_answers_both_formats():
+    metrics = Metrics(enabled=True)
+    metrics.count("hits")
+    port = metrics.serve(0)
+    try:
+        assert metrics.serve(0) == port
+        base = f"http://127.0.0.1:{port}"
+        with urllib.request.urlopen(base + "/metrics.json") as response:
+            assert json.load(response)["counters"] == {"hits": 1}
+        with urllib.request.urlopen(base + "/metrics") as response:
+            assert b'weather_app_counter{name="hits"} 1' in response.read()
+    finally:
+        metrics.close()
@@ -0,0 +1,45 @@
+"""parser.py（予報JSONを forecasts テーブルの行にするパーサー）"""
+from bench_parser import make_payload, old_parse_all_areas
+from parser import parse_batch, parse_forecast
+
+
+def test_parse_batch_matches_the_old_walk():
+    payloads = {f"{i:02d}0000": make_payload(n_areas=4, seed=i) for i in range(1, 6)}
+    batch, errors = parse_batch(payloads)
+
+    assert errors == {} and len(batch) == 20
+    expected = [row for code, data in payloads.items() for row in old_parse_all_areas(data, code)]
+    assert [row for i in range(len(batch)) for row in batch.rows(i)] == expected
+
+
+def test_office_items_store_the_first_area_under_the_office_code():
+    data = make_payload(n_areas=3, seed=1, office_code="130000")
+    batch = parse_forecast(data, "130000")
+    items = batch.office_items(0, area_name="東京都")
+
+    assert [rows[0][1:3] for rows, _ in items] == [
+        ("130000", "東京都"), ("130010", "地域0"), ("130020", "地域1"), ("130030", "地域2")]
+    assert [row[3:] for row in items[0][0]] == [row[3:] for row in items[1][0]]
+    assert {issued_at for _, issued_at in items} == {"2026-01-12T17:00:00+09:00"}
+
+
+def test_broken_office_leaves_no_partial_rows():
+    good = make_payload(n_areas=3, seed=1)
+    broken = make_payload(n_areas=3, seed=2)
+    broken[0]["timeSeries"][0]["areas"][2]["weathers"].pop()   # 3地域目だけ日数が足りない
+
+    batch, errors = parse_batch({"130000": good, "140000": broken, "270000": good})
+
+    assert list(errors) == ["140000"]
+    assert batch.office_codes == ["130000", "270000"]
+    assert len(batch) == len(batch.area_rows) == len(batch.area_names) == 6
+    assert batch.office_offset == [0, 3, 6]
+    assert batch.rows(3) == parse_forecast(good, "270000").rows(0)
+
+
+def test_missing_temperatures_are_stored_as_dashes():
+    data = make_payload(n_areas=1)
+    data[0]["timeSeries"][2]["areas"][0]["temps"] = ["", "-", "5", "12"]
+    batch = parse_forecast(data, "130000")
+
+    assert [row[4:] for row in batch.rows(0)] == [("-", "-"), ("5", "12"), ("-", "-")]
@@ -0,0 +1,98 @@
+"""property_db.py（キーセットページネーションと全文検索）"""
+import sqlite3
+
+import pytest
+
+import property_db
+from property_db import count_rows, fetch_page, fetch_page_before
+
+
+@pytest.fixture
+def conn(properties_db):
+    conn = property_db.connect(properties_db)
+    yield conn
+    conn.close()
+
+
+def _all_pages(conn, keyword, limit=50):
+    pages, after = [], None
+    while True:
+        rows = fetch_page(conn, keyword, after, limit)
+        if not rows:
+            return pages
+        pages.append(rows)
+        after = rows[-1]
+
+
+@pytest.mark.parametrize("keyword", ["", "柏", "上野", "渋谷", "新宿", "jr", "吉祥寺", "グリーンヒル"])
+def test_pages_cover_every_match_exactly_once(conn, keyword):
+    pages = _all_pages(conn, keyword)
+    ids = [row[0] for rows in pages for row in rows]
+
+    assert len(ids) == len(set(ids)) == count_rows(conn, keyword)
+    like = {row[0] for row in conn.execute(
+        "SELECT id FROM properties WHERE station LIKE ? OR name LIKE ?", (f"%{keyword}%",) * 2)}
+    assert set(ids) == like
+    if not keyword:
+        assert ids == sorted(ids, reverse=True)   # 新しく載った順
+
+
+@pytest.mark.parametrize("keyword", ["", "柏", "上野", "渋谷", "吉祥寺"])
+def test_previous_page_is_the_page_before(conn, keyword):
+    pages = _all_pages(conn, keyword)
+    for before, page in zip(pages, pages[1:]):
+        assert fetch_page_before(conn, keyword, page[0]) == before
+    assert fetch_page_before(conn, keyword, pages[0][0]) == []
+
+
+def test_full_text_search_orders_by_rank(conn):
+    rows = [row for rows in _all_pages(conn, "吉祥寺") for row in rows]
+    assert [(row[6], row[0]) for row in rows] == sorted((row[6], row[0]) for row in rows)
+    assert rows[0][6] < 0
+
+
+def test_full_text_index_follows_the_table(conn):
+    with conn:
+        conn.execute("INSERT INTO properties (name, station, price, age, floor_plan) "
+                     "VALUES ('テスト荘', 'JR中央線/国分寺駅 歩3分', 50000, 1, '1K')")
+    assert count_rows(conn, "国分寺") == count_rows(conn, "国分") == count_rows(conn, "荘") == 1
+    with conn:
+        conn.execute("UPDATE properties SET station = 'JR中央線/国立駅 歩3分' WHERE name = 'テスト荘'")
+    assert count_rows(conn, "国分寺") == count_rows(conn, "国分") == 0
+    assert count_rows(conn, "国立") == 1
+    with conn:
+        conn.execute("DELETE FROM properties WHERE name = 'テスト荘'")
+    assert count_rows(conn, "テスト荘") == count_rows(conn, "国立") == count_rows(conn, "荘") == 0
+    assert conn.execute("SELECT COUNT(*) FROM properties_bigram WHERE gram = 'テス'").fetchone()[0] == 0
+
+
+def test_bigram_index_is_added_to_a_database_that_already_has_fts(tmp_path):
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE properties (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, station TEXT, "
+                "price INTEGER, age INTEGER, floor_plan TEXT)")
+    old.execute("INSERT INTO properties (name, station) VALUES ('コーポ渋谷', 'JR山手線/渋谷駅 歩5分')")
+    with old:
+        for sql in property_db.FTS_SCHEMA:      # 2文字索引が入る前のDB
+            old.execute(sql)
+    old.close()
+
+    conn = property_db.connect(path)
+    assert count_rows(conn, "渋谷") == 1
+    assert [row[1] for row in fetch_page(conn, "渋")] == ["コーポ渋谷"]
+    conn.close()
+
+
+def test_keyset_pages_do_not_scan(conn):
+    def plan(sql, params):
+        return " / ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+    assert "SEARCH p USING INTEGER PRIMARY KEY" in plan(
+        f"SELECT {property_db.COLUMNS}, 0 FROM properties p WHERE p.id < ? ORDER BY p.id DESC LIMIT ?", (100, 50))
+    assert "VIRTUAL TABLE INDEX" in plan(
+        f"SELECT {property_db.COLUMNS}, f.rank FROM properties_fts f JOIN properties p ON p.id = f.rowid "
+        "WHERE properties_fts MATCH ? ORDER BY f.rank LIMIT 50", ('"吉祥寺"',))
+    where, params = property_db._bigram_where("渋谷")
+    bigram = plan(f"SELECT {property_db.COLUMNS}, 0 FROM properties p WHERE {where} AND p.id > ? "
+                  "ORDER BY p.id ASC LIMIT ?", params + [0, 50])
+    assert "SEARCH properties_bigram USING PRIMARY KEY" in bigram and "SCAN p" not in bigram
@@ -0,0 +1,96 @@
+"""個人課題３/scheduler.py の裏の更新"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scheduler import RefreshScheduler
+
+
+class BlockingRefresh:
+    """release() されるまで別スレッドで止まる refresh"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def __call__(self, area_code):
+        self.calls.append(area_code)
+        self.started.set()
+        self._release.wait(5)
+        if self.fail:
+            raise OSError("offline")
+        return f"sections {area_code}"
+
+    def release(self):
+        self._release.set()
+
+
+async def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_cancelled_refresh_stays_in_flight_until_the_thread_ends():
+    refresh = BlockingRefresh()
+    scheduler = RefreshScheduler(["130000", "270000"], refresh)
+
+    async def scenario():
+        first = asyncio.ensure_future(scheduler.refresh_now("130000"))
+        await asyncio.to_thread(refresh.started.wait, 5)
+        first.cancel()   # 別の地域が選ばれた
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # スレッドはまだ動いているので、裏の更新は同じ地域を選ばない
+        assert "130000" in scheduler._in_flight
+        assert scheduler._pick(time.time())[0] == "270000"
+        # もう一度選ばれたら、新しく取りに行かずに動いている更新を待つ
+        again = asyncio.ensure_future(scheduler.refresh_now("130000"))
+        await asyncio.sleep(0.05)
+        refresh.release()
+        assert await again == "sections 130000"
+        await wait_until(lambda: not scheduler._in_flight)
+
+    asyncio.run(scenario())
+    assert refresh.calls == ["130000"]
+    assert scheduler.checked_at("130000") is not None
+
+
+def test_failure_of_an_abandoned_refresh_is_still_recorded():
+    refresh = BlockingRefresh(fail=True)
+    scheduler = RefreshScheduler(["130000"], refresh, base_backoff=60)
+
+    async def scenario():
+        task = asyncio.ensure_future(scheduler.refresh_now("130000"))
+        await asyncio.to_thread(refresh.started.wait, 5)
+        task.cancel()
+        refresh.release()
+        await wait_until(lambda: not scheduler._in_flight)
+
+    asyncio.run(scenario())
+    assert scheduler.offline
+    assert scheduler.retry_in("130000") > 30
+    scheduler.mark_checked(["130000"], time.time())
+    assert not scheduler.offline and scheduler.retry_in("130000") == 0
+
+
+def test_background_loop_refreshes_recent_areas_first():
+    results = []
+    scheduler = RefreshScheduler(["010000", "130000", "270000"], lambda code: code, gap=0,
+                                 on_result=lambda code, result, error: results.append(result))
+    scheduler.touch("270000")
+
+    async def scenario():
+        task = asyncio.ensure_future(scheduler.run())
+        await wait_until(lambda: len(results) == 3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert results == ["270000", "010000", "130000"]
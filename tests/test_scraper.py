@@ -0,0 +1,214 @@
+"""scraper.py を、保存しておいた一覧ページ（tests/fixtures/suumo）を返す手元のサーバーに向けて確かめる"""
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from conftest import FIXTURES
+
+scraper = pytest.importorskip("scraper")   # requests と bs4 が必要
+
+PAGES = range(1, 4)
+
+
+class SuumoServer:
+    """一覧ページの代役。day のフォルダの page_<n>.html を返し、取得されたページを pages に記録する"""
+
+    def __init__(self):
+        self.day = "day1"
+        self.pages = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = parse_qs(urlsplit(self.path).query)["page"][0]
+                path = os.path.join(FIXTURES, "suumo", server.day, f"page_{page}.html")
+                server.pages.append(int(page))
+                if not os.path.exists(path):
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/jj/chintai/ichiran/FR301FC001/?ar=030&bs=040"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def suumo():
+    server = SuumoServer()
+    yield server
+    server.close()
+
+
+def scrape(server, db_path, **options):
+    options.setdefault("pages", PAGES)
+    return scraper.run(str(db_path), base_url=server.base_url, max_workers=1, min_interval=0, **options)
+
+
+def listings(db_path):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return {(name, floor_plan, price): (first, last) for name, floor_plan, price, first, last in conn.execute(
+            "SELECT name, floor_plan, price, first_seen, last_seen FROM properties")}
+    finally:
+        conn.close()
+
+
+def test_interrupted_run_resumes_from_the_next_page(suumo, tmp_path, monkeypatch):
+    db_path = tmp_path / "suumo.db"
+    parse_page = scraper.parse_page
+    calls = []
+
+    def interrupted(html):
+        calls.append(html)
+        if len(calls) == 3:      # 3ページ目の解析中に止める
+            raise KeyboardInterrupt
+        return parse_page(html)
+
+    monkeypatch.setattr(scraper, "parse_page", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        scrape(suumo, db_path, run_id="nightly", seen_on="2026-10-17")
+
+    conn = sqlite3.connect(str(db_path))
+    assert scraper.done_pages(conn, "nightly") == {1, 2}
+    conn.close()
+    # 同じ部屋が2ページに載っていても1件
+    assert len(listings(db_path)) == 5
+
+    # 次の日に再開しても、取り直すのは残りのページだけで、日付は最初の実行のまま
+    monkeypatch.setattr(scraper, "parse_page", parse_page)
+    suumo.pages.clear()
+    assert scrape(suumo, db_path, run_id="nightly", seen_on="2026-10-18") == 3
+    assert suumo.pages == [3]
+    conn = sqlite3.connect(str(db_path))
+    assert scraper.done_pages(conn, "nightly") == {1, 2, 3}
+    assert dict(conn.execute("SELECT page, rows FROM scrape_progress WHERE run_id = 'nightly'")) == {1: 3, 2: 2, 3: 3}
+    conn.close()
+    assert set(listings(db_path).values()) == {("2026-10-17", "2026-10-17")}
+
+
+def test_second_day_updates_last_seen_and_finds_delisted_rooms(suumo, tmp_path):
+    db_path = tmp_path / "suumo.db"
+    assert scrape(suumo, db_path, run_id="day-1", seen_on="2026-10-17") == 8
+
+    suumo.day = "day2"
+    # 変わらない物件は last_seen だけ、新しい物件は追加
+    assert scrape(suumo, db_path, run_id="day-2", seen_on="2026-10-18") == 7
+
+    rows = listings(db_path)
+    assert rows[("グリーンヒル渋谷", "1K", 92000)] == ("2026-10-17", "2026-10-18")
+    assert rows[("レジデンス広尾", "2LDK", 240000)] == ("2026-10-18", "2026-10-18")
+    conn = sqlite3.connect(str(db_path))
+    delisted = {(name, price) for _, name, _, price, _, _ in scraper.delisted_listings(conn, "2026-10-18")}
+    conn.close()
+    assert delisted == {("ハイツ中目黒", 81000), ("パレス恵比寿", 159000)}
+
+
+def test_same_day_rerun_writes_nothing(suumo, tmp_path):
+    db_path = tmp_path / "suumo.db"
+    scrape(suumo, db_path, run_id="a", seen_on="2026-10-17")
+    assert scrape(suumo, db_path, run_id="b", seen_on="2026-10-17") == 0
+
+
+def test_run_date_must_be_iso(suumo, tmp_path):
+    with pytest.raises(ValueError):
+        scrape(suumo, tmp_path / "suumo.db", run_id="x", seen_on="10/17/2026")
+
+
+def test_failed_page_is_retried_on_resume(suumo, tmp_path):
+    db_path = tmp_path / "suumo.db"
+    scrape(suumo, db_path, pages=range(1, 5), run_id="r", seen_on="2026-10-17")   # 4ページ目は 404
+    suumo.pages.clear()
+    scrape(suumo, db_path, pages=range(1, 5), run_id="r")
+    assert suumo.pages == [4]
+
+
+def test_default_rate_limit_is_polite():
+    assert scraper.DEFAULT_MIN_INTERVAL >= 3.0
+    limiter = scraper.RateLimiter(0.05)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.wait()
+    assert time.monotonic() - started >= 0.1
+
+
+# --- 🗄 UPSERT ---
+
+ROW = ("グリーンヒル渋谷", "渋谷駅 歩5分", 92000, 12, "1K")
+
+
+def test_save_rows_counts_only_changed_listings():
+    conn = sqlite3.connect(":memory:")
+    scraper.init_db(conn)
+    moved = ("メゾン代官山", "代官山駅 歩3分", 78000, 20, "ワンルーム")
+    # 同じ物件が2回出てきても1行、batch_size をまたいでも同じ
+    assert scraper.save_rows(conn, [ROW, moved, ROW], batch_size=2, seen_on="2026-10-17") == 2
+    assert scraper.save_rows(conn, [ROW, moved], seen_on="2026-10-17") == 0
+    # 次の日は last_seen だけ、築年数が変わった物件はその日のうちでも更新
+    assert scraper.save_rows(conn, [ROW], seen_on="2026-10-18") == 1
+    assert scraper.save_rows(conn, [moved[:3] + (21,) + moved[4:]], seen_on="2026-10-17") == 1
+    rows = dict((name, rest) for name, *rest in conn.execute(
+        "SELECT name, age, first_seen, last_seen FROM properties"))
+    assert rows == {"グリーンヒル渋谷": [12, "2026-10-17", "2026-10-18"],
+                    "メゾン代官山": [21, "2026-10-17", "2026-10-17"]}
+    # 値段が変わったら別の物件として追加される
+    assert scraper.save_rows(conn, [ROW[:2] + (90000,) + ROW[3:]], seen_on="2026-10-18") == 1
+    assert conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0] == 3
+
+
+def test_old_table_is_migrated_and_deduplicated():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE properties (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT, station TEXT, price INTEGER, age INTEGER, floor_plan TEXT
+        )
+    """)
+    other = ("コーポ神泉", "神泉駅 歩2分", 69000, 30, "1K")
+    conn.executemany("INSERT INTO properties (name, station, price, age, floor_plan) VALUES (?, ?, ?, ?, ?)",
+                     [ROW, other, ROW])
+    conn.commit()
+
+    scraper.init_db(conn)
+    rows = conn.execute("SELECT id, name, listing_key, first_seen = last_seen FROM properties ORDER BY id").fetchall()
+    key = scraper.listing_key(ROW[0], ROW[1], ROW[4], ROW[2])
+    assert rows == [(1, "グリーンヒル渋谷", key, 1), (2, "コーポ神泉", scraper.listing_key(*other[:2], other[4], other[2]), 1)]
+    # 2回目は何もしない。以後は UNIQUE な listing_key で UPSERT になる
+    scraper.init_db(conn)
+    assert scraper.save_rows(conn, [ROW], seen_on="2000-01-01") == 0
+    assert conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0] == 2
+
+
+# --- 📦 アーカイブからの取り込み直し ---
+
+def test_archived_pages_replay_into_a_fresh_database(suumo, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    scrape(suumo, tmp_path / "live.db", run_id="2026-10-17", seen_on="2026-10-17", archive_dir=archive_dir)
+    suumo.close()   # ネットワークには行かない（解析プロセスを fork する前にサーバーのスレッドも止めておく）
+
+    stats, failed = scraper.replay(archive_dir, str(tmp_path / "replayed.db"), workers=2)
+    assert failed == [] and stats["rows"] == 9
+    assert listings(tmp_path / "replayed.db") == listings(tmp_path / "live.db")
@@ -0,0 +1,63 @@
+"""search_cache.SearchCache（検索結果のキャッシュと絞り込み）"""
+import sqlite3
+
+import pytest
+
+import property_db
+from property_db import count_rows, fetch_page
+from search_cache import SearchCache
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "small.db"), check_same_thread=False)
+    conn.execute("CREATE TABLE properties (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, station TEXT, "
+                 "price INTEGER, age INTEGER, floor_plan TEXT)")
+    rows = [(f"コーポ{i}", f"つくばエクスプレス/つくば駅 歩{i}分", 50000 + i, i, "1K") for i in range(10)]
+    rows += [(f"ハイツ{i}", f"JR常磐線/土浦駅 歩{i}分", 60000 + i, i, "1K") for i in range(10)]
+    rows += [(f"つくしハイツ{i}", f"JR常磐線/牛久駅 歩{i}分", 70000 + i, i, "1K") for i in range(5)]
+    with conn:
+        conn.executemany("INSERT INTO properties (name, station, price, age, floor_plan) VALUES (?, ?, ?, ?, ?)", rows)
+    property_db.ensure_fts(conn)
+    yield conn
+    conn.close()
+
+
+def test_bigram_result_is_not_narrowed_into_a_full_text_result(conn):
+    cache = SearchCache(conn)
+    cache.search("つく")                 # 2文字なので2文字索引（全件そろっている）
+    total, rows = cache.search("つくば")   # 3文字からは全文検索
+
+    assert cache.narrowed == 0 and cache.misses == 2
+    assert (total, rows) == (count_rows(conn, "つくば"), fetch_page(conn, "つくば"))
+    # 次のページは rank で続けるので、rank は全文検索のもの
+    assert all(row[6] < 0 for row in rows)
+    assert fetch_page(conn, "つくば", rows[-1]) == []
+
+
+def test_full_text_result_is_narrowed_in_memory(conn):
+    cache = SearchCache(conn)
+    cache.search("つくば")
+    total, rows = cache.search("つくばエ")
+
+    assert cache.narrowed == 1
+    assert total == count_rows(conn, "つくばエ") == 10
+    assert {row[0] for row in rows} == {row[0] for row in fetch_page(conn, "つくばエ")}
+
+
+def test_like_result_is_narrowed_in_memory(conn):
+    cache = SearchCache(conn)
+    cache.search("土")
+    total, rows = cache.search("土浦")
+
+    assert cache.narrowed == 1
+    assert (total, rows) == (count_rows(conn, "土浦"), fetch_page(conn, "土浦"))
+
+
+def test_cache_is_dropped_when_the_table_changes(conn):
+    cache = SearchCache(conn)
+    assert cache.search("土浦")[0] == 10
+    with conn:
+        conn.execute("DELETE FROM properties WHERE name = 'ハイツ0'")
+    assert cache.search("土浦")[0] == 9
+    assert cache.hits == 0
@@ -0,0 +1,108 @@
+"""storage.WeatherStore（weather.db の読み書き）"""
+import threading
+
+import pytest
+
+from storage import WeatherStore
+
+TOKYO = [
+    ("2026-10-18T00:00:00+09:00", "130010", "東京地方", "晴れ", "12", "22"),
+    ("2026-10-19T00:00:00+09:00", "130010", "東京地方", "くもり", "13", "20"),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WeatherStore(str(tmp_path / "weather.db"), history=True)
+    yield store
+    store.close()
+
+
+def test_store_uses_wal_and_one_reader_per_thread(store):
+    assert store._writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert store._reader() is store._reader()
+
+    readers = []
+    thread = threading.Thread(target=lambda: readers.append(store._reader()))
+    thread.start()
+    thread.join()
+    assert readers[0] is not store._reader()
+    assert len(store._readers) == 2
+
+
+def test_upsert_only_rewrites_changed_rows(store):
+    store.save(TOKYO)
+    conn = store._writer
+    before = conn.total_changes
+    store.save(TOKYO)
+    assert conn.total_changes == before
+
+    store.save([TOKYO[0][:4] + ("10", "22")])
+    assert conn.total_changes == before + 1
+    assert store.get("130010")[0] == ("2026-10-18T00:00:00+09:00", "晴れ", "10", "22")
+
+
+def test_save_many_is_one_transaction(store):
+    broken = [("2026-10-18T00:00:00+09:00", "140010")]   # 列が足りない
+    with pytest.raises(Exception):
+        store.save_many([(TOKYO, None), (broken, None)])
+    assert store.get("130010") == []
+
+
+
+def _plan(conn, sql, params):
+    return " / ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def test_area_lookups_search_an_index(store):
+    from storage import SELECT_AREA_SQL, SELECT_LATEST_SQL, SELECT_RANGE_SQL
+
+    conn = store._reader()
+    assert "SEARCH forecasts USING COVERING INDEX idx_forecasts_area" in _plan(conn, SELECT_AREA_SQL, ("130010",))
+    assert "SCAN" not in _plan(conn, SELECT_LATEST_SQL, ("130010", "130010"))
+    assert "SCAN" not in _plan(conn, SELECT_RANGE_SQL, ("130010", "2026-10-01", "2026-10-31"))
+
+
+def test_history_keeps_every_issue_with_integer_temperatures(store):
+    store.save(TOKYO, "2026-10-18T05:00:00+09:00")
+    store.save([TOKYO[0][:4] + ("-", "23")], "2026-10-18T11:00:00+09:00")
+
+    assert store.get_latest("130010") == [("2026-10-18T00:00:00+09:00", "晴れ", None, 23)]
+    assert store.get_range("130010", "2026-10-18", "2026-10-18T23:59") == [
+        ("2026-10-18T00:00:00+09:00", "2026-10-18T05:00:00+09:00", "晴れ", 12, 22),
+        ("2026-10-18T00:00:00+09:00", "2026-10-18T11:00:00+09:00", "晴れ", None, 23),
+    ]
+
+
+def test_old_database_is_migrated(tmp_path):
+    import sqlite3
+
+    from storage import SCHEMA_VERSION
+
+    path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE forecasts (date TEXT, area_code TEXT, area_name TEXT, weather TEXT, "
+                 "temp_min TEXT, temp_max TEXT, PRIMARY KEY (date, area_code))")
+    conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?)", TOKYO)
+    conn.commit()
+    conn.close()
+
+    store = WeatherStore(path, history=True)
+    try:
+        conn = store._reader()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_forecasts_area'").fetchone()
+        assert [row[2:] for row in store.get_range("130010", "2026-10-18", "2026-10-20")] == [
+            ("晴れ", 12, 22), ("くもり", 13, 20),
+        ]
+    finally:
+        store.close()
+
+
+def test_checked_status_only_moves_forward(store):
+    store.save(TOKYO)
+    assert store.get_many_with_status("130010", []) == ({"130010": [row[0:1] + row[3:] for row in TOKYO]}, None)
+    store.mark_checked(["130010", "270000"], 200.0)
+    store.mark_checked(["130010"], 100.0)   # 古い確認時刻では戻さない
+    assert store.get_many_with_status("130010", [])[1] == 200.0
+    assert store.checked_all() == {"130010": 200.0, "270000": 200.0}
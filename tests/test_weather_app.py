@@ -0,0 +1,122 @@
+"""天気アプリ：クリックの処理を画面から切り離したこと（個人課題2 / 個人課題３）"""
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+
+import flet as ft
+import pytest
+
+from harness import find_all, load_app
+from standins import ROOT
+
+
+def test_area_click_returns_before_the_fetch_and_drops_stale_results(driver, monkeypatch):
+    app = load_app(os.path.join(ROOT, "個人課題2", "weather_app.py"), "weather_app_basic_test")
+    started = {code: threading.Event() for code in ("016000", "020000")}
+    release = {code: threading.Event() for code in ("016000", "020000")}
+
+    def fake_fetch_and_parse(area_code):
+        # 取得が始まったことを知らせ、テストが許すまで返さない
+        started[area_code].set()
+        assert release[area_code].wait(10)
+        return [("2026-10-18T00:00:00+09:00", f"晴れ {area_code}", "10", "20")]
+
+    monkeypatch.setattr(app, "fetch_and_parse", fake_fetch_and_parse)
+    driver.start(app.main)
+    first, second = find_all(driver.page, ft.ListTile)[:2]
+
+    def texts():
+        return [c.value for c in find_all(driver.page, ft.Text)]
+
+    # 取得が終わる前に、クリックした地域の題名が出ている
+    driver._dispatch(first, "click", "")
+    assert started["016000"].wait(10)
+    assert "札幌の天気予報" in texts() and "晴れ 016000" not in texts()
+    driver._dispatch(second, "click", "")
+    assert started["020000"].wait(10)
+    assert "青森の天気予報" in texts() and first.selected is False and second.selected is True
+
+    release["020000"].set()
+    driver._wait_idle(10)
+    assert "晴れ 020000" in texts()
+
+    # 遅れて届いた最初の地域の結果で上書きされない
+    # （既定の executor を閉じると、取得のスレッドが終わり、その結果がループに届くまで待てる）
+    release["016000"].set()
+    asyncio.run_coroutine_threadsafe(driver.loop.shutdown_default_executor(), driver.loop).result(10)
+    assert "晴れ 020000" in texts() and "晴れ 016000" not in texts()
+
+
+def test_refresh_area_reports_whether_the_forecast_changed(weather_app):
+    weather_app.init_db()
+
+    sections = weather_app.refresh_area("130000", "東京")
+    assert sections and all(rows for _, _, rows in sections)
+    assert weather_app.store.get("130000")
+
+    # キャッシュの TTL 内なので変化なし
+    assert weather_app.refresh_area("130000", "東京") is None
+    assert weather_app.refresh_area("130000", "東京", force=True) == sections
+    assert weather_app.server.requests == 1
+
+
+def test_forecast_that_failed_to_save_is_fetched_again(weather_app, monkeypatch):
+    store = weather_app.init_db()
+
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(store, "save_many_and_get", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        weather_app.refresh_area("130000", "東京")
+    monkeypatch.delattr(store, "save_many_and_get")
+
+    # 保存できなかった内容の ETag は覚えていないので、TTL 内でも 304 にならず受け取り直す
+    assert weather_app.refresh_area("130000", "東京")
+    assert weather_app.server.requests == 2 and weather_app.server.not_modified == 0
+    assert weather_app.refresh_area("130000", "東京") is None
+
+
+def test_refresh_all_saves_every_office_in_one_transaction(weather_app):
+    store = weather_app.init_db()
+    server = weather_app.server
+    server.fail.add("270000")                                          # 取得に失敗する府県
+    server._bodies["140000"] = (b'[{"timeSeries": []}]', '"broken"')   # パースできない府県
+    statements = []
+    store._writer.set_trace_callback(statements.append)
+
+    errors = weather_app.refresh_all(max_workers=4)
+
+    assert sorted(errors) == ["140000", "270000"]
+    # 予報を書いたトランザクションは1つだけ
+    transactions = " ".join(statements).split("BEGIN IMMEDIATE")[1:]
+    assert len([sql for sql in transactions if "INSERT INTO forecasts" in sql]) == 1
+    # 失敗した府県があっても、ほかの府県は保存されている
+    saved = [code for code in weather_app.AREA_NAMES if store.get(code)]
+    assert sorted(saved) == sorted(code for code in weather_app.AREA_NAMES if code not in errors)
+    assert store.get("130010")                                         # 一次細分区域の行も同じトランザクションで
+    store._writer.set_trace_callback(None)
+
+
+def test_sidebar_tiles_are_built_when_a_region_opens(weather_app, driver):
+    driver.start(weather_app.main)
+    assert find_all(driver.page, ft.ListTile) == []
+
+    group = find_all(driver.page, ft.ExpansionTile)[2]
+    driver.fire(group, "change", "true")
+    tiles = find_all(driver.page, ft.ListTile)
+    assert [tile.data for tile in tiles] == list(weather_app.PREFS[group.data].items())
+    # 閉じて開き直しても作り直さない
+    driver.fire(group, "change", "false")
+    driver.fire(group, "change", "true")
+    assert find_all(driver.page, ft.ListTile) == tiles
+
+
+def test_importing_the_app_does_not_load_the_http_stack():
+    code = "import sys, weather_app; print('requests' in sys.modules, 'urllib3' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(ROOT, "個人課題３"),
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["False", "False"]
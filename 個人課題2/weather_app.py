@@ -1,3 +1,4 @@
+import asyncio
 import requests
 import flet as ft
 
@@ -16,9 +17,31 @@ PREFS = {
 
 def get_forecast_data(area_code):
     """APIからデータを取得"""
-    response = requests.get(f"{FORECAST_BASE_URL}{area_code}.json")
+    response = requests.get(f"{FORECAST_BASE_URL}{area_code}.json", timeout=10)
     return response.json()
 
+def parse_forecast(data):
+    """JSONから (日付, 天気, 最低気温, 最高気温) のリストを作る"""
+    time_series = data[0]['timeSeries']
+    dates = time_series[0]['timeDefines']
+    weathers = time_series[0]['areas'][0]['weathers']
+    temps = []
+    for s in time_series:
+        if 'temps' in s['areas'][0]:
+            temps = s['areas'][0]['temps']
+            break
+
+    days = []
+    for i in range(len(weathers)):
+        t_min = temps[i*2] if len(temps) > i*2 else "-"
+        t_max = temps[i*2+1] if len(temps) > i*2 else "-"
+        days.append((dates[i], weathers[i], t_min, t_max))
+    return days
+
+def fetch_and_parse(area_code):
+    """取得と解析をまとめて行う（別スレッドで実行する想定）"""
+    return parse_forecast(get_forecast_data(area_code))
+
 def get_weather_icon(weather_text):
     """天気に合わせたアイコンを取得"""
     if "晴" in weather_text: return ft.Icons.WB_SUNNY
@@ -57,6 +80,28 @@ def main(page: ft.Page):
     # 選択中のListTileを記録
     current_tile = [None]
 
+    # 読み込み中の表示
+    loading = ft.ProgressRing(width=24, height=24, color="white", visible=False)
+
+    # 実行中の読み込みタスク（新しいクリックが来たらキャンセルする）
+    current_task = [None]
+
+    async def load_forecast(area_code, area_name):
+        loading.visible = True
+        page.update()
+
+        # 通信と解析は別スレッドで行い、画面を固まらせない
+        try:
+            days = await asyncio.to_thread(fetch_and_parse, area_code)
+            forecast_display.controls = [create_forecast_card(*day) for day in days]
+        except asyncio.CancelledError:
+            raise  # 新しい地域が選ばれたので、この結果は捨てる
+        except Exception:
+            forecast_display.controls = [ft.Text("読み込み失敗", color="red")]
+
+        loading.visible = False
+        page.update()
+
     def on_area_select(e, area_code, area_name):
         # 今まで選択していたものの色を戻す
         if current_tile[0]:
@@ -70,30 +115,12 @@ def main(page: ft.Page):
 
         # データの表示
         title_text.value = f"{area_name}の天気予報"
-        data = get_forecast_data(area_code)
-        
-        # 解析処理（簡単にするためここに記述）
-        try:
-            time_series = data[0]['timeSeries']
-            dates = time_series[0]['timeDefines']
-            weathers = time_series[0]['areas'][0]['weathers']
-            temps = []
-            for s in time_series:
-                if 'temps' in s['areas'][0]:
-                    temps = s['areas'][0]['temps']
-                    break
-            
-            new_cards = []
-            for i in range(len(weathers)):
-                t_min = temps[i*2] if len(temps) > i*2 else "-"
-                t_max = temps[i*2+1] if len(temps) > i*2 else "-"
-                new_cards.append(create_forecast_card(dates[i], weathers[i], t_min, t_max))
-            
-            forecast_display.controls = new_cards
-        except:
-            forecast_display.controls = [ft.Text("読み込み失敗", color="red")]
-        
-        page.update()
+        title_text.update()
+
+        # 前の地域の読み込みが終わっていなければキャンセル
+        if current_task[0] and not current_task[0].done():
+            current_task[0].cancel()
+        current_task[0] = page.run_task(load_forecast, area_code, area_name)
 
     # サイドバーのリスト作成
     sidebar_content = []
@@ -118,7 +145,7 @@ def main(page: ft.Page):
     )
 
     header = ft.Container(
-        content=ft.Row([ft.Icon(ft.Icons.WB_SUNNY, color="white"), title_text], alignment="start"),
+        content=ft.Row([ft.Icon(ft.Icons.WB_SUNNY, color="white"), title_text, loading], alignment="start"),
         bgcolor="#303F9F", padding=20 # ヘッダーを画像のような濃い青に
     )
 
@@ -0,0 +1,104 @@
+# 気象庁の地域の階層（area.json）を引くための索引
+#   centers（地方） → offices（府県予報区） → class10s（一次細分区域） → class15s → class20s（市町村など）
+# area.json は数百KBあるので、一度取得したら weather.db の jma_areas テーブルに保存して使い回す。
+# 同じコードが別の階層にも出てくる（例：奄美地方 460040 は offices にも class10s にもある）ので、
+# 引くときは (階層, コード) で指定する。どれも dict を1回引くだけ。
+
+LEVELS = ("centers", "offices", "class10s", "class15s", "class20s")
+
+
+class Area:
+    """area.json の1地域"""
+
+    __slots__ = ("level", "code", "name", "en_name", "parent", "children")
+
+    def __init__(self, level, code, name, en_name=None, parent=None, children=()):
+        self.level = level
+        self.code = code
+        self.name = name
+        self.en_name = en_name
+        self.parent = parent
+        self.children = tuple(children)
+
+    def __repr__(self):
+        return f"Area({self.level} {self.code} {self.name})"
+
+
+class AreaIndex:
+    """{階層: {コード: Area}} の索引"""
+
+    def __init__(self, areas=()):
+        self.levels = {level: {} for level in LEVELS}
+        for area in areas:
+            self.levels[area.level][area.code] = area
+
+    def __len__(self):
+        return sum(len(areas) for areas in self.levels.values())
+
+    @classmethod
+    def from_json(cls, data):
+        """area.json を読み込んだ dict から作る"""
+        return cls(
+            Area(level, code, info.get("name"), info.get("enName"), info.get("parent"), info.get("children", ()))
+            for level in LEVELS
+            for code, info in data.get(level, {}).items()
+        )
+
+    @classmethod
+    def from_rows(cls, rows):
+        """jma_areas テーブルの行 (level, code, name, en_name, parent) から作る
+
+        行は親の children の順に並んでいる前提（storage.load_areas がその順で返す）。
+        """
+        areas = [Area(level, code, name, en_name, parent) for level, code, name, en_name, parent in rows]
+        index = cls(areas)
+        children = {}
+        for area in areas:
+            if area.parent is not None:
+                children.setdefault((LEVELS[LEVELS.index(area.level) - 1], area.parent), []).append(area.code)
+        for (level, code), codes in children.items():
+            parent = index.get(level, code)
+            if parent is not None:
+                parent.children = tuple(codes)
+        return index
+
+    def rows(self):
+        """jma_areas テーブル用の行 (level, code, name, en_name, parent, ord)
+
+        ord は親の children の中での順番（上の階層の並び順を復元するため）。
+        """
+        order = {}
+        for level in LEVELS[:-1]:
+            child_level = LEVELS[LEVELS.index(level) + 1]
+            for area in self.levels[level].values():
+                for i, code in enumerate(area.children):
+                    order[(child_level, code)] = i
+        return [
+            (level, code, area.name, area.en_name, area.parent, order.get((level, code), i))
+            for level in LEVELS
+            for i, (code, area) in enumerate(self.levels[level].items())
+        ]
+
+    def get(self, level, code):
+        return self.levels[level].get(code)
+
+    def children(self, level, code):
+        """下の階層の Area のリスト（area.json の並び順）"""
+        area = self.levels[level].get(code)
+        if area is None:
+            return []
+        child_level = LEVELS[LEVELS.index(level) + 1]
+        areas = self.levels[child_level]
+        return [areas[c] for c in area.children if c in areas]
+
+    def sub_areas(self, office_code):
+        """府県予報区の一次細分区域（予報JSONの天気の地域と同じ単位）"""
+        return self.children("offices", office_code)
+
+    def municipalities(self, class10_code):
+        """一次細分区域に含まれる市町村など（class15s を通して class20s まで下りる）"""
+        return [
+            area
+            for class15 in self.children("class10s", class10_code)
+            for area in self.children("class15s", class15.code)
+        ]
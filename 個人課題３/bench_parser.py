@@ -0,0 +1,128 @@
+"""予報JSONパーサーのベンチマーク
+
+    python bench_parser.py [件数]
+
+旧実装（on_area_select 内の手書きの走査・文字列タプル）と parser.py を、
+47府県ぶんの疑似データで比べる。時間は timeit、メモリは tracemalloc のピーク。
+"""
+import random
+import sys
+import timeit
+import tracemalloc
+
+from parser import parse_batch
+
+
+def sub_area_codes(n_areas=4, office_code=None):
+    """疑似データの一次細分区域のコード（府県コードを渡すと、その府県ごとに別のコードにする）"""
+    if office_code is None:
+        return [f"{130010 + a * 10}" for a in range(n_areas)]
+    return [f"{office_code[:4]}{(a + 1) * 10:02d}" for a in range(n_areas)]
+
+
+def make_payload(n_areas=4, seed=0, office_code=None):
+    """気象庁の予報JSONと同じ形の疑似データ"""
+    rnd = random.Random(seed)
+    days = ["2026-01-12T17:00:00+09:00", "2026-01-13T00:00:00+09:00", "2026-01-14T00:00:00+09:00"]
+    pop_times = [f"2026-01-1{2 + i // 4}T{(i % 4) * 6:02d}:00:00+09:00" for i in range(6)]
+    temp_times = ["2026-01-13T00:00:00+09:00", "2026-01-13T09:00:00+09:00",
+                  "2026-01-14T00:00:00+09:00", "2026-01-14T09:00:00+09:00"]
+    weathers = ["晴れ　時々　くもり", "くもり　夜　雨", "雪　所により　ふぶく", "くもり　一時　雨"]
+
+    weather_areas = []
+    pop_areas = []
+    temp_areas = []
+    for a, code in enumerate(sub_area_codes(n_areas, office_code)):
+        weather_areas.append({
+            "area": {"name": f"地域{a}", "code": code},
+            "weatherCodes": [str(rnd.choice([100, 101, 200, 300, 400])) for _ in days],
+            "weathers": [rnd.choice(weathers) for _ in days],
+            "winds": ["北の風" for _ in days],
+        })
+        pop_areas.append({
+            "area": {"name": f"地域{a}", "code": code},
+            "pops": [str(rnd.randrange(0, 101, 10)) for _ in pop_times],
+        })
+        temp_areas.append({
+            "area": {"name": f"地点{a}", "code": f"{44132 + a}"},
+            "temps": [str(rnd.randint(-10, 35)) for _ in temp_times],
+        })
+
+    return [
+        {
+            "publishingOffice": "気象庁",
+            "reportDatetime": "2026-01-12T17:00:00+09:00",
+            "timeSeries": [
+                {"timeDefines": days, "areas": weather_areas},
+                {"timeDefines": pop_times, "areas": pop_areas},
+                {"timeDefines": temp_times, "areas": temp_areas},
+            ],
+        },
+        {"publishingOffice": "気象庁", "timeSeries": []},
+    ]
+
+
+def old_parse(data, area_code, area_name):
+    """旧実装（weather_app.py の on_area_select にあった処理）"""
+    time_series = data[0]['timeSeries']
+    dates = time_series[0]['timeDefines']
+    weathers = time_series[0]['areas'][0]['weathers']
+    temps = []
+    for s in time_series:
+        if 'temps' in s['areas'][0]:
+            temps = s['areas'][0]['temps']
+            break
+
+    forecast_list = []
+    for i in range(len(weathers)):
+        t_min = temps[i*2] if len(temps) > i*2 else "-"
+        t_max = temps[i*2+1] if len(temps) > i*2 else "-"
+        forecast_list.append((dates[i][:10], area_code, area_name, weathers[i], t_min, t_max))
+    return forecast_list
+
+
+def old_parse_all_areas(data, area_code):
+    """旧実装の書き方のまま、全地域を読んだ場合（parser.py と同じ行を作る）"""
+    time_series = data[0]['timeSeries']
+    dates = time_series[0]['timeDefines']
+    rows = []
+    for a, area in enumerate(time_series[0]['areas']):
+        weathers = area['weathers']
+        temps = []
+        for s in time_series:
+            if 'temps' in s['areas'][0]:
+                temps = s['areas'][a]['temps'] if a < len(s['areas']) else []
+                break
+        for i in range(len(weathers)):
+            t_min = temps[i*2] if len(temps) > i*2 and temps[i*2] else "-"
+            t_max = temps[i*2+1] if len(temps) > i*2 + 1 and temps[i*2+1] else "-"
+            rows.append((dates[i][:10], area['area']['code'], area['area']['name'], weathers[i], t_min, t_max))
+    return rows
+
+
+def measure(label, func, number):
+    seconds = timeit.timeit(func, number=number) / number
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {seconds * 1e3:8.3f} ms/回   ピーク {peak / 1024:8.1f} KiB")
+    return result
+
+
+def main(number=200):
+    payloads = {f"{i:02d}0000": make_payload(n_areas=4, seed=i) for i in range(1, 48)}
+    print(f"47府県 × 4地域の疑似データ、{number}回の平均")
+
+    measure("旧実装（先頭の地域のみ）", lambda: [old_parse(d, c, c) for c, d in payloads.items()], number)
+    measure("旧実装の書き方で全地域", lambda: [old_parse_all_areas(d, c) for c, d in payloads.items()], number)
+    batch = measure("parser.parse_batch（全地域）", lambda: parse_batch(payloads), number)[0]
+    measure("parse_batch + office_items()",
+            lambda: [b.office_items(k) for b in [parse_batch(payloads)[0]]
+                     for k in range(len(b.office_codes))], number)
+
+    print(f"変換できた地域: {len(batch)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,162 @@
+from functools import lru_cache
+
+import flet as ft
+
+# 予報カードの部品
+# 地域を切り替えるたびにカードを作り直すのではなく、
+# 一度作ったカードを使い回して、変わった文字やアイコンだけを書き換える
+
+
+# --- 天気アイコン ---
+
+@lru_cache(maxsize=512)
+def get_weather_icon(weather_text):
+    """天気に合わせたアイコンを取得
+
+    気象庁の天気の文言は種類が限られているので、結果をキャッシュしておく。
+    """
+    if "晴" in weather_text: return ft.Icons.WB_SUNNY
+    elif "雨" in weather_text: return ft.Icons.UMBRELLA
+    elif "曇" in weather_text or "くもり" in weather_text: return ft.Icons.CLOUD
+    elif "雪" in weather_text: return ft.Icons.AC_UNIT
+    return ft.Icons.HELP
+
+
+# --- 予報カード ---
+
+class ForecastCard:
+    """1日ぶんの予報カード。中の部品を覚えておき、値が変わったところだけ書き換える"""
+
+    def __init__(self):
+        self.date_text = ft.Text("", size=14, weight="bold", color="blue_grey_400")
+        self.icon = ft.Icon(ft.Icons.HELP, size=50, color="orange_400")
+        self.weather_text = ft.Text("", size=14, weight="bold", text_align="center")
+        self.min_text = ft.Text("", color="blue_600", size=18, weight="bold")
+        self.max_text = ft.Text("", color="red_600", size=18, weight="bold")
+        self.control = ft.Card(
+            elevation=4,
+            content=ft.Container(
+                content=ft.Column([
+                    self.date_text,
+                    self.icon,
+                    self.weather_text,
+                    ft.Row([
+                        self.min_text,
+                        ft.Text("/", size=18, color="grey"),
+                        self.max_text,
+                    ], alignment="center")
+                ], horizontal_alignment="center", spacing=10),
+                padding=20, width=170
+            )
+        )
+
+    def set(self, date_str, weather_text, temp_min, temp_max):
+        """値をセットし、変わった部品のリストを返す"""
+        changed = []
+        for control, value in (
+            (self.date_text, date_str[:10]),
+            (self.weather_text, weather_text),
+            (self.min_text, f"{temp_min}°C"),
+            (self.max_text, f"{temp_max}°C"),
+        ):
+            if control.value != value:
+                control.value = value
+                changed.append(control)
+        icon = get_weather_icon(weather_text)
+        if self.icon.name != icon:
+            self.icon.name = icon
+            changed.append(self.icon)
+        return changed
+
+
+class CardPool:
+    """表示先（Row など）のカードを使い回す
+
+    show() は足りない分だけカードを作り、枚数が変わったときだけ表示先ごと更新する。
+    枚数が同じなら、値の変わった部品だけを page.update() に渡す。
+    """
+
+    def __init__(self, page, display):
+        self.page = page
+        self.display = display
+        self.cards = []
+        self.shown = None  # 今 display に並んでいるカードの枚数（メッセージ表示中は None）
+
+    def fill(self, rows):
+        """値だけをセットし、送る必要のある部品のリストを返す（枚数が変わったときは表示先ごと）"""
+        while len(self.cards) < len(rows):
+            self.cards.append(ForecastCard())
+
+        changed = []
+        for card, row in zip(self.cards, rows):
+            changed.extend(card.set(row[0], row[1], row[2], row[3]))
+
+        if self.shown != len(rows):
+            self.display.controls = [card.control for card in self.cards[:len(rows)]]
+            self.shown = len(rows)
+            return [self.display]
+        return changed
+
+    def show(self, rows):
+        """(date, weather, temp_min, temp_max) のリストを表示する"""
+        changed = self.fill(rows)
+        if changed:
+            self.page.update(*changed)
+        return len(changed)
+
+    def show_message(self, text, color="red"):
+        """カードの代わりにメッセージを表示"""
+        self.display.controls = [ft.Text(text, color=color)]
+        self.shown = None
+        self.display.update()
+
+
+class SectionPool:
+    """見出し付きのカードの列を縦に並べて使い回す（府県の中の地域ごとの予報用）
+
+    show() に渡す sections は (見出し, 補足, 行のリスト) のリスト。
+    列の数が変わったときだけ表示先ごと更新し、同じなら変わった部品だけを送る。
+    """
+
+    def __init__(self, page, display):
+        self.page = page
+        self.display = display
+        self.sections = []  # (列全体の Column, 見出し, 補足, CardPool)
+        self.shown = None
+
+    def _add_section(self):
+        title = ft.Text("", size=18, weight="bold", color="blue_grey_700")
+        note = ft.Text("", size=12, color="blue_grey_400", visible=False)
+        row = ft.Row(wrap=True, spacing=20)
+        column = ft.Column([title, note, row], spacing=6)
+        self.sections.append((column, title, note, CardPool(self.page, row)))
+
+    def show(self, sections):
+        while len(self.sections) < len(sections):
+            self._add_section()
+
+        changed = []
+        for (_, title, note, pool), (title_value, note_value, rows) in zip(self.sections, sections):
+            note_value = note_value or ""
+            for control, value in ((title, title_value), (note, note_value)):
+                if control.value != value:
+                    control.value = value
+                    changed.append(control)
+            if note.visible != bool(note_value):
+                note.visible = bool(note_value)
+                changed.append(note)
+            changed.extend(pool.fill(rows))
+
+        if self.shown != len(sections):
+            self.display.controls = [column for column, *_ in self.sections[:len(sections)]]
+            self.shown = len(sections)
+            self.display.update()
+        elif changed:
+            self.page.update(*changed)
+        return len(changed)
+
+    def show_message(self, text, color="red"):
+        """カードの代わりにメッセージを表示"""
+        self.display.controls = [ft.Text(text, color=color)]
+        self.shown = None
+        self.display.update()
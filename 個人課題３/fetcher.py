@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+
+# 気象庁の予報JSONを並列でまとめて取得するためのモジュール
+# 1つの Session（keep-alive のコネクションプール）を全スレッドで共有し、
+# 同時接続数は max_workers で上限をかける
+# base_url を省略したときは、呼び出した時点の FORECAST_BASE_URL を使う（ベンチマークで差し替えられるように）
+# requests（urllib3・ssl・certifi まで読み込むので約0.1秒かかる）は、最初に Session を作るときに import する
+# archive（../pipeline/archive.py の Archive）を設定しておくと、取得できたレスポンスをそのまま残す
+
+FORECAST_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
+# 地域の階層（地方 → 府県予報区 → 一次細分区域 → 市町村など）
+AREA_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10
+
+archive = None
+
+
+def create_session(max_workers=DEFAULT_MAX_WORKERS):
+    """同時接続数ぶんのコネクションを使い回す Session を作成"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """アプリ全体で共有する Session を返す（初回だけ作成）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def archive_response(source, key, body):
+    """レスポンスをアーカイブに残す（失敗しても取得は続ける）"""
+    if archive is None:
+        return
+    try:
+        with metrics.timer("archive.append"):
+            archive.append(source, key, body)
+    except Exception as ex:
+        metrics.count(f"error.{type(ex).__name__}")
+        print(f"アーカイブに保存できませんでした: {ex}")
+
+
+def fetch_forecast(area_code, session=None, base_url=None, timeout=DEFAULT_TIMEOUT,
+                   cache=None, parse_unchanged=True):
+    """1地域ぶんの予報JSONを取得
+
+    戻り値は (data, changed)。cache（http_cache.ResponseCache）を渡すと
+    TTL / 条件付きリクエストで前回と同じ内容だった場合に changed が False になる。
+    そのときのデータが要らなければ parse_unchanged=False にする（data は None になる）。
+    changed=True の内容を保存できたら cache.confirm(area_code) を呼ぶ。
+    """
+    session = session or get_session()
+    url = f"{base_url or FORECAST_BASE_URL}{area_code}.json"
+    if cache is not None:
+        on_body = (lambda body: archive_response("jma.forecast", area_code, body)) if archive is not None else None
+        return cache.fetch(area_code, url, session, timeout=timeout, on_body=on_body,
+                           parse_unchanged=parse_unchanged)
+    with metrics.timer("http.request"):
+        response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    archive_response("jma.forecast", area_code, response.content)
+    with metrics.timer("json.decode"):
+        return response.json(), True
+
+
+def fetch_area_json(session=None, url=None, timeout=DEFAULT_TIMEOUT):
+    """地域の階層 area.json を取得（url を省略すると、呼び出した時点の AREA_URL）"""
+    session = session or get_session()
+    with metrics.timer("http.request"):
+        response = session.get(url or AREA_URL, timeout=timeout)
+    response.raise_for_status()
+    archive_response("jma.area", "area", response.content)
+    with metrics.timer("json.decode"):
+        return response.json()
+
+
+def fetch_all(area_codes, base_url=None, max_workers=DEFAULT_MAX_WORKERS,
+              timeout=DEFAULT_TIMEOUT, session=None, cache=None):
+    """複数地域の予報JSONを並列で取得する
+
+    戻り値は (結果 {area_code: data}, 失敗 {area_code: 例外}) のタプル。
+    全体の所要時間は「一番遅い1件」程度になる（max_workers 以上の件数なら段階的に）。
+    cache を渡した場合、前回から変化のなかった地域は結果に含めない（保存できた地域は cache.confirm する）。
+    """
+    area_codes = list(area_codes)
+    # 共有の Session を使う（同時接続数がその上限を超えるときだけ専用に作り、終わったら閉じる）
+    own_session = None
+    if session is None:
+        if max_workers > DEFAULT_MAX_WORKERS:
+            session = own_session = create_session(max_workers)
+        else:
+            session = get_session()
+
+    def task(code):
+        # 変化のなかった地域は結果に入れないので、パースもしない
+        return fetch_forecast(code, session=session, base_url=base_url, timeout=timeout, cache=cache,
+                              parse_unchanged=False)
+
+    results = {}
+    errors = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {code: pool.submit(task, code) for code in area_codes}
+            for code, future in futures.items():
+                try:
+                    data, changed = future.result()
+                except Exception as ex:
+                    errors[code] = ex
+                    continue
+                if changed:
+                    results[code] = data
+    finally:
+        if own_session is not None:
+            own_session.close()
+    return results, errors
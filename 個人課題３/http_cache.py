@@ -0,0 +1,226 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+# 予報JSONのレスポンスキャッシュ
+# 気象庁の予報は1日に数回しか更新されないので、
+#   - TTL 内ならネットワークに行かずにそのまま返す
+#   - TTL 切れなら ETag / Last-Modified 付きの条件付きリクエストを送り、
+#     304 ならパース済みのデータを使い回す（JSONの再パースもしない）
+#   - 変化がなかったときにデータが要らない呼び出し（一括更新など）は parse_unchanged=False にすると、
+#     再起動直後でパース済みのデータがなくても JSON をパースしない
+#   - 新しい内容は、呼び出し側がパース・保存できたと confirm で知らせてから登録する
+#     （先に ETag を覚えると、保存に失敗しても次から 304 になり、その内容を二度と受け取れない）
+# エントリ数とバイト数の両方に上限があり、超えたら最も使われていないものから捨てる（LRU）
+# 使われた時刻（last_used）はメモリに覚えておき、登録・削除・close のついでに DB に書く
+# （ヒットのたびにコミットすると、毎回ディスクへの書き込みを待つことになる）
+
+DEFAULT_TTL = 600            # 秒
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "fetched_at", "data")
+
+    def __init__(self, body, etag, last_modified, fetched_at, data=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.data = data  # パース済みJSON（必要になるまで作らない）
+
+    def parsed(self):
+        if self.data is None:
+            self.data = json.loads(self.body)
+        return self.data
+
+
+class ResponseCache:
+    """地域コードをキーにした永続レスポンスキャッシュ"""
+
+    def __init__(self, path="http_cache.db", ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0          # TTL 内でそのまま返した回数
+        self.revalidated = 0   # 304 で使い回した回数
+        self.misses = 0        # 本文をダウンロードした回数
+
+        self._entries = OrderedDict()  # 末尾ほど最近使ったもの
+        self._bytes = 0
+        self._pending = {}   # key -> confirm 待ちの CacheEntry
+        self._touched = {}   # key -> まだ DB に書いていない last_used
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_used REAL
+            )
+        ''')
+        self._conn.commit()
+        self._load()
+
+    # --- 永続化 ---
+
+    def _load(self):
+        """前回までのエントリを使われた順に読み込む"""
+        rows = self._conn.execute(
+            'SELECT key, body, etag, last_modified, fetched_at FROM http_cache ORDER BY last_used ASC'
+        ).fetchall()
+        for key, body, etag, last_modified, fetched_at in rows:
+            self._entries[key] = CacheEntry(body, etag, last_modified, fetched_at)
+            self._bytes += len(body)
+        self._evict()
+
+    def _flush_touched(self):
+        """メモリに覚えている last_used を書く（self._conn のトランザクションの中で呼ぶ）"""
+        if self._touched:
+            self._conn.executemany('UPDATE http_cache SET last_used = ? WHERE key = ?',
+                                   [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def _store(self, key, entry):
+        with self._conn:
+            self._flush_touched()
+            self._conn.execute('''
+                INSERT OR REPLACE INTO http_cache (key, body, etag, last_modified, fetched_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, entry.body, entry.etag, entry.last_modified, entry.fetched_at, time.time()))
+
+    def _evict(self):
+        """上限を超えている間、古いものから捨てる"""
+        evicted = []
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= len(entry.body)
+            self._touched.pop(key, None)
+            evicted.append((key,))
+        if evicted:
+            with self._conn:
+                self._flush_touched()
+                self._conn.executemany('DELETE FROM http_cache WHERE key = ?', evicted)
+
+    def _insert(self, key, entry):
+        """エントリを登録する（lock を持った状態で呼ぶ）"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        self._store(key, entry)
+        self._evict()
+
+    # --- 公開API ---
+
+    def get(self, key):
+        """エントリを返す（無ければ None）。LRU の順番も更新する（DB には次に書くときにまとめて残す）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._touched[key] = time.time()
+            return entry
+
+    def put(self, key, body, etag=None, last_modified=None, data=None):
+        """レスポンス本文を登録"""
+        entry = CacheEntry(body, etag, last_modified, time.time(), data)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._insert(key, entry)
+        return entry
+
+    def confirm(self, key):
+        """fetch が changed=True で返した内容を保存できたら呼ぶ（ここで初めて ETag などを登録する）
+
+        呼ばないまま（パースや保存に失敗したとき）なら、次の fetch も前回の内容で確かめに行くので、
+        同じ内容をもう一度 changed=True で受け取れる。登録待ちが無ければ何もしない。
+        """
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                self._insert(key, entry)
+
+    def fetch(self, key, url, session, timeout=10, on_body=None, parse_unchanged=True):
+        """キャッシュ経由で取得する
+
+        戻り値は (data, changed)。changed が False のときは前回（confirm した内容）と同じ。
+        changed=True の内容は、保存できたら confirm(key) を呼ぶまでキャッシュに登録しない。
+        parse_unchanged=False なら、前回と同じ内容のときは data を None にする（パースしない）。
+        on_body(bytes) は中身を受け取ったとき（200）だけ呼ばれる（アーカイブに残す用）。
+        """
+        entry = self.get(key)
+        now = time.time()
+        if entry is not None and now - entry.fetched_at < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return (entry.parsed() if parse_unchanged else None), False
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        with metrics.timer("http.request"):
+            response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self.revalidated += 1
+                entry.fetched_at = now
+                self._store(key, entry)
+            return (entry.parsed() if parse_unchanged else None), False
+
+        response.raise_for_status()
+        with self._lock:
+            self.misses += 1
+        if on_body is not None:
+            on_body(response.content)
+        with metrics.timer("json.decode"):
+            data = response.json()
+        entry = CacheEntry(response.content, response.headers.get("ETag"),
+                           response.headers.get("Last-Modified"), time.time(), data)
+        with self._lock:
+            self._pending[key] = entry
+        return data, True
+
+    def stats(self):
+        """ヒット率などの集計"""
+        with self._lock:
+            hits, revalidated, misses = self.hits, self.revalidated, self.misses
+            entries, size = len(self._entries), self._bytes
+        total = hits + revalidated + misses
+        return {
+            "hits": hits,
+            "revalidated": revalidated,
+            "misses": misses,
+            "hit_rate": (hits + revalidated) / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._touched.clear()
+            self._bytes = 0
+            with self._conn:
+                self._conn.execute('DELETE FROM http_cache')
+
+    def close(self):
+        with self._lock:
+            with self._conn:
+                self._flush_touched()
+            self._conn.close()
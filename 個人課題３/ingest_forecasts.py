@@ -0,0 +1,158 @@
+"""保存しておいた予報JSONを、複数プロセスで解析して weather.db に取り込む
+
+    python ingest_forecasts.py 保存したフォルダ/*.json [--db weather.db] [--workers 4]
+    python ingest_forecasts.py --archive weather_archive [--since 2026-10-01] [--until 2026-10-18]
+
+ファイル名には府県コード（6桁）を入れておく（例: 130000_20261018T0500.json）。
+--archive では、アプリが残したレスポンス（../pipeline/archive.py）をネットワークなしで解析し直す。
+解析プロセスにはレコードの位置（Ref）だけを渡し、中身はそれぞれのプロセスが mmap して読む。
+解析は ../pipeline/ingest.py の解析プロセスで、書き込みは1つの書き込みプロセスで行う。
+どのファイルも forecast_history に発表版として追記し、forecasts（最新の予報）は
+取り込んだ中で一番新しい発表だけを最後に書き込む（ファイルを解析し終わる順番は決まっていないため）。
+
+画面の一括更新（weather_app.refresh_all）は47件の小さなJSONを解析するだけなので、これまで通りスレッドで行う。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from parser import parse_forecast
+from storage import INSERT_HISTORY_SQL, connect, migrate, to_history_rows, write_forecasts
+
+AREAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "areas.json")
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "pipeline")
+OFFICE_CODE = re.compile(r"\d{6}")
+
+
+def load_area_names(path=AREAS_PATH):
+    """{府県コード: 名前}（areas.json から）"""
+    with open(path, encoding="utf-8") as f:
+        return {code: name for region in json.load(f)["regions"] for code, name in region["areas"]}
+
+
+AREA_NAMES = load_area_names()
+
+
+def _pipeline(name):
+    """../pipeline のモジュールを import する"""
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    return __import__(name)
+
+
+def office_of(path):
+    """ファイル名の6桁の数字を府県コードにする"""
+    match = OFFICE_CODE.search(os.path.basename(path))
+    return match.group(0) if match else None
+
+
+# --- 🔧 解析プロセス ---
+
+def parse_item(item):
+    """(府県コード, ファイルのパス・JSON のバイト列・アーカイブの Ref) を forecasts 用のタプルにする"""
+    office_code, source = item
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            data = json.loads(f.read())
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        data = json.loads(bytes(source))
+    else:
+        data = json.loads(_pipeline("archive").read_ref(source))
+    batch = parse_forecast(data, office_code)
+    rows = [row for forecast_list, _ in batch.office_items(0, office_code, AREA_NAMES.get(office_code)) for row in forecast_list]
+    return (office_code, batch.issued_at[0]), rows
+
+
+# --- 🗄 書き込みプロセス ---
+
+# 地域コード -> (発表時刻, 行)。この書き込みプロセスで見た一番新しい発表
+_newest = {}
+
+
+def open_db(db_path):
+    conn = connect(db_path)
+    migrate(conn)
+    _newest.clear()
+    return conn
+
+
+def write(conn, key, rows):
+    """発表版を forecast_history に追記し、地域ごとに一番新しい発表を覚えておく"""
+    _, issued_at = key
+    if not issued_at:
+        return 0
+    by_area = {}
+    for row in rows:
+        by_area.setdefault(row[1], []).append(row)
+    for area_code, area_rows in by_area.items():
+        if area_code not in _newest or _newest[area_code][0] < issued_at:
+            _newest[area_code] = (issued_at, area_rows)
+    return conn.executemany(INSERT_HISTORY_SQL, to_history_rows(rows, issued_at)).rowcount
+
+
+def finish(conn):
+    """forecasts に、DBにあるものより新しい（か同じ）発表だけを書き込む"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for area_code, (issued_at, rows) in _newest.items():
+            latest = conn.execute(
+                "SELECT MAX(issued_at) FROM forecast_history WHERE area_code = ?", (area_code,)
+            ).fetchone()[0]
+            if latest is None or issued_at >= latest:
+                write_forecasts(conn, rows)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# --- 🚀 実行 ---
+
+def ingest_items(items, db_path="weather.db", workers=None):
+    """(府県コード, パスなど) をすべて取り込み、(集計, [(失敗した item, 例外)]) を返す"""
+    ingest = _pipeline("ingest")
+    return ingest.ingest(items, db_path, parse_item, open_db, write, finish, workers=workers)
+
+
+def archive_items(folder, since=None, until=None):
+    """アーカイブにある予報JSONの items（セグメントの並び順。since / until は UNIX 時刻）"""
+    with _pipeline("archive").Archive(folder) as archive:
+        records = archive.records("jma.forecast", since=since, until=until, disk_order=True)
+    return [(record.key, record.ref) for record in records]
+
+
+def to_timestamp(day):
+    return datetime.fromisoformat(day).timestamp() if day else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="予報JSONのファイル")
+    parser.add_argument("--archive", metavar="DIR", help="アプリが残したレスポンスのフォルダ（weather_archive）")
+    parser.add_argument("--since", help="--archive のうち、この日以降に取得したものだけ（YYYY-MM-DD）")
+    parser.add_argument("--until", help="--archive のうち、この日より前に取得したものだけ（YYYY-MM-DD）")
+    parser.add_argument("--db", default="weather.db")
+    parser.add_argument("--workers", type=int, default=None, help="解析プロセスの数（既定は CPU の数）")
+    options = parser.parse_args()
+    if not options.paths and not options.archive:
+        parser.error("ファイルか --archive を指定してください")
+
+    items = [(office_of(path), path) for path in options.paths]
+    for code, path in items:
+        if code is None:
+            print(f"{path}: ファイル名に府県コードがないので飛ばします")
+    items = [item for item in items if item[0] is not None]
+    if options.archive:
+        items += archive_items(options.archive, to_timestamp(options.since), to_timestamp(options.until))
+    stats, failed = ingest_items(items, options.db, options.workers)
+    for (code, source), ex in failed:
+        print(f"{getattr(source, 'path', source)}（{code}）の解析に失敗: {ex}")
+    print(f"{stats['batches']} 件 / {stats['rows']} 行 / 履歴に追加 {stats['changed']} 行"
+          f"（{stats['seconds']:.2f} 秒, コミット {stats['commits']} 回）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# 処理の段階ごとの時間と回数を記録する軽い計測の仕組み
+#   with metrics.timer("db.get"):
+#       ...
+#   metrics.count("error.load")
+# 最近の計測は段階ごとにリングバッファ（deque(maxlen=...)）に残し、分位点を出す。
+# 無効のときは timer() が何もしない共通の nullcontext を返すだけなので、ほぼコストはかからない。
+#
+# 環境変数
+#   WEATHER_METRICS=1            計測を有効にする（画面に計測パネルのボタンが出る）
+#   WEATHER_METRICS_PORT=9100    http://127.0.0.1:9100/metrics で Prometheus 形式、/metrics.json で JSON を返す
+
+DEFAULT_CAPACITY = 512   # 段階ごとに残す計測の数
+_NULL_TIMER = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, failed=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """段階ごとの所要時間・カウンター・外から集める値（キャッシュのヒット率など）"""
+
+    def __init__(self, enabled=False, capacity=DEFAULT_CAPACITY):
+        self.enabled = enabled
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._samples = {}     # stage -> deque（秒）
+        self._totals = {}      # stage -> [回数, 合計秒, 最大秒, 失敗回数]
+        self._counters = {}
+        self._collectors = []  # 呼ぶと {名前: 値} を返す関数
+        self._server = None
+
+    # --- 記録 ---
+
+    def timer(self, stage):
+        """with で囲んだ処理の時間を stage として記録する"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds, failed=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.capacity)
+                self._totals[stage] = [0, 0.0, 0.0, 0]
+            samples.append(seconds)
+            total = self._totals[stage]
+            total[0] += 1
+            total[1] += seconds
+            total[2] = max(total[2], seconds)
+            total[3] += failed
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def add_collector(self, func):
+        """集計のたびに呼ぶ関数を登録する（DBの行数など、その時点の値を返す）"""
+        self._collectors.append(func)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    # --- 集計と書き出し ---
+
+    def snapshot(self):
+        """{'stages': {...}, 'counters': {...}, 'gauges': {...}} を返す（時間はミリ秒）"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            totals = {stage: list(total) for stage, total in self._totals.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, values in samples.items():
+            count, total, max_, failed = totals[stage]
+            stages[stage] = {
+                "count": count,
+                "failed": failed,
+                "mean_ms": total / count * 1e3,
+                "p50_ms": values[len(values) // 2] * 1e3,
+                "p90_ms": values[min(len(values) - 1, len(values) * 9 // 10)] * 1e3,
+                "max_ms": max_ * 1e3,
+            }
+        gauges = {}
+        for collect in self._collectors:
+            try:
+                gauges.update(collect())
+            except Exception as ex:
+                gauges[f"collector_error.{getattr(collect, '__name__', 'collector')}"] = str(ex)
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=1)
+
+    def to_prometheus(self, prefix="weather_app"):
+        """Prometheus のテキスト形式"""
+        snap = self.snapshot()
+        lines = []
+        for stage, s in snap["stages"].items():
+            label = f'{{stage="{stage}"}}'
+            lines.append(f"{prefix}_stage_count{label} {s['count']}")
+            lines.append(f"{prefix}_stage_failed{label} {s['failed']}")
+            for key in ("mean_ms", "p50_ms", "p90_ms", "max_ms"):
+                lines.append(f"{prefix}_stage_{key}{label} {s[key]:.3f}")
+        for name, value in snap["counters"].items():
+            lines.append(f'{prefix}_counter{{name="{name}"}} {value}')
+        for name, value in snap["gauges"].items():
+            if isinstance(value, (int, float)):
+                lines.append(f'{prefix}_gauge{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """ファイルに書き出す（拡張子が .prom なら Prometheus 形式、それ以外は JSON）"""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def serve(self, port, host="127.0.0.1"):
+        """/metrics と /metrics.json を返すHTTPサーバーを裏で動かす（すでに動いていればそのポートを返す）"""
+        if self._server is not None:
+            return self._server.server_address[1]
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 使うときだけ読み込む
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = metrics.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{kind}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# アプリ全体で共有する計測
+metrics = Metrics(enabled=os.environ.get("WEATHER_METRICS") == "1")
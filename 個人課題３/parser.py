@@ -0,0 +1,125 @@
+# 気象庁の予報JSONを、forecasts テーブル用の行に変換するパーサー
+#
+# data[0]（3日間の短期予報）の timeSeries には
+#   - weathers を持つ系列（地域ごとの天気）
+#   - temps を持つ系列（観測地点ごとの最低・最高気温）
+# が入っている。すべての地域を読み、地域ごとに (date, area_code, area_name, weather, temp_min, temp_max) の行を作る。
+# 気温は文字列のまま保存するので int には変換しない（値が無ければ '-' にするだけ）。
+
+MISSING = "-"  # 値が無いことを表す（DBにもこのまま保存する）
+
+
+class ForecastBatch:
+    """複数府県ぶんの予報
+
+    地域 i の行は area_rows[i]、府県 k の地域は office_offset[k]:office_offset[k+1]。
+    """
+
+    __slots__ = ("office_codes", "issued_at", "office_offset", "area_codes", "area_names", "area_rows")
+
+    def __init__(self):
+        # 府県ごと
+        self.office_codes = []
+        self.issued_at = []
+        self.office_offset = [0]
+        # 地域ごと
+        self.area_codes = []
+        self.area_names = []
+        self.area_rows = []
+
+    def __len__(self):
+        return len(self.area_codes)
+
+    def rows(self, i, area_code=None, area_name=None):
+        """地域 i の forecasts テーブル用のタプル（コードと名前を差し替えることもできる）"""
+        rows = self.area_rows[i]
+        if area_code is None and area_name is None:
+            return rows
+        area_code = area_code or self.area_codes[i]
+        area_name = area_name or self.area_names[i]
+        return [(date, area_code, area_name, weather, t_min, t_max)
+                for date, _, _, weather, t_min, t_max in rows]
+
+    def office_items(self, k, area_code=None, area_name=None):
+        """府県 k を保存する (forecast_list, issued_at) のリスト
+
+        府県の代表（先頭の地域）は府県コードでも保存し、そのあとに一次細分区域ごとの行が続く。
+        """
+        first, end = self.office_offset[k], self.office_offset[k + 1]
+        issued_at = self.issued_at[k]
+        return [(self.rows(first, area_code or self.office_codes[k], area_name), issued_at)] + [
+            (self.area_rows[i], issued_at) for i in range(first, end)
+        ]
+
+    def __repr__(self):
+        return f"ForecastBatch({len(self.office_codes)}府県, {len(self)}地域)"
+
+
+def _find_series(time_series):
+    """天気・気温の系列を1回の走査で見つける"""
+    weather = temps = None
+    for series in time_series:
+        first = series["areas"][0]
+        if weather is None and "weathers" in first:
+            weather = series
+        elif temps is None and "temps" in first:
+            temps = series
+    return weather, temps
+
+
+def _append(batch, office_code, data):
+    """予報JSON1件ぶんをバッチに追加する（途中で壊れたデータに当たったら、この府県は何も追加しない）"""
+    report = data[0]
+    weather_series, temps_series = _find_series(report["timeSeries"])
+
+    dates = [d[:10] for d in weather_series["timeDefines"]]
+    n_days = len(dates)
+    temp_areas = temps_series["areas"] if temps_series else ()
+
+    codes, names, area_rows = [], [], []
+    for i, area in enumerate(weather_series["areas"]):
+        info = area["area"]
+        code, name = info["code"], info["name"]
+        weathers = area["weathers"]
+        if len(weathers) != n_days:
+            raise ValueError(f"{office_code}: 天気の数が日数と合いません")
+        # 気温は観測地点ごとなので、同じ並び順の地点を対応させる（[最低, 最高, 最低, 最高, ...] の並び）
+        temps = temp_areas[i]["temps"] if i < len(temp_areas) else ()
+        n_temps = len(temps)
+        rows = []
+        for d in range(n_days):
+            t_min = temps[d * 2] if n_temps > d * 2 else ""
+            t_max = temps[d * 2 + 1] if n_temps > d * 2 + 1 else ""
+            rows.append((dates[d], code, name, weathers[d], t_min or MISSING, t_max or MISSING))
+        codes.append(code)
+        names.append(name)
+        area_rows.append(rows)
+
+    batch.area_codes += codes
+    batch.area_names += names
+    batch.area_rows += area_rows
+    batch.office_codes.append(office_code)
+    batch.issued_at.append(report.get("reportDatetime"))
+    batch.office_offset.append(len(batch.area_codes))
+
+
+def parse_batch(payloads):
+    """複数の府県ぶんをまとめて変換する
+
+    payloads は {office_code: data}。戻り値は (ForecastBatch, {office_code: 例外})。
+    """
+    batch = ForecastBatch()
+    errors = {}
+    for code, data in payloads.items():
+        try:
+            _append(batch, code, data)
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError) as ex:
+            errors[code] = ex
+    return batch, errors
+
+
+def parse_forecast(data, office_code=None):
+    """予報JSON1件を変換（1府県だけの ForecastBatch を返す）"""
+    batch = ForecastBatch()
+    _append(batch, office_code, data)
+    return batch
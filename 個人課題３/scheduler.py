@@ -0,0 +1,192 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+# 予報を裏で少しずつ更新するスケジューラー（asyncio のタスクとして動かす）
+#   - 最近見た地域から順に、最後の確認から refresh_after 秒たった地域を1件ずつ取りに行く
+#   - 失敗した地域は指数バックオフ（base_backoff * 2^(失敗回数-1)、上限 max_backoff、±20% のゆらぎ）で後回し
+#   - 続けて失敗している間（オフラインなど）は、画面で選ばれた地域以外の更新を同じだけ止める
+# 画面で選ばれた地域は refresh_now() でその場で更新する（バックオフ中でも1回は試す）
+
+DEFAULT_REFRESH_AFTER = 30 * 60   # 秒
+DEFAULT_BASE_BACKOFF = 5
+DEFAULT_MAX_BACKOFF = 15 * 60
+DEFAULT_GAP = 0.2                 # 1件ごとに空ける間隔（気象庁に連続でアクセスしないように）
+
+
+def backoff_delay(failures, base=DEFAULT_BASE_BACKOFF, maximum=DEFAULT_MAX_BACKOFF):
+    """failures 回続けて失敗したあとに待つ秒数"""
+    delay = min(maximum, base * 2 ** (failures - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class RefreshScheduler:
+    """地域ごとの最終確認時刻と失敗回数を持ち、次に更新する地域を選ぶ
+
+    refresh(area_code) は別スレッドで呼ばれる同期関数。
+    on_result(area_code, result, error) は裏で更新するたびにイベントループ上で呼ばれる。
+    """
+
+    def __init__(self, area_codes, refresh, checked=None, on_result=None,
+                 refresh_after=DEFAULT_REFRESH_AFTER, base_backoff=DEFAULT_BASE_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, gap=DEFAULT_GAP):
+        self.area_codes = list(area_codes)
+        self.refresh = refresh
+        self.on_result = on_result
+        self.refresh_after = refresh_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.gap = gap
+
+        self._checked = dict(checked or {})   # 地域コード -> 最後に確認できた時刻
+        self._failures = {}                   # 地域コード -> 続けて失敗した回数
+        self._retry_at = {}                   # 地域コード -> バックオフが明ける時刻
+        self._recent = OrderedDict()          # 最近見た地域（末尾ほど最近）
+        self._in_flight = {}                  # 地域コード -> 更新中のタスク（スレッドが終わるまで残す）
+        self._streak = 0                      # 地域をまたいで続けて失敗した回数
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+
+    # --- 状態 ---
+
+    def checked_at(self, area_code):
+        return self._checked.get(area_code)
+
+    def retry_in(self, area_code):
+        """バックオフ中なら、次に試すまでの秒数（そうでなければ 0）"""
+        return max(0.0, self._retry_at.get(area_code, 0.0) - time.time())
+
+    @property
+    def offline(self):
+        """続けて失敗している（つながらない）状態か"""
+        return self._streak > 0
+
+    def touch(self, area_code):
+        """地域が画面で見られたことを記録する（次の更新の優先順位が上がる）"""
+        with self._lock:
+            self._recent.pop(area_code, None)
+            self._recent[area_code] = None
+        self._notify_wake()
+
+    def mark_checked(self, area_codes, checked_at):
+        """一括更新など、スケジューラーの外で確認できた地域を反映する"""
+        with self._lock:
+            for code in area_codes:
+                self._checked[code] = max(checked_at, self._checked.get(code, 0.0))
+                self._failures.pop(code, None)
+                self._retry_at.pop(code, None)
+            if area_codes:
+                self._streak = 0
+                self._paused_until = 0.0
+
+    def priority(self):
+        """更新する順番（最近見た地域が先、残りは元の並び順）"""
+        with self._lock:
+            recent = list(reversed(self._recent))
+        seen = set(recent)
+        return recent + [code for code in self.area_codes if code not in seen]
+
+    def _due_at(self, area_code):
+        due = self._checked.get(area_code, 0.0) + self.refresh_after
+        return max(due, self._retry_at.get(area_code, 0.0), self._paused_until)
+
+    def _pick(self, now):
+        """(今すぐ更新する地域, None) か (None, 次に見に来るまでの秒数)"""
+        next_due = None
+        for code in self.priority():
+            if code in self._in_flight:
+                continue
+            due = self._due_at(code)
+            if due <= now:
+                return code, None
+            next_due = due if next_due is None else min(next_due, due)
+        return None, (next_due - now if next_due is not None else self.refresh_after)
+
+    # --- 更新 ---
+
+    async def _refresh(self, area_code):
+        """1地域を更新し、成功・失敗を記録する（例外はそのまま投げる）
+
+        同じ地域の更新が動いていれば、新しく始めずにその結果を待つ。
+        待っている側がキャンセルされても更新のタスクは止めない（別スレッドの処理は止められないので、
+        終わるまで _in_flight に残し、結果も記録する）。
+        """
+        task = self._in_flight.get(area_code)
+        if task is None:
+            task = self._in_flight[area_code] = asyncio.ensure_future(self._run_refresh(area_code))
+            task.add_done_callback(lambda t: self._finished(area_code, t))
+        return await asyncio.shield(task)
+
+    def _finished(self, area_code, task):
+        self._in_flight.pop(area_code, None)
+        if not task.cancelled():
+            task.exception()  # 誰も待っていなかった失敗も、記録済みなので警告を出さない
+
+    async def _run_refresh(self, area_code):
+        try:
+            with metrics.timer("scheduler.refresh"):
+                result = await asyncio.to_thread(self.refresh, area_code)
+        except Exception:
+            with self._lock:
+                failures = self._failures[area_code] = self._failures.get(area_code, 0) + 1
+                self._streak += 1
+                now = time.time()
+                self._retry_at[area_code] = now + backoff_delay(failures, self.base_backoff, self.max_backoff)
+                self._paused_until = now + backoff_delay(self._streak, self.base_backoff, self.max_backoff)
+            metrics.count("scheduler.failed")
+            raise
+        self.mark_checked([area_code], time.time())
+        return result
+
+    async def refresh_now(self, area_code):
+        """画面で選ばれた地域をすぐに更新する"""
+        self.touch(area_code)
+        return await self._refresh(area_code)
+
+    def _notify_wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _sleep(self, seconds):
+        """seconds 秒待つ（touch されたら早めに起きる）"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def run(self):
+        """止められる（cancel される）まで、期限の来た地域を順に更新し続ける"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                code, wait = self._pick(time.time())
+                if code is None:
+                    await self._sleep(wait)
+                    continue
+                try:
+                    result = await self._refresh(code)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    self._report(code, None, ex)
+                    continue
+                self._report(code, result, None)
+                await self._sleep(self.gap)
+        finally:
+            self._loop = None
+
+    def _report(self, area_code, result, error):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(area_code, result, error)
+        except Exception as ex:
+            print(ex)
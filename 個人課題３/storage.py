@@ -0,0 +1,383 @@
+import sqlite3
+import sys
+import threading
+
+# weather.db への接続をまとめて管理するモジュール
+# クリックのたびに connect / close しないよう、接続は使い回す
+#   - 書き込み用の接続は1本だけ（ロックで直列化）
+#   - 読み込み用の接続はスレッドごとに1本
+# WAL モードにしているので、裏で一括更新が書き込んでいても読み込みは待たされない
+#
+# forecasts は「各地域の最新の予報」だけを持つテーブル。
+# 履歴モードでは、発表されたすべての版を forecast_history にも残す
+# （発表時刻 issued_at ごとに1行。気温は INTEGER で保存）
+# area_status は地域ごとに「最後に気象庁へ確認できた時刻」を持つ（内容が同じだった場合も更新する）。
+# オフラインのときに、表示しているデータがどれくらい古いかを出すのに使う
+# jma_areas は気象庁の地域の階層（area.json）を保存しておくテーブル（area_index.AreaIndex の元）
+#
+# 履歴は python storage.py weather.db 130010 [開始日 終了日] で表示できる（予報と実績の比較用）
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS forecasts (
+        date TEXT,
+        area_code TEXT,
+        area_name TEXT,
+        weather TEXT,
+        temp_min TEXT,
+        temp_max TEXT,
+        PRIMARY KEY (date, area_code)
+    )
+'''
+
+# 主キーは (date, area_code) なので、地域で絞り込む読み出し（get / get_many_with_status）用に
+# 地域 → 日付の順の索引を作る。表示に使う列まで含めてテーブル本体を読まずに済ませる
+FORECASTS_INDEX = '''
+    CREATE INDEX IF NOT EXISTS idx_forecasts_area
+        ON forecasts (area_code, date, weather, temp_min, temp_max)
+'''
+
+SCHEMA_VERSION = 4
+
+HISTORY_SCHEMA = (
+    # 主キー (area_code, target_date, issued_at) の WITHOUT ROWID テーブルなので、
+    # 「ある地域の日付範囲」はこの順に並んだ本体をそのまま範囲スキャンできる
+    '''
+    CREATE TABLE IF NOT EXISTS forecast_history (
+        area_code TEXT NOT NULL,
+        target_date TEXT NOT NULL,
+        issued_at TEXT NOT NULL,
+        area_name TEXT,
+        weather TEXT,
+        temp_min INTEGER,
+        temp_max INTEGER,
+        PRIMARY KEY (area_code, target_date, issued_at)
+    ) WITHOUT ROWID
+    ''',
+    # 「地域ごとの最新の発表」用。表示に使う列まで含めてテーブル本体を読まずに済ませる
+    '''
+    CREATE INDEX IF NOT EXISTS idx_history_latest
+        ON forecast_history (area_code, issued_at DESC, target_date, weather, temp_min, temp_max)
+    ''',
+)
+
+STATUS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS area_status (
+        area_code TEXT PRIMARY KEY,
+        checked_at REAL NOT NULL
+    ) WITHOUT ROWID
+'''
+
+# ord は親の children の中での順番。fetched_at は area.json を取得した時刻（全行同じ）
+AREAS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jma_areas (
+        level TEXT NOT NULL,
+        code TEXT NOT NULL,
+        name TEXT,
+        en_name TEXT,
+        parent TEXT,
+        ord INTEGER,
+        fetched_at REAL,
+        PRIMARY KEY (level, code)
+    ) WITHOUT ROWID
+'''
+
+# 旧 forecasts テーブルからの移行。発表時刻は分からないので移行した時刻を入れる
+# （気象庁の reportDatetime と同じ日本時間の書式にして、文字列のまま大小比較できるようにする）
+# 気温の '-' などの数値でない文字列は NULL にする
+MIGRATE_SQL = '''
+    INSERT OR IGNORE INTO forecast_history
+        (area_code, target_date, issued_at, area_name, weather, temp_min, temp_max)
+    SELECT area_code, date, strftime('%Y-%m-%dT%H:%M:%S+09:00', 'now', '+9 hours'), area_name, weather,
+           CASE WHEN temp_min GLOB '[0-9]*' OR temp_min GLOB '-[0-9]*' THEN CAST(temp_min AS INTEGER) END,
+           CASE WHEN temp_max GLOB '[0-9]*' OR temp_max GLOB '-[0-9]*' THEN CAST(temp_max AS INTEGER) END
+    FROM forecasts
+'''
+
+INSERT_HISTORY_SQL = '''
+    INSERT OR IGNORE INTO forecast_history
+        (area_code, target_date, issued_at, area_name, weather, temp_min, temp_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_LATEST_SQL = '''
+    SELECT target_date, weather, temp_min, temp_max FROM forecast_history
+    WHERE area_code = ?
+      AND issued_at = (SELECT MAX(issued_at) FROM forecast_history WHERE area_code = ?)
+    ORDER BY target_date ASC
+'''
+
+SELECT_RANGE_SQL = '''
+    SELECT target_date, issued_at, weather, temp_min, temp_max FROM forecast_history
+    WHERE area_code = ? AND target_date BETWEEN ? AND ?
+    ORDER BY target_date ASC, issued_at ASC
+'''
+
+# 内容が変わった行だけ書き換える UPSERT
+UPSERT_SQL = '''
+    INSERT INTO forecasts (date, area_code, area_name, weather, temp_min, temp_max)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date, area_code) DO UPDATE SET
+        area_name = excluded.area_name,
+        weather = excluded.weather,
+        temp_min = excluded.temp_min,
+        temp_max = excluded.temp_max
+    WHERE forecasts.weather IS NOT excluded.weather
+       OR forecasts.temp_min IS NOT excluded.temp_min
+       OR forecasts.temp_max IS NOT excluded.temp_max
+'''
+
+SELECT_AREA_SQL = 'SELECT date, weather, temp_min, temp_max FROM forecasts WHERE area_code = ? ORDER BY date ASC'
+
+MARK_CHECKED_SQL = '''
+    INSERT INTO area_status (area_code, checked_at) VALUES (?, ?)
+    ON CONFLICT (area_code) DO UPDATE SET checked_at = excluded.checked_at
+    WHERE excluded.checked_at > area_status.checked_at
+'''
+
+COUNT_SQL = '''
+    SELECT (SELECT COUNT(*) FROM forecasts),
+           (SELECT COUNT(*) FROM forecast_history),
+           (SELECT COUNT(DISTINCT area_code) FROM forecasts)
+'''
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',   # WAL なら NORMAL でも壊れない。コミットごとの fsync を省く
+    'PRAGMA cache_size = -8000',     # 約8MB
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+)
+
+
+def to_int(value):
+    """気温の文字列を整数に（'-' や空は None）"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_history_rows(forecast_list, issued_at):
+    """forecasts 用のタプルを forecast_history 用に変換"""
+    return [
+        (area_code, date, issued_at, area_name, weather, to_int(temp_min), to_int(temp_max))
+        for date, area_code, area_name, weather, temp_min, temp_max in forecast_list
+    ]
+
+
+def write_forecasts(conn, forecast_list, issued_at=None, history=False):
+    """1地域ぶんを書き込む（トランザクションは呼び出し側で）"""
+    conn.executemany(UPSERT_SQL, forecast_list)
+    if history and issued_at:
+        conn.executemany(INSERT_HISTORY_SQL, to_history_rows(forecast_list, issued_at))
+
+
+def migrate(conn):
+    """スキーマを最新にする（PRAGMA user_version で版を管理）"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(SCHEMA)
+        conn.execute(FORECASTS_INDEX)
+        for sql in HISTORY_SCHEMA:
+            conn.execute(sql)
+        conn.execute(STATUS_SCHEMA)
+        conn.execute(AREAS_SCHEMA)
+        if version < 1:
+            conn.execute(MIGRATE_SQL)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def connect(path):
+    """PRAGMA を設定済みの接続を作る"""
+    # isolation_level=None でトランザクションは自分で BEGIN / COMMIT する
+    # 同じSQL文字列はコンパイル済みのものが使い回される（cached_statements）
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class WeatherStore:
+    """天気予報DBの読み書き
+
+    history=True のときは保存のたびに forecast_history にも発表版を追記する。
+    """
+
+    def __init__(self, path='weather.db', history=False):
+        self.path = path
+        self.history = history
+        self._write_lock = threading.Lock()
+        self._writer = connect(path)
+        migrate(self._writer)
+        self._local = threading.local()
+        self._readers = []
+
+    def _reader(self):
+        """このスレッド用の読み込み接続"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+            self._readers.append(conn)
+        return conn
+
+    def _write(self, conn, forecast_list, issued_at):
+        write_forecasts(conn, forecast_list, issued_at, self.history)
+
+    def save(self, forecast_list, issued_at=None):
+        """1地域ぶんを保存"""
+        self.save_many([(forecast_list, issued_at)])
+
+    def save_many(self, items):
+        """複数地域ぶんを1つのトランザクションで保存
+
+        items は (forecast_list, issued_at) のリスト。
+        """
+        with self._write_lock:
+            conn = self._writer
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for forecast_list, issued_at in items:
+                    self._write(conn, forecast_list, issued_at)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def save_many_and_get(self, items, area_codes):
+        """複数地域ぶんの保存と、area_codes の読み出しを1つのトランザクションで行う
+
+        戻り値は {地域コード: 行のリスト}。
+        """
+        with self._write_lock:
+            conn = self._writer
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for forecast_list, issued_at in items:
+                    self._write(conn, forecast_list, issued_at)
+                result = {code: conn.execute(SELECT_AREA_SQL, (code,)).fetchall() for code in area_codes}
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return result
+
+    def get(self, area_code):
+        """特定の地域の予報を取得"""
+        return self._reader().execute(SELECT_AREA_SQL, (area_code,)).fetchall()
+
+    def get_many_with_status(self, area_code, sub_codes):
+        """府県の予報と、その中の地域（sub_codes）の予報を同じスナップショットから取得
+
+        戻り値は ({地域コード: 行のリスト}, 府県を最後に確認できた時刻)。行の無い地域は含めない。
+        """
+        codes = [area_code, *sub_codes]
+        sql = (f'SELECT area_code, date, weather, temp_min, temp_max FROM forecasts '
+               f'WHERE area_code IN ({",".join("?" * len(codes))}) ORDER BY area_code, date ASC')
+        conn = self._reader()
+        conn.execute('BEGIN')
+        try:
+            rows = conn.execute(sql, codes).fetchall()
+            status = conn.execute('SELECT checked_at FROM area_status WHERE area_code = ?', (area_code,)).fetchone()
+        finally:
+            conn.execute('COMMIT')
+        by_code = {}
+        for code, *row in rows:
+            by_code.setdefault(code, []).append(tuple(row))
+        return by_code, status[0] if status else None
+
+    def mark_checked(self, area_codes, checked_at):
+        """地域を「checked_at の時点で最新を確認済み」にする"""
+        with self._write_lock:
+            conn = self._writer
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(MARK_CHECKED_SQL, [(code, checked_at) for code in area_codes])
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def checked_all(self):
+        """{地域コード: 最後に確認できた時刻}"""
+        return dict(self._reader().execute('SELECT area_code, checked_at FROM area_status'))
+
+    def save_areas(self, rows, fetched_at):
+        """地域の階層を入れ替える（rows は area_index.AreaIndex.rows() の形）"""
+        with self._write_lock:
+            conn = self._writer
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM jma_areas')
+                conn.executemany(
+                    'INSERT INTO jma_areas (level, code, name, en_name, parent, ord, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(*row, fetched_at) for row in rows],
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def load_areas(self):
+        """保存してある地域の階層を (行のリスト, 取得した時刻) で返す（無ければ ([], None)）
+
+        行は (level, code, name, en_name, parent) で、親ごとに children の順に並ぶ。
+        """
+        conn = self._reader()
+        fetched_at = conn.execute('SELECT MIN(fetched_at) FROM jma_areas').fetchone()[0]
+        rows = conn.execute(
+            'SELECT level, code, name, en_name, parent FROM jma_areas ORDER BY level, parent, ord'
+        ).fetchall()
+        return rows, fetched_at
+
+    def get_latest(self, area_code):
+        """履歴から、その地域の最新の発表を取得（気温は整数）"""
+        return self._reader().execute(SELECT_LATEST_SQL, (area_code, area_code)).fetchall()
+
+    def get_range(self, area_code, start_date, end_date):
+        """履歴から、その地域の日付範囲のすべての発表版を取得
+
+        予報と実績の比較など、長期間の分析用。
+        """
+        return self._reader().execute(SELECT_RANGE_SQL, (area_code, start_date, end_date)).fetchall()
+
+    def counts(self):
+        """行数の集計（計測パネル用）"""
+        forecasts, history, areas = self._reader().execute(COUNT_SQL).fetchone()
+        return {"db.forecasts": forecasts, "db.forecast_history": history, "db.areas": areas}
+
+    def close(self):
+        for conn in self._readers:
+            conn.close()
+        self._readers.clear()
+        self._writer.close()
+
+
+def main():
+    """履歴の表示：最新の発表と、日付範囲のすべての発表版"""
+    if len(sys.argv) not in (3, 5):
+        print("python storage.py weather.db 地域コード [開始日 終了日]")
+        return
+    store = WeatherStore(sys.argv[1])
+    area_code = sys.argv[2]
+    try:
+        print(f"{area_code} の最新の発表")
+        for target_date, weather, temp_min, temp_max in store.get_latest(area_code):
+            print(f"  {target_date[:10]}  {weather}  {temp_min}/{temp_max}")
+        if len(sys.argv) == 5:
+            print(f"{sys.argv[3]} 〜 {sys.argv[4]} の発表版")
+            for target_date, issued_at, weather, temp_min, temp_max in store.get_range(area_code, *sys.argv[3:5]):
+                print(f"  {target_date[:10]}  {issued_at}  {weather}  {temp_min}/{temp_max}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,295 @@
-import requests
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
 import flet as ft
-import sqlite3 # SQLiteを使用するために追加
 
-FORECAST_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
+import fetcher
+from storage import WeatherStore
+from fetcher import fetch_all, fetch_area_json, fetch_forecast
+from http_cache import ResponseCache
+from parser import parse_batch, parse_forecast
+from cards import SectionPool
+from area_index import AreaIndex
+from metrics import metrics
+from scheduler import RefreshScheduler
 
-# 47都道府県リスト
-PREFS = {
-    "北海道地方": {"016000": "札幌"},
-    "東北地方": {"020000": "青森", "030000": "岩手", "040000": "宮城", "050000": "秋田", "060000": "山形", "070000": "福島"},
-    "関東甲信地方": {"080000": "茨城", "090000": "栃木", "100000": "群馬", "110000": "埼玉", "120000": "千葉", "130000": "東京", "140000": "神奈川", "190000": "山梨", "200000": "長野"},
-    "北陸・東海地方": {"150000": "新潟", "160000": "富山", "170000": "石川", "180000": "福井", "210000": "岐阜", "220000": "静岡", "230000": "愛知", "240000": "三重"},
-    "近畿地方": {"250000": "滋賀", "260000": "京都", "270000": "大阪", "280000": "兵庫", "290000": "奈良", "300000": "和歌山"},
-    "中国・四国地方": {"310000": "鳥取", "320000": "島根", "330000": "岡山", "340000": "広島", "350000": "山口", "360000": "徳島", "370000": "香川", "380000": "愛媛", "390000": "高知"},
-    "九州・沖縄地方": {"400000": "福岡", "410000": "佐賀", "420000": "長崎", "430000": "熊本", "440000": "大分", "450000": "宮崎", "460100": "鹿児島", "471000": "沖縄"}
-}
+# 予報JSONのキャッシュ（TTL 10分、304 なら再パースしない）
+# 起動を軽くするため、最初に取得するときに開く（get_response_cache）
+response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    global response_cache
+    with _response_cache_lock:
+        if response_cache is None:
+            response_cache = ResponseCache('http_cache.db', ttl=600)
+        return response_cache
+
+# 計測（WEATHER_METRICS=1 で有効。無効のときの timer() は何もしない）
+# 段階: area.select（地域を選んでからDBの分を表示し終わるまで）/ scheduler.refresh（最新の確認）/ db.get / http.request / json.decode / parse / db.save / render
+metrics.add_collector(lambda: {f"cache.{k}": v for k, v in response_cache.stats().items()} if response_cache else {})
+
+# 47都道府県リスト（地方 -> {地域コード: 名前}）。表は areas.json に置いてある
+AREAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "areas.json")
+
+def load_prefs(path=AREAS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return {region["name"]: dict(region["areas"]) for region in json.load(f)["regions"]}
+
+PREFS = load_prefs()
+
+AREA_NAMES = {code: name for areas in PREFS.values() for code, name in areas.items()}
+
+# オフラインファースト：地域を選んだらまずDBの分を表示し、最新の確認はそのあと裏で行う
+# 最後に気象庁へ確認できてから STALE_AFTER 秒以上たったデータは「古いデータ」と表示する
+STALE_AFTER = 3 * 60 * 60
+# 裏で全国を順に更新するスケジューラーを動かすか（WEATHER_BACKGROUND_REFRESH=0 で止める）
+BACKGROUND_REFRESH = os.environ.get("WEATHER_BACKGROUND_REFRESH", "1") != "0"
+
+# 気象庁の地域の階層（area.json）。府県の中の一次細分区域ごとに予報を表示するのに使う
+# DBに保存しておき、AREA_INDEX_MAX_AGE 秒より古ければ取り直す（load_area_index で読み込むまでは None）
+area_index = None
+AREA_INDEX_MAX_AGE = 30 * 24 * 60 * 60
 
 # --- 🗄 データベース関連の関数 ---
 
+# 取得した予報JSONと area.json をそのまま残すフォルダ（../pipeline/archive.py）。WEATHER_ARCHIVE="" で残さない
+# 残したものは python ingest_forecasts.py --archive weather_archive でネットワークなしに取り込み直せる
+ARCHIVE_DIR = os.environ.get("WEATHER_ARCHIVE", "weather_archive")
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "pipeline")
+
+# 接続は WeatherStore が1本を使い回す（init_db で作成）
+store = None
+
 def init_db():
     """データベースとテーブルの初期化"""
-    conn = sqlite3.connect('weather.db')
-    cursor = conn.cursor()
-    # 日付と地域コードを組み合わせてプライマリーキー（一意）にする設計
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS forecasts (
-            date TEXT,
-            area_code TEXT,
-            area_name TEXT,
-            weather TEXT,
-            temp_min TEXT,
-            temp_max TEXT,
-            PRIMARY KEY (date, area_code)
-        )
-    ''')
-    conn.commit()
-    return conn
-
-def save_to_db(forecast_list):
-    """取得したデータを一括でDBに保存"""
-    conn = sqlite3.connect('weather.db')
-    cursor = conn.cursor()
-    cursor.executemany('''
-        INSERT OR REPLACE INTO forecasts (date, area_code, area_name, weather, temp_min, temp_max)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', forecast_list)
-    conn.commit()
-    conn.close()
-
-def get_from_db(area_code):
-    """DBから特定の地域の予報を取得"""
-    conn = sqlite3.connect('weather.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT date, weather, temp_min, temp_max FROM forecasts WHERE area_code = ? ORDER BY date ASC', (area_code,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    global store
+    if store is None:
+        # 履歴モード：発表された予報の版をすべて残す
+        store = WeatherStore('weather.db', history=True)
+        metrics.add_collector(lambda: store.counts() if store is not None else {})
+    if ARCHIVE_DIR and fetcher.archive is None:
+        if PIPELINE_DIR not in sys.path:
+            sys.path.append(PIPELINE_DIR)
+        from archive import Archive
+        # フォルダや索引は最初に保存するときに作る
+        fetcher.archive = Archive(ARCHIVE_DIR)
+    return store
+
+def save_all_to_db(items):
+    """複数地域のデータを1つのトランザクションでまとめて保存
+
+    items は (forecast_list, issued_at) のリスト。
+    """
+    store.save_many(items)
+
+def get_local(area_code, area_name):
+    """DBから府県の地域ごとの予報（build_sections の形）と、最後に確認できた時刻（未確認なら None）を取得"""
+    sub_areas = sub_areas_of(area_code)
+    with metrics.timer("db.get"):
+        rows_by_code, checked_at = store.get_many_with_status(area_code, [code for code, _, _ in sub_areas])
+    return build_sections(area_code, area_name, rows_by_code, sub_areas), checked_at
+
+# --- 🗺 地域の階層 ---
+
+def load_area_index():
+    """地域の階層を読み込む（DBに無いか古ければ area.json を取得して保存する）。別スレッドで呼ぶ想定"""
+    global area_index
+    rows, fetched_at = store.load_areas()
+    if rows:
+        area_index = AreaIndex.from_rows(rows)
+    if fetched_at is None or time.time() - fetched_at > AREA_INDEX_MAX_AGE:
+        try:
+            index = AreaIndex.from_json(fetch_area_json())
+            store.save_areas(index.rows(), time.time())
+            area_index = index
+        except Exception as ex:
+            # 取れなければ保存済みの階層のまま（それも無ければ府県単位で表示する）
+            print(ex)
+            metrics.count(f"error.{type(ex).__name__}")
+    return area_index
+
+def municipalities_note(index, class10_code, limit=4):
+    """一次細分区域に含まれる市町村などの名前（多ければ先頭の limit 件と残りの数）"""
+    names = [area.name for area in index.municipalities(class10_code)]
+    if len(names) > limit:
+        return "・".join(names[:limit]) + f" ほか{len(names) - limit}"
+    return "・".join(names)
+
+def sub_areas_of(area_code):
+    """府県の中の一次細分区域 [(コード, 名前, 補足)]（階層をまだ読み込んでいなければ空）"""
+    index = area_index
+    if index is None:
+        return []
+    return [(area.code, area.name, municipalities_note(index, area.code)) for area in index.sub_areas(area_code)]
+
+def build_sections(area_code, area_name, rows_by_code, sub_areas):
+    """表示する (見出し, 補足, 行のリスト) のリスト
+
+    一次細分区域の行が無ければ（階層が無い・まだ取得していない）、府県の代表の行だけを出す。
+    """
+    sections = [(name, note, rows_by_code[code]) for code, name, note in sub_areas if rows_by_code.get(code)]
+    if not sections and rows_by_code.get(area_code):
+        sections = [(area_name, None, rows_by_code[area_code])]
+    return sections
 
 # --- 🌤 アプリのロジック ---
 
-def get_forecast_data(area_code):
-    """APIからデータを取得"""
-    response = requests.get(f"{FORECAST_BASE_URL}{area_code}.json")
-    return response.json()
-
-def get_weather_icon(weather_text):
-    """天気に合わせたアイコンを取得"""
-    if "晴" in weather_text: return ft.Icons.WB_SUNNY
-    elif "雨" in weather_text: return ft.Icons.UMBRELLA
-    elif "曇" in weather_text or "くもり" in weather_text: return ft.Icons.CLOUD
-    elif "雪" in weather_text: return ft.Icons.AC_UNIT
-    return ft.Icons.HELP
-
-def create_forecast_card(date_str, weather_text, temp_min, temp_max):
-    """予報カードのデザイン"""
-    return ft.Card(
-        elevation=4,
-        content=ft.Container(
-            content=ft.Column([
-                ft.Text(date_str[:10], size=14, weight="bold", color="blue_grey_400"),
-                ft.Icon(get_weather_icon(weather_text), size=50, color="orange_400"),
-                ft.Text(weather_text, size=14, weight="bold", text_align="center"),
-                ft.Row([
-                    ft.Text(f"{temp_min}°C", color="blue_600", size=18, weight="bold"),
-                    ft.Text("/", size=18, color="grey"),
-                    ft.Text(f"{temp_max}°C", color="red_600", size=18, weight="bold"),
-                ], alignment="center")
-            ], horizontal_alignment="center", spacing=10),
-            padding=20, width=170
-        )
-    )
+def refresh_area(area_code, area_name, force=False):
+    """1府県を取得し、その中のすべての地域をDBに保存する（別スレッドで実行する想定）
+
+    内容が前回から変わっていれば保存後の表示用の地域ごとの行（build_sections の形）を、
+    変わっていなければ None を返す。force=True なら変化がなくても保存する（DBが空のとき用）。
+    """
+    cache = get_response_cache()
+    data, changed = fetch_forecast(area_code, cache=cache, parse_unchanged=force)
+    store.mark_checked([area_code], time.time())
+    if not changed and not force:
+        metrics.count("refresh.unchanged")
+        return None
+    with metrics.timer("parse"):
+        batch = parse_forecast(data, area_code)
+        items = batch.office_items(0, area_code, area_name)
+    # 保存と読み出しを1トランザクションで
+    with metrics.timer("db.save"):
+        rows_by_code = store.save_many_and_get(items, [area_code, *batch.area_codes])
+    # 保存できてから ETag を覚える（失敗したら次の取得でもう一度受け取る）
+    cache.confirm(area_code)
+    # 階層をまだ読み込んでいなければ、予報JSONに載っている地域名で出す
+    sub_areas = sub_areas_of(area_code) or [(code, name, None) for code, name in zip(batch.area_codes, batch.area_names)]
+    return build_sections(area_code, area_name, rows_by_code, sub_areas)
+
+def refresh_all(base_url=None, max_workers=8):
+    """全都道府県を並列で取得し、1トランザクションでDBに保存する
+
+    戻り値は失敗した地域 {area_code: 例外}。base_url を省略すると fetcher.FORECAST_BASE_URL を使う。
+    """
+    names = AREA_NAMES
+    cache = get_response_cache()
+    # キャッシュで「変化なし」と分かった地域は results に入らない（パースも保存もしない）
+    with metrics.timer("refresh_all.fetch"):
+        results, errors = fetch_all(names, base_url=base_url, max_workers=max_workers, cache=cache)
+
+    with metrics.timer("refresh_all.parse"):
+        batch, parse_errors = parse_batch(results)
+        errors.update(parse_errors)
+        items = [item for k, code in enumerate(batch.office_codes) for item in batch.office_items(k, code, names[code])]
+    with metrics.timer("refresh_all.save"):
+        save_all_to_db(items)
+        store.mark_checked([code for code in names if code not in errors], time.time())
+    # パースできず保存しなかった地域は confirm しないので、次回もう一度受け取る
+    for code in batch.office_codes:
+        cache.confirm(code)
+    metrics.count("refresh_all.errors", len(errors))
+    return errors
+
+def freshness_label(checked_at, failed=False, now=None):
+    """表示しているデータの鮮度の文言と色（failed は今回の確認に失敗したとき）"""
+    now = time.time() if now is None else now
+    if checked_at is None:
+        text, color = "未取得", "white70"
+    else:
+        age = now - checked_at
+        text = time.strftime("%m/%d %H:%M 時点", time.localtime(checked_at))
+        color = "white70"
+        if age >= STALE_AFTER:
+            text += f"（{int(age // 3600)}時間前の古いデータ）"
+            color = ft.Colors.AMBER_300
+    if failed:
+        text += "・オフライン"
+        color = ft.Colors.AMBER_300
+    return text, color
 
 def main(page: ft.Page):
     # DB初期化
     init_db()
 
+    # 計測を外から取りに来られるように（例: WEATHER_METRICS_PORT=9100 で http://127.0.0.1:9100/metrics）
+    port = os.environ.get("WEATHER_METRICS_PORT")
+    if metrics.enabled and port:
+        metrics.serve(int(port))
+
     page.title = "気象庁 天気予報アプリ (SQLite版)"
     page.bgcolor = "#CFD8DC"
     page.padding = 0
 
-    forecast_display = ft.Row(wrap=True, spacing=20, scroll="auto", expand=True)
+    forecast_display = ft.Column(spacing=24, scroll="auto", expand=True)
     title_text = ft.Text("地域を選択してください", size=24, weight="bold", color="white")
-    
+    freshness_text = ft.Text("", size=12, color="white70")
+
     current_tile = [None]
+    current_area = [None]
+
+    # 読み込み中の表示
+    loading = ft.ProgressRing(width=24, height=24, color="white", visible=False)
 
-    def on_area_select(e, area_code, area_name):
+    # 実行中の読み込みタスク（新しいクリックが来たらキャンセルする）
+    current_task = [None]
+
+    # 府県の中の地域ごとに見出しとカードの列を並べる。カードは使い回し、変わった部品だけを送る
+    card_pool = SectionPool(page, forecast_display)
+
+    def show_sections(sections):
+        # sections は (見出し, 補足, 行のリスト)、行は (date, weather, temp_min, temp_max)
+        with metrics.timer("render"):
+            card_pool.show(sections)
+
+    def show_freshness(checked_at, failed=False):
+        freshness_text.value, freshness_text.color = freshness_label(checked_at, failed)
+        freshness_text.update()
+
+    def refresh_one(area_code):
+        """スケジューラーから別スレッドで呼ばれる（一度も確認していない地域は変化がなくても保存する）"""
+        return refresh_area(area_code, AREA_NAMES[area_code], force=scheduler.checked_at(area_code) is None)
+
+    def on_background_result(area_code, new_sections, error):
+        """裏の更新が終わったとき。表示中の地域なら差し替える"""
+        if area_code != current_area[0]:
+            return
+        if error is None and new_sections:
+            show_sections(new_sections)
+        show_freshness(scheduler.checked_at(area_code), failed=error is not None)
+
+    scheduler = RefreshScheduler(AREA_NAMES, refresh_one, checked=store.checked_all(),
+                                 on_result=on_background_result)
+
+    async def load_forecast(area_code, area_name):
+        # 1. DBに残っている分をすぐに表示（通信は待たない）
+        with metrics.timer("area.select"):
+            sections, checked_at = await asyncio.to_thread(get_local, area_code, area_name)
+            if sections:
+                show_sections(sections)
+            else:
+                card_pool.show_message("保存済みのデータがありません。取得しています...", color=ft.Colors.BLUE_GREY)
+            show_freshness(checked_at)
+        loading.visible = True
+        loading.update()
+
+        # 2. 最新を確認・保存し、変わっていたら差し替える（失敗したら表示中のデータのまま）
+        try:
+            new_sections = await scheduler.refresh_now(area_code)
+            if new_sections:
+                show_sections(new_sections)
+            show_freshness(scheduler.checked_at(area_code))
+        except asyncio.CancelledError:
+            raise  # 新しい地域が選ばれたので、この結果は捨てる
+        except Exception as ex:
+            print(ex)
+            metrics.count(f"error.{type(ex).__name__}")
+            if not sections:
+                card_pool.show_message("読み込み失敗（オフラインの可能性があります）")
+            show_freshness(checked_at, failed=True)
+
+        loading.visible = False
+        loading.update()
+        if metrics.enabled:
+            update_debug_panel()
+
+    def on_area_select(e):
+        area_code, area_name = e.control.data
         if current_tile[0]:
             current_tile[0].selected = False
             current_tile[0].update()
@@ -113,60 +299,119 @@ def main(page: ft.Page):
         current_tile[0] = e.control
 
         title_text.value = f"{area_name}の天気予報"
-        
+        title_text.update()
+        current_area[0] = area_code
+
+        # 前の地域の読み込みが終わっていなければキャンセル
+        if current_task[0] and not current_task[0].done():
+            current_task[0].cancel()
+        current_task[0] = page.run_task(load_forecast, area_code, area_name)
+
+    refresh_status = ft.Text("", color="white70", size=12)
+
+    async def on_refresh_all(e):
+        """全国一括更新ボタン"""
+        e.control.disabled = True
+        refresh_status.value = "全国のデータを更新中..."
+        page.update()
         try:
-            # 1. まずAPIから最新データを取得
-            data = get_forecast_data(area_code)
-            time_series = data[0]['timeSeries']
-            dates = time_series[0]['timeDefines']
-            weathers = time_series[0]['areas'][0]['weathers']
-            temps = []
-            for s in time_series:
-                if 'temps' in s['areas'][0]:
-                    temps = s['areas'][0]['temps']
-                    break
-            
-            # 2. データをDB保存用に整形
-            forecast_list = []
-            for i in range(len(weathers)):
-                t_min = temps[i*2] if len(temps) > i*2 else "-"
-                t_max = temps[i*2+1] if len(temps) > i*2 else "-"
-                # (date, area_code, area_name, weather, temp_min, temp_max)
-                forecast_list.append((dates[i][:10], area_code, area_name, weathers[i], t_min, t_max))
-            
-            # 3. DBへ保存（INSERT OR REPLACE）
-            save_to_db(forecast_list)
-
-            # 4. 表示のために「あえてDBから」読み出す（移行の証明）
-            db_data = get_from_db(area_code)
-            
-            new_cards = []
-            for row in db_data:
-                # row[0]=date, row[1]=weather, row[2]=temp_min, row[3]=temp_max
-                new_cards.append(create_forecast_card(row[0], row[1], row[2], row[3]))
-            
-            forecast_display.controls = new_cards
+            errors = await asyncio.to_thread(refresh_all)
+            scheduler.mark_checked([code for code in AREA_NAMES if code not in errors], time.time())
+            if current_area[0] is not None:
+                freshness_text.value, freshness_text.color = freshness_label(scheduler.checked_at(current_area[0]))
+            stats = get_response_cache().stats()
+            if errors:
+                refresh_status.value = f"更新完了（失敗 {len(errors)} 件）"
+            else:
+                refresh_status.value = f"全国のデータを更新しました（キャッシュ命中率 {stats['hit_rate']:.0%}）"
         except Exception as ex:
             print(ex)
-            forecast_display.controls = [ft.Text("読み込み失敗", color="red")]
-        
+            metrics.count(f"error.{type(ex).__name__}")
+            refresh_status.value = "一括更新に失敗しました"
+        e.control.disabled = False
+        if metrics.enabled:
+            update_debug_panel()
         page.update()
 
+    refresh_button = ft.IconButton(
+        icon=ft.Icons.REFRESH, icon_color="white", tooltip="全国一括更新", on_click=on_refresh_all
+    )
+
+    # --- 🐞 計測パネル（WEATHER_METRICS=1 のときだけ） ---
+    debug_text = ft.Text("", color="white", size=11, font_family="monospace", selectable=True)
+    debug_panel = ft.Container(
+        content=ft.Column([
+            ft.Row([
+                ft.Text("計測", color="white", weight="bold"),
+                ft.TextButton("metrics.json / metrics.prom に保存", on_click=lambda e: dump_metrics()),
+                ft.TextButton("リセット", on_click=lambda e: reset_metrics()),
+            ]),
+            debug_text,
+        ], spacing=4, tight=True),
+        bgcolor="#263238", padding=10, visible=False,
+    )
+
+    def update_debug_panel():
+        if not debug_panel.visible:
+            return
+        snap = metrics.snapshot()
+        lines = [f"{'段階':<20}{'回数':>6}{'p50':>10}{'p90':>10}{'最大':>10}"]
+        for stage, s in sorted(snap["stages"].items()):
+            lines.append(f"{stage:<20}{s['count']:>6}{s['p50_ms']:>8.1f}ms{s['p90_ms']:>8.1f}ms{s['max_ms']:>8.1f}ms")
+        values = {**snap["counters"], **snap["gauges"]}
+        lines += [f"{name:<20}{value:>.2f}" if isinstance(value, float) else f"{name:<20}{value}"
+                  for name, value in sorted(values.items())]
+        debug_text.value = "\n".join(lines)
+        debug_panel.update()
+
+    def dump_metrics():
+        metrics.dump("metrics.json")
+        metrics.dump("metrics.prom")
+        refresh_status.value = "計測を metrics.json / metrics.prom に保存しました"
+        refresh_status.update()
+
+    def reset_metrics():
+        metrics.reset()
+        update_debug_panel()
+
+    def toggle_debug_panel(e):
+        debug_panel.visible = not debug_panel.visible
+        debug_panel.update()
+        update_debug_panel()
+
+    debug_button = ft.IconButton(
+        icon=ft.Icons.BUG_REPORT, icon_color="white", tooltip="計測パネル",
+        on_click=toggle_debug_panel, visible=metrics.enabled,
+    )
+
     # サイドバーのリスト作成
-    sidebar_content = []
-    for region, areas in PREFS.items():
-        sidebar_content.append(
-            ft.Container(content=ft.Text(region, color="white60", weight="bold"), padding=10)
+    # 地方ごとに折りたたみ、地域のタイルは初めて開いたときに作る（起動時に送る部品を減らす）
+    def area_tile(code, name):
+        return ft.ListTile(
+            title=ft.Text(name, color="white"),
+            subtitle=ft.Text(code, color="white38", size=10),
+            selected_color=ft.Colors.YELLOW_ACCENT,
+            selected_tile_color=ft.Colors.WHITE10,
+            data=(code, name),
+            on_click=on_area_select,
+        )
+
+    def on_region_change(e):
+        group = e.control
+        if e.data == "true" and not group.controls:
+            group.controls = [area_tile(code, name) for code, name in PREFS[group.data].items()]
+            group.update()
+
+    sidebar_content = [
+        ft.ExpansionTile(
+            title=ft.Text(region, color="white60", weight="bold"),
+            data=region,
+            maintain_state=True,
+            text_color="white", icon_color="white60", collapsed_icon_color="white60",
+            on_change=on_region_change,
         )
-        for code, name in areas.items():
-            tile = ft.ListTile(
-                title=ft.Text(name, color="white"),
-                subtitle=ft.Text(code, color="white38", size=10),
-                selected_color=ft.Colors.YELLOW_ACCENT,
-                selected_tile_color=ft.Colors.WHITE10,
-                on_click=lambda e, c=code, n=name: on_area_select(e, c, n),
-            )
-            sidebar_content.append(tile)
+        for region in PREFS
+    ]
 
     sidebar = ft.Container(
         content=ft.Column(sidebar_content, scroll="auto", spacing=0),
@@ -174,16 +419,28 @@ def main(page: ft.Page):
     )
 
     header = ft.Container(
-        content=ft.Row([ft.Icon(ft.Icons.WB_SUNNY, color="white"), title_text], alignment="start"),
+        content=ft.Row([
+            ft.Icon(ft.Icons.WB_SUNNY, color="white"), title_text, freshness_text, loading,
+            ft.Container(expand=True), refresh_status, refresh_button, debug_button,
+        ], alignment="start"),
         bgcolor="#303F9F", padding=20
     )
 
     main_view = ft.Column([
         header,
+        debug_panel,
         ft.Container(content=forecast_display, padding=30, expand=True)
     ], expand=True)
 
     page.add(ft.Row([sidebar, main_view], expand=True, spacing=0))
 
+    # 地域の階層は最初の画面を出してから読み込む（読み込むまでは府県単位で表示）
+    page.run_thread(load_area_index)
+
+    # 最近見た地域から順に、裏で少しずつ最新を確認していく
+    if BACKGROUND_REFRESH:
+        background = page.run_task(scheduler.run)
+        page.on_close = lambda e: background.cancel()
+
 if __name__ == "__main__":
     ft.app(target=main)
\ No newline at end of file
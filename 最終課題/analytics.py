@@ -0,0 +1,273 @@
+"""物件の家賃の集計（ダッシュボードのグラフ用）
+
+    python analytics.py [DBのパス]      # 集計表を作り直す（既定は 最終課題.db）
+
+駅別・間取り別・全体の家賃の分布（件数、分位点、ヒストグラム）を price_stats テーブルに保存しておく。
+ダッシュボードは price_stats だけを読むので、開くときに全物件を読む必要はない。
+
+properties が書き換えられると、トリガーが「集計し直すグループ」を price_stats_dirty に記録する。
+refresh() はそのグループの行だけを読み、NumPy でまとめて集計する。
+全体（'all'）は物件を読み直さず、間取り別の集計を足し合わせ、分位点だけを家賃の索引をたどって拾う。
+"""
+import json
+import sqlite3
+import sys
+
+import numpy as np
+
+# ヒストグラムは 1万円刻み、30万円以上は最後の階級にまとめる
+HIST_STEP = 10000
+HIST_MAX = 300000
+HIST_EDGES = np.arange(0, HIST_MAX + 2 * HIST_STEP, HIST_STEP)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# 駅の列は「路線/駅名駅 歩N分」なので、最初の「/」と「駅」の間を駅名とする（形が違えばそのまま）
+# 索引と同じ式でないと索引が使われないので、列名だけ差し替えて使う
+STATION_NAME = (
+    "CASE WHEN instr({c}, '/') > 0 AND instr({c}, '駅') > instr({c}, '/') "
+    "THEN substr({c}, instr({c}, '/') + 1, instr({c}, '駅') - instr({c}, '/') - 1) "
+    "ELSE coalesce({c}, '') END"
+)
+
+# グループの種類 → グループ名を求める式
+GROUP_KEYS = {
+    "station": STATION_NAME.format(c="station"),
+    "floor_plan": "coalesce(floor_plan, '')",
+}
+ALL = ("all", "")
+
+STATS_COLUMNS = "kind, value, n, p10, p25, median, p75, p90, price_min, price_max, mean, age_median, hist"
+
+STATS_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS price_stats (
+        kind TEXT,
+        value TEXT,
+        n INTEGER,
+        p10 REAL, p25 REAL, median REAL, p75 REAL, p90 REAL,
+        price_min INTEGER, price_max INTEGER, mean REAL,
+        age_median REAL,
+        hist TEXT,            -- HIST_EDGES の階級ごとの件数（JSON）
+        updated_at TEXT,
+        PRIMARY KEY (kind, value)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS price_stats_dirty (
+        kind TEXT,
+        value TEXT,
+        PRIMARY KEY (kind, value)
+    ) WITHOUT ROWID
+    ''',
+    f"CREATE INDEX IF NOT EXISTS idx_properties_station_name ON properties ({GROUP_KEYS['station']})",
+    f"CREATE INDEX IF NOT EXISTS idx_properties_floor_plan ON properties ({GROUP_KEYS['floor_plan']})",
+)
+
+# 全体の分位点を、並べ替えた索引の n 番目として直接拾うための索引
+STATS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_properties_price ON properties (price)",
+    "CREATE INDEX IF NOT EXISTS idx_properties_age_price ON properties (age, price)",
+)
+
+
+def _mark_dirty(row):
+    """トリガーの中で、row（new / old）の属するグループを記録する文"""
+    return (
+        "INSERT OR IGNORE INTO price_stats_dirty (kind, value) VALUES "
+        f"('station', {STATION_NAME.format(c=row + '.station')}), "
+        f"('floor_plan', coalesce({row}.floor_plan, '')), "
+        "('all', '');"
+    )
+
+
+# 家賃・築年数・駅・間取りのどれかが変わったときだけ記録する
+# （再スクレイピングで last_seen だけが更新された行は集計に関係しない）
+STATS_TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS price_stats_ai AFTER INSERT ON properties BEGIN
+        {_mark_dirty("new")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS price_stats_ad AFTER DELETE ON properties BEGIN
+        {_mark_dirty("old")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS price_stats_au AFTER UPDATE OF price, age, station, floor_plan ON properties
+    WHEN old.price IS NOT new.price OR old.age IS NOT new.age
+      OR old.station IS NOT new.station OR old.floor_plan IS NOT new.floor_plan
+    BEGIN
+        {_mark_dirty("old")}
+        {_mark_dirty("new")}
+    END
+    ''',
+)
+
+
+# --- 🗄 集計表の準備 ---
+
+def ensure_stats(conn):
+    """集計表とトリガーを用意する
+
+    トリガーが無いとき（初回）は、すべてのグループを集計し直す対象にする。
+    分位点用の索引は、前の版で作った集計表にも後から足す。
+    """
+    has_trigger = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'price_stats_ai'"
+    ).fetchone()
+    with conn:
+        for sql in STATS_INDEXES:
+            conn.execute(sql)
+    if has_trigger:
+        return
+    with conn:
+        for sql in STATS_SCHEMA + STATS_TRIGGERS:
+            conn.execute(sql)
+        for kind, key in GROUP_KEYS.items():
+            conn.execute(
+                f"INSERT OR IGNORE INTO price_stats_dirty (kind, value) SELECT DISTINCT ?, {key} FROM properties",
+                (kind,),
+            )
+        conn.execute("INSERT OR IGNORE INTO price_stats_dirty (kind, value) VALUES (?, ?)", ALL)
+
+
+# --- 📊 集計 ---
+
+def summarize(prices, ages):
+    """1グループ分の家賃・築年数の配列から集計値を求める"""
+    p10, p25, median, p75, p90 = np.percentile(prices, PERCENTILES)
+    hist, _ = np.histogram(np.minimum(prices, HIST_MAX), bins=HIST_EDGES)
+    valid_ages = ages[ages >= 0]
+    return (
+        len(prices), p10, p25, median, p75, p90,
+        int(prices.min()), int(prices.max()), float(prices.mean()),
+        float(np.median(valid_ages)) if len(valid_ages) else None,
+        json.dumps(hist.tolist()),
+    )
+
+
+def _load_groups(conn, key, dirty, chunk=500):
+    """dirty のグループに属する行を (グループ名の配列, 家賃, 築年数) で読む
+
+    グループ名は IN (?, ...) で直接渡す（そのほうが式の索引が確実に使われる）。
+    """
+    rows = []
+    for start in range(0, len(dirty), chunk):
+        values = dirty[start:start + chunk]
+        rows += conn.execute(
+            f"SELECT {key}, price, coalesce(age, -1) FROM properties "
+            f"WHERE price IS NOT NULL AND {key} IN ({', '.join('?' * len(values))})",
+            values,
+        ).fetchall()
+    if not rows:
+        return np.array([], dtype=object), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    values, prices, ages = zip(*rows)
+    return np.array(values, dtype=object), np.array(prices, dtype=np.int64), np.array(ages, dtype=np.int64)
+
+
+def _group_stats(values, prices, ages):
+    """グループ名ごとに行を並べ替えて分け、それぞれを集計する"""
+    if not len(values):
+        return {}
+    names, codes = np.unique(values, return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.cumsum(np.bincount(codes, minlength=len(names)))[:-1]
+    return {
+        name: summarize(p, a)
+        for name, p, a in zip(names, np.split(prices[order], bounds), np.split(ages[order], bounds))
+    }
+
+
+def _percentile(conn, column, where, n, q):
+    """column を小さい順に並べた n 件の q パーセント点（np.percentile と同じ線形補間）
+
+    OFFSET の分だけ索引を先頭から数えながらたどるので、かかる時間は順位に比例する（O(n)）。
+    表の行は読まず、Python に渡るのも前後2件だけなので、全物件を読み込むよりは軽い。
+    """
+    position = (n - 1) * q / 100
+    lower = int(position)
+    values = [row[0] for row in conn.execute(
+        f"SELECT {column} FROM properties WHERE {where} ORDER BY {column} LIMIT 2 OFFSET ?", (lower,))]
+    if len(values) == 1:
+        return float(values[0])
+    return values[0] + (values[1] - values[0]) * (position - lower)
+
+
+def _all_stats(conn):
+    """全体の集計を、間取り別の集計（先に更新しておく）と索引から求める
+
+    件数・最小・最大・平均・ヒストグラムは間取り別を足し合わせる（どの物件もちょうど1つの間取りに入る）。
+    分位点と築年数の中央値は足し合わせられないので、索引を該当する順位までたどって値を読む。
+    """
+    groups = conn.execute(
+        "SELECT n, price_min, price_max, mean, hist FROM price_stats WHERE kind = 'floor_plan'"
+    ).fetchall()
+    if not groups:
+        return {}
+    n = sum(row[0] for row in groups)
+    hist = np.sum([json.loads(row[4]) for row in groups], axis=0)
+    where = "price IS NOT NULL"
+    percentiles = [_percentile(conn, "price", where, n, q) for q in PERCENTILES]
+    age_where = "age >= 0 AND price IS NOT NULL"
+    n_ages = conn.execute(f"SELECT COUNT(*) FROM properties WHERE {age_where}").fetchone()[0]
+    return {ALL[1]: (
+        n, *percentiles,
+        min(row[1] for row in groups), max(row[2] for row in groups),
+        sum(row[0] * row[3] for row in groups) / n,
+        _percentile(conn, "age", age_where, n_ages, 50) if n_ages else None,
+        json.dumps(hist.tolist()),
+    )}
+
+
+def refresh(conn):
+    """集計し直す必要のあるグループだけを集計する。集計したグループ数を返す
+
+    全体（'all'）は間取り別の集計から作るので、間取り別のあとに更新する。
+    """
+    ensure_stats(conn)
+    kinds = dict(GROUP_KEYS, **{ALL[0]: None})
+    count = 0
+    with conn:
+        for kind, key in kinds.items():
+            dirty = [row[0] for row in conn.execute("SELECT value FROM price_stats_dirty WHERE kind = ?", (kind,))]
+            if not dirty:
+                continue
+            stats = _all_stats(conn) if kind == ALL[0] else _group_stats(*_load_groups(conn, key, dirty))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO price_stats ({STATS_COLUMNS}, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                [(kind, value) + row for value, row in stats.items()],
+            )
+            # 物件がなくなったグループは集計も消す
+            conn.executemany(
+                "DELETE FROM price_stats WHERE kind = ? AND value = ?",
+                [(kind, value) for value in dirty if value not in stats],
+            )
+            conn.execute("DELETE FROM price_stats_dirty WHERE kind = ?", (kind,))
+            count += len(dirty)
+    return count
+
+
+# --- 📖 読み出し（ダッシュボード用） ---
+
+def load_stats(conn, kind, limit=None):
+    """kind の集計を件数の多い順に返す（各行は STATS_COLUMNS の順、hist はリストに戻す）"""
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_stats'"
+    ).fetchone()
+    if not has_table:
+        return []
+    query = f"SELECT {STATS_COLUMNS} FROM price_stats WHERE kind = ? ORDER BY n DESC, value"
+    params = (kind,)
+    if limit:
+        query += " LIMIT ?"
+        params += (limit,)
+    return [row[:-1] + (json.loads(row[-1]),) for row in conn.execute(query, params)]
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "最終課題.db")
+    print(f"{refresh(conn)} グループを集計しました")
+    conn.close()
@@ -0,0 +1,70 @@
+"""列ごとの書き出し（columnar.py）のベンチマーク
+
+    python bench_columnar.py [件数]      # 既定は 2,000,000 件
+
+疑似データの properties テーブルを一時ファイルに作り、
+「全件を fetchall() して家賃の中央値を求める」のと
+「書き出した .npy を開いて同じ中央値を求める」の時間とメモリを比べる。
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import columnar
+from bench_search import make_db
+
+
+def measure(func, repeat=3):
+    """(中央値の秒数, 最大メモリ使用量) を返す"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main(n_rows=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        out_dir = os.path.join(tmp, "snapshot", "properties")
+        conn = make_db(path, n_rows)
+
+        start = time.perf_counter()
+        columnar.export(conn, "properties", out_dir)
+        print(f"{n_rows:,} 件を書き出し: {time.perf_counter() - start:.1f} 秒")
+
+        def with_sqlite():
+            rows = conn.execute("SELECT * FROM properties").fetchall()
+            return statistics.median(row[3] for row in rows)
+
+        def with_snapshot():
+            snapshot = columnar.load(out_dir)
+            return float(np.median(snapshot["price"]))
+
+        def with_snapshot_filter():
+            # 文字列の列も番号で比べるので、文字列は作らない
+            snapshot = columnar.load(out_dir)
+            return float(np.median(snapshot["price"][snapshot["floor_plan"] == "1K"]))
+
+        assert with_sqlite() == with_snapshot()
+        print(f"{'方法':<24} {'時間':>10} {'最大メモリ':>12}")
+        for label, func in (("fetchall + median", with_sqlite),
+                            ("npy (mmap) + median", with_snapshot),
+                            ("npy (mmap) 1K だけ", with_snapshot_filter)):
+            seconds, peak = measure(func)
+            print(f"{label:<24} {seconds * 1e3:>8.1f}ms {peak / 1024 / 1024:>10.1f}MB")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,115 @@
+"""物件検索のベンチマーク（LIKE と FTS5 trigram・2文字索引の比較）
+
+    python bench_search.py [件数]      # 既定は 1,000,000 件
+
+疑似データの properties テーブルを一時ファイルに作り、
+同じキーワードで「件数 + 先頭1ページ」を LIKE と索引（3文字以上は全文検索、2文字以下は2文字索引）で
+取得する時間を比べる。
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import property_db
+
+STATIONS = ["渋谷", "新宿", "池袋", "上野", "品川", "目黒", "中野", "吉祥寺", "三鷹", "立川",
+            "つくば", "土浦", "牛久", "水戸", "柏", "松戸", "船橋", "千葉", "大宮", "浦和"]
+LINES = ["JR山手線", "JR中央線", "東急東横線", "京王井の頭線", "つくばエクスプレス", "JR常磐線"]
+NAMES = ["ハイツ", "コーポ", "メゾン", "レジデンス", "パレス", "グリーンヒル", "サンライズ", "アビタシオン"]
+PLANS = ["1R", "1K", "1DK", "1LDK", "2K", "2DK", "2LDK", "3LDK"]
+
+# よく当たる語（1〜2割の行に一致）と、ほとんど当たらない語の両方で比べる
+# 駅名の多くは2文字なので、2文字・1文字のキーワードも入れる
+KEYWORDS = ["吉祥寺", "グリーンヒル", "東横線", "ハイツ", "レジデンス目黒42", "パレス柏7", "存在しない物件",
+            "渋谷", "新宿", "池袋", "柏"]
+
+
+def make_db(path, n_rows, seed=0):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE properties (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            station TEXT,
+            price INTEGER,
+            age INTEGER,
+            floor_plan TEXT
+        )
+    ''')
+
+    def rows():
+        for i in range(n_rows):
+            station = rnd.choice(STATIONS)
+            yield (
+                f"{rnd.choice(NAMES)}{rnd.choice(STATIONS)}{i % 1000}",
+                f"{rnd.choice(LINES)}/{station}駅 歩{rnd.randint(1, 20)}分",
+                rnd.randrange(30000, 200000, 1000),
+                rnd.randint(0, 50),
+                rnd.choice(PLANS),
+            )
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO properties (name, station, price, age, floor_plan) VALUES (?, ?, ?, ?, ?)", rows()
+        )
+    return conn
+
+
+def like_search(conn, keyword):
+    """以前の検索と同じ LIKE '%kw%'（件数 + 先頭ページ）"""
+    total = conn.execute(
+        "SELECT COUNT(*) FROM properties WHERE station LIKE ? OR name LIKE ?", (f'%{keyword}%',) * 2
+    ).fetchone()[0]
+    rows = conn.execute(
+        "SELECT id, name, station, price, age, floor_plan FROM properties "
+        "WHERE station LIKE ? OR name LIKE ? ORDER BY id LIMIT ?", (f'%{keyword}%',) * 2 + (property_db.PAGE_SIZE,)
+    ).fetchall()
+    return total, rows
+
+
+def index_search(conn, keyword):
+    """property_db の検索（件数 + 先頭ページ）"""
+    return property_db.count_rows(conn, keyword), property_db.fetch_page(conn, keyword)
+
+
+def timed(func, conn, keyword, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(conn, keyword)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result[0]
+
+
+def main(n_rows=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        start = time.perf_counter()
+        conn = make_db(path, n_rows)
+        print(f"疑似データ {n_rows:,} 件を作成: {time.perf_counter() - start:.1f} 秒")
+
+        start = time.perf_counter()
+        property_db.ensure_fts(conn)
+        print(f"全文検索・2文字索引を作成: {time.perf_counter() - start:.1f} 秒")
+        print(f"DBサイズ: {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        print()
+
+        print(f"{'キーワード':<10} {'件数':>10} {'LIKE':>10} {'索引':>10} {'倍率':>7}")
+        for keyword in KEYWORDS:
+            like_time, like_total = timed(like_search, conn, keyword)
+            index_time, index_total = timed(index_search, conn, keyword)
+            note = "" if property_db.use_fts(keyword) else "（2文字索引）"
+            mismatch = "" if like_total == index_total else f"  ※件数不一致 {index_total:,}"
+            print(f"{keyword:<10} {like_total:>10,} {like_time * 1e3:>8.1f}ms {index_time * 1e3:>8.1f}ms "
+                  f"{like_time / index_time:>6.1f}x {note}{mismatch}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
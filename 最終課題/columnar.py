@@ -0,0 +1,251 @@
+"""SQLite のテーブルを列ごとの .npy ファイルに書き出す / 読み込む
+
+    python columnar.py [DBのパス] [テーブル名] [出力先]
+    python columnar.py 最終課題.db properties snapshot/properties
+    python columnar.py ../個人課題３/weather.db forecasts snapshot/forecasts
+
+分析のたびに sqlite3 の行タプルを作ると、行数 × 列数の Python オブジェクトができる。
+書き出しておけば、load() は np.load(mmap_mode='r') で開くだけなので、
+数百万件でもすぐに開け、実際に読んだ部分だけがメモリに載る。
+
+出力先のディレクトリには次のファイルができる。
+    meta.json           テーブル名、行数、列の一覧
+    <列>.npy            数値の列（INTEGER は int64、REAL は float64）
+    <列>.codes.npy      文字列の列は辞書の番号（int32、NULL は -1）
+    <列>.dict.json      番号 → 文字列
+    <列>.null.npy       数値の列に NULL があるときだけ、NULL の位置（bool）
+"""
+import json
+import os
+import shutil
+import sqlite3
+import sys
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+FORMAT_VERSION = 1
+CHUNK_ROWS = 50000
+
+
+# --- 📤 書き出し ---
+
+def _column_kinds(conn, table):
+    """(列名, 種類) のリスト。種類は宣言された型から 'int' / 'float' / 'dict' を決める"""
+    kinds = []
+    for _, name, decl, *_ in conn.execute(f'PRAGMA table_info("{table}")'):
+        decl = (decl or "").upper()
+        if "INT" in decl:
+            kinds.append((name, "int"))
+        elif any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+            kinds.append((name, "float"))
+        else:
+            kinds.append((name, "dict"))
+    if not kinds:
+        raise ValueError(f"テーブル {table} が見つかりません")
+    return kinds
+
+
+def export(conn, table, out_dir, columns=None, chunk_rows=CHUNK_ROWS):
+    """table を out_dir に書き出す。書き出した行数を返す
+
+    全体を1つの読み取りトランザクションで読むので、書き出し中に追加された行は入らない。
+    書き出しは一時ディレクトリに行い、終わってから差し替える（途中で止まっても前の版が残る）。
+    """
+    kinds = _column_kinds(conn, table)
+    if columns:
+        kinds = [(name, kind) for name, kind in kinds if name in columns]
+    names = ", ".join(f'"{name}"' for name, _ in kinds)
+
+    tmp_dir = out_dir.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN")
+    try:
+        n_rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        arrays, nulls, dicts = [], {}, {}
+        for name, kind in kinds:
+            if kind == "dict":
+                dtype, file = np.int32, f"{name}.codes.npy"
+                dicts[name] = {}
+            else:
+                dtype, file = (np.int64 if kind == "int" else np.float64), f"{name}.npy"
+            arrays.append(np.lib.format.open_memmap(os.path.join(tmp_dir, file), mode="w+",
+                                                    dtype=dtype, shape=(n_rows,)))
+
+        cursor = conn.execute(f'SELECT {names} FROM "{table}"')
+        start = 0
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            end = start + len(rows)
+            for i, ((name, kind), values) in enumerate(zip(kinds, zip(*rows))):
+                if kind == "dict":
+                    # 初めて出てきた文字列に番号を振る（NULL は -1）
+                    table_ = dicts[name]
+                    arrays[i][start:end] = [-1 if v is None else table_.setdefault(v, len(table_)) for v in values]
+                    continue
+                if None in values:
+                    mask = nulls.setdefault(name, np.zeros(n_rows, dtype=bool))
+                    mask[start:end] = [v is None for v in values]
+                    values = [0 if v is None else v for v in values]
+                arrays[i][start:end] = values
+            start = end
+    finally:
+        if not in_transaction:
+            conn.rollback()
+
+    for array in arrays:
+        array.flush()
+    del arrays
+    for name, mask in nulls.items():
+        np.save(os.path.join(tmp_dir, f"{name}.null.npy"), mask)
+    for name, table_ in dicts.items():
+        with open(os.path.join(tmp_dir, f"{name}.dict.json"), "w", encoding="utf-8") as f:
+            json.dump(list(table_), f, ensure_ascii=False)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "table": table,
+        "rows": start,
+        "columns": [{"name": name, "kind": kind, "nullable": name in nulls} for name, kind in kinds],
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+
+    old_dir = out_dir.rstrip("/\\") + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return start
+
+
+# --- 📥 読み込み ---
+
+class DictColumn:
+    """辞書で符号化した文字列の列（codes は番号の配列、categories は番号 → 文字列）"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code_of(self, value):
+        """value の番号（無ければ -2。どの行とも一致しない）"""
+        hits = np.flatnonzero(self.categories == value)
+        return int(hits[0]) if len(hits) else -2
+
+    def __eq__(self, value):
+        # 文字列を1回だけ番号に直し、比較は整数の配列で行う
+        return self.codes == self.code_of(value)
+
+    def decode(self, index=slice(None)):
+        """文字列に戻す（NULL は None）"""
+        codes = np.asarray(self.codes[index])
+        values = np.append(self.categories, None)
+        return values[codes]
+
+
+class Snapshot:
+    """export() で書き出したディレクトリを開いたもの
+
+    snapshot["price"] は数値の配列（読み取り専用の memmap）、
+    文字列の列は DictColumn を返す。
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"対応していない形式です: {path}")
+        self.mmap_mode = "r" if mmap else None
+        self.kinds = {col["name"]: col["kind"] for col in self.meta["columns"]}
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self):
+        return list(self.kinds)
+
+    def _load(self, file):
+        return np.load(os.path.join(self.path, file), mmap_mode=self.mmap_mode)
+
+    def __getitem__(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            if self.kinds[name] == "dict":
+                with open(os.path.join(self.path, f"{name}.dict.json"), encoding="utf-8") as f:
+                    categories = np.array(json.load(f), dtype=object)
+                column = DictColumn(self._load(f"{name}.codes.npy"), categories)
+            else:
+                column = self._load(f"{name}.npy")
+            self._columns[name] = column
+        return column
+
+    def nulls(self, name):
+        """数値の列の NULL の位置（NULL が無ければ None）"""
+        column = next(col for col in self.meta["columns"] if col["name"] == name)
+        return self._load(f"{name}.null.npy") if column["nullable"] else None
+
+    def to_pandas(self, columns=None):
+        """pandas の DataFrame にする（文字列の列は Categorical になり、文字列を複製しない）"""
+        import pandas as pd
+
+        data = {}
+        for name in columns or self.columns:
+            column = self[name]
+            if isinstance(column, DictColumn):
+                data[name] = pd.Categorical.from_codes(np.where(column.codes < 0, -1, column.codes),
+                                                       categories=column.categories)
+            else:
+                mask = self.nulls(name)
+                if mask is not None:
+                    # NULL のある列だけは NA を入れられる型にコピーする
+                    column = pd.array(column, dtype="Int64" if column.dtype.kind == "i" else "Float64")
+                    column[np.asarray(mask)] = pd.NA
+                data[name] = column
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self, columns=None):
+        """pyarrow の Table にする（pyarrow が入っているときだけ）"""
+        if pa is None:
+            raise RuntimeError("pyarrow がインストールされていません")
+        arrays = []
+        names = columns or self.columns
+        for name in names:
+            column = self[name]
+            if isinstance(column, DictColumn):
+                codes = pa.array(column.codes, mask=np.asarray(column.codes) < 0)
+                arrays.append(pa.DictionaryArray.from_arrays(codes, pa.array(column.categories, pa.string())))
+            else:
+                arrays.append(pa.array(column, mask=self.nulls(name)))
+        return pa.Table.from_arrays(arrays, names=names)
+
+
+def load(path, mmap=True):
+    """export() で書き出したディレクトリを開く"""
+    return Snapshot(path, mmap)
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "最終課題.db"
+    table = sys.argv[2] if len(sys.argv) > 2 else "properties"
+    out_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join("snapshot", table)
+    conn = sqlite3.connect(db_path)
+    print(f"{table}: {export(conn, table, out_dir):,} 行を {out_dir} に書き出しました")
+    conn.close()
@@ -0,0 +1,224 @@
+import sqlite3
+
+# properties テーブルの検索（ダッシュボード用）
+# 一度に全件を読まず、目印の行から続きを取り出すページ送り（キーセットページネーション）で
+# 必要な分だけ取り出す。OFFSET と違い、何ページ目でも索引で直接たどれる。
+#
+# キーワード検索は FTS5 の全文検索索引（trigram）を使う。
+# LIKE '%駅名%' は索引が使えず毎回全件を読むが、trigram なら3文字ずつの索引から候補を引ける。
+# trigram は3文字未満の語を引けないので、2文字以下のキーワード（渋谷・新宿など駅名の多く）は
+# name / station を2文字ずつに区切った索引（properties_bigram）から引く。
+#
+# キーワードが無いときは新しく載った物件から順に並べる。
+# スクレイパーは既にある物件を書き換えず last_seen だけ更新するので、id の大きい順 = first_seen の新しい順。
+
+DB_PATH = '最終課題/最終課題.db'
+PAGE_SIZE = 50
+MIN_FTS_LENGTH = 3
+BIGRAM_MAX_LENGTH = 1000  # 2文字索引に入れる name / station の長さの上限
+
+# 取得する行は (id, name, station, price, age, floor_plan, rank)
+# rank は全文検索の関連度（小さいほど一致度が高い）。全文検索以外では 0
+COLUMNS = "p.id, p.name, p.station, p.price, p.age, p.floor_plan"
+
+FTS_SCHEMA = (
+    # properties の name / station を索引にする外部コンテンツ型の全文検索テーブル
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+        name, station, content='properties', content_rowid='id', tokenize='trigram'
+    )
+    ''',
+    # properties の追加・更新・削除に合わせて索引も更新する
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+        INSERT INTO properties_fts (rowid, name, station) VALUES (new.id, new.name, new.station);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+        INSERT INTO properties_fts (properties_fts, rowid, name, station)
+        VALUES ('delete', old.id, old.name, old.station);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF name, station ON properties BEGIN
+        INSERT INTO properties_fts (properties_fts, rowid, name, station)
+        VALUES ('delete', old.id, old.name, old.station);
+        INSERT INTO properties_fts (rowid, name, station) VALUES (new.id, new.name, new.station);
+    END
+    ''',
+)
+
+
+BIGRAM_SCHEMA = (
+    # 1 から BIGRAM_MAX_LENGTH までの番号（トリガーの中では WITH RECURSIVE が使えないので表にしておく）
+    "CREATE TABLE IF NOT EXISTS bigram_positions (n INTEGER PRIMARY KEY)",
+    f'''
+    INSERT OR IGNORE INTO bigram_positions (n)
+    WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {BIGRAM_MAX_LENGTH})
+    SELECT n FROM seq
+    ''',
+    # name / station の2文字ずつ（英字は小文字にする）。末尾の1文字も1文字のまま入れるので、
+    # 1文字のキーワードは「その文字で始まる gram」の範囲で引ける
+    '''
+    CREATE TABLE IF NOT EXISTS properties_bigram (
+        gram TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        PRIMARY KEY (gram, id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_bigram_ai AFTER INSERT ON properties BEGIN
+        INSERT OR IGNORE INTO properties_bigram (gram, id)
+        SELECT lower(substr(new.name, n, 2)), new.id FROM bigram_positions WHERE n <= length(new.name)
+        UNION SELECT lower(substr(new.station, n, 2)), new.id FROM bigram_positions WHERE n <= length(new.station);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_bigram_ad AFTER DELETE ON properties BEGIN
+        DELETE FROM properties_bigram WHERE id = old.id AND gram IN (
+            SELECT lower(substr(old.name, n, 2)) FROM bigram_positions WHERE n <= length(old.name)
+            UNION SELECT lower(substr(old.station, n, 2)) FROM bigram_positions WHERE n <= length(old.station)
+        );
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS properties_bigram_au AFTER UPDATE OF name, station ON properties BEGIN
+        DELETE FROM properties_bigram WHERE id = old.id AND gram IN (
+            SELECT lower(substr(old.name, n, 2)) FROM bigram_positions WHERE n <= length(old.name)
+            UNION SELECT lower(substr(old.station, n, 2)) FROM bigram_positions WHERE n <= length(old.station)
+        );
+        INSERT OR IGNORE INTO properties_bigram (gram, id)
+        SELECT lower(substr(new.name, n, 2)), new.id FROM bigram_positions WHERE n <= length(new.name)
+        UNION SELECT lower(substr(new.station, n, 2)), new.id FROM bigram_positions WHERE n <= length(new.station);
+    END
+    ''',
+)
+
+BIGRAM_REBUILD = (
+    "DELETE FROM properties_bigram",
+    # 主キーの順に並べてから入れると、索引の途中への挿入にならず速い
+    '''
+    INSERT OR IGNORE INTO properties_bigram (gram, id)
+    SELECT gram, id FROM (
+        SELECT lower(substr(p.name, b.n, 2)) AS gram, p.id AS id
+        FROM properties p JOIN bigram_positions b ON b.n <= length(p.name)
+        UNION ALL
+        SELECT lower(substr(p.station, b.n, 2)), p.id
+        FROM properties p JOIN bigram_positions b ON b.n <= length(p.station)
+    )
+    ORDER BY gram, id
+    ''',
+)
+
+
+def connect(path=DB_PATH):
+    """ダッシュボードで使い回す接続"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    ensure_fts(conn)
+    return conn
+
+
+def ensure_fts(conn):
+    """全文検索と2文字索引の索引・トリガーを用意する
+
+    トリガーが無いとき（初回、または properties が作り直されたとき）は索引を作り直す。
+    """
+    has_properties = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'properties'"
+    ).fetchone()
+    if not has_properties:
+        return
+    indexes = [
+        ("properties_fts_ai", FTS_SCHEMA, ("INSERT INTO properties_fts (properties_fts) VALUES ('rebuild')",)),
+        ("properties_bigram_ai", BIGRAM_SCHEMA, BIGRAM_REBUILD),
+    ]
+    for trigger, schema, rebuild in indexes:
+        has_trigger = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (trigger,)
+        ).fetchone()
+        if has_trigger:
+            continue
+        with conn:
+            for sql in schema + rebuild:
+                conn.execute(sql)
+
+
+def _fts_query(keyword):
+    """キーワードを FTS5 の語句として安全に渡す（記号などはそのまま文字として探す）"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def use_fts(keyword):
+    return len(keyword) >= MIN_FTS_LENGTH
+
+
+def _bigram_where(keyword):
+    """2文字以下のキーワードの条件（キーワードが無ければ条件なし）
+
+    「キーワードで始まる gram」の範囲を2文字索引で引く。英字の大小は LIKE と同じく区別しない。
+    """
+    if keyword:
+        return ("p.id IN (SELECT id FROM properties_bigram WHERE gram >= lower(?) AND gram < lower(?) || char(1114111))",
+                [keyword, keyword])
+    return "1", []
+
+
+def fetch_page(conn, keyword="", after=None, limit=PAGE_SIZE):
+    """after（前のページの最後の行）より後ろの1ページ分を取得
+
+    全文検索では関連度の高い順、キーワードなしは新しい順（id の降順）、それ以外は id の昇順に並ぶ。
+    """
+    if use_fts(keyword):
+        rank, last_id = (after[6], after[0]) if after else (float("-inf"), 0)
+        query = f'''
+            SELECT {COLUMNS}, f.rank FROM properties_fts f JOIN properties p ON p.id = f.rowid
+            WHERE properties_fts MATCH ? AND (f.rank > ? OR (f.rank = ? AND f.rowid > ?))
+            ORDER BY f.rank ASC, f.rowid ASC LIMIT ?
+        '''
+        return conn.execute(query, (_fts_query(keyword), rank, rank, last_id, limit)).fetchall()
+
+    if not keyword:
+        if after is None:
+            query = f"SELECT {COLUMNS}, 0 FROM properties p ORDER BY p.id DESC LIMIT ?"
+            return conn.execute(query, (limit,)).fetchall()
+        query = f"SELECT {COLUMNS}, 0 FROM properties p WHERE p.id < ? ORDER BY p.id DESC LIMIT ?"
+        return conn.execute(query, (after[0], limit)).fetchall()
+
+    where, params = _bigram_where(keyword)
+    last_id = after[0] if after else 0
+    query = f"SELECT {COLUMNS}, 0 FROM properties p WHERE {where} AND p.id > ? ORDER BY p.id ASC LIMIT ?"
+    return conn.execute(query, params + [last_id, limit]).fetchall()
+
+
+def fetch_page_before(conn, keyword="", before=None, limit=PAGE_SIZE):
+    """before（今のページの最初の行）より前の1ページ分を取得（上にスクロールして戻るとき用）"""
+    if before is None:
+        return []
+    if use_fts(keyword):
+        rank, first_id = before[6], before[0]
+        query = f'''
+            SELECT {COLUMNS}, f.rank FROM properties_fts f JOIN properties p ON p.id = f.rowid
+            WHERE properties_fts MATCH ? AND (f.rank < ? OR (f.rank = ? AND f.rowid < ?))
+            ORDER BY f.rank DESC, f.rowid DESC LIMIT ?
+        '''
+        rows = conn.execute(query, (_fts_query(keyword), rank, rank, first_id, limit)).fetchall()
+    elif not keyword:
+        query = f"SELECT {COLUMNS}, 0 FROM properties p WHERE p.id > ? ORDER BY p.id ASC LIMIT ?"
+        rows = conn.execute(query, (before[0], limit)).fetchall()
+    else:
+        where, params = _bigram_where(keyword)
+        query = f"SELECT {COLUMNS}, 0 FROM properties p WHERE {where} AND p.id < ? ORDER BY p.id DESC LIMIT ?"
+        rows = conn.execute(query, params + [before[0], limit]).fetchall()
+    rows.reverse()
+    return rows
+
+
+def count_rows(conn, keyword=""):
+    """条件に一致する件数"""
+    if use_fts(keyword):
+        return conn.execute(
+            "SELECT COUNT(*) FROM properties_fts WHERE properties_fts MATCH ?", (_fts_query(keyword),)
+        ).fetchone()[0]
+    where, params = _bigram_where(keyword)
+    return conn.execute(f"SELECT COUNT(*) FROM properties p WHERE {where}", params).fetchone()[0]
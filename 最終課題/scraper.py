@@ -0,0 +1,438 @@
+import hashlib
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+import analytics
+
+# SUUMO の賃貸一覧をスクレイピングして properties テーブルに保存するモジュール
+#   - ページは並列で取得する（リクエストの開始間隔は min_interval 秒以上あける）
+#   - HTML は cassetteitem の部分だけを解析する（lxml があればそれを使う）
+#   - 解析した行はジェネレーターで流し、batch_size 件ずつ executemany する
+#   - 保存し終わったページは scrape_progress に記録し、途中で止まっても続きから再開する
+#     （再開しても、物件の日付はその実行を始めた日のまま。scrape_runs に実行ごとの日付を残す）
+#   - 物件は (物件名, 駅, 間取り, 家賃) のハッシュ listing_key で見分け、
+#     既にある物件は last_seen を更新するだけにする（同じ日に何度見ても書き込みは1回）
+#   - 全ページを取り終えた実行で見なかった物件（last_seen が実行の日付より前）は掲載が終わったもの（delisted_listings）
+#   - 保存が終わったら、変わったグループだけ家賃の集計（analytics.py）をやり直す
+#   - 保存しておいた HTML は backfill() で複数プロセスに分けて解析し、まとめて取り込める
+#   - archive_dir を渡すと取得した HTML をそのまま残し（../pipeline/archive.py）、replay() でネットワークなしに解析し直せる
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+BASE_URL = "https://suumo.jp/jj/chintai/ichiran/FR301FC001/?ar=030&bs=040&ra=008&cb=0.0&ct=9999999&et=9999999&cn=9999999&mb=0&mt=9999999&shkr1=03&shkr2=03&shkr3=03&shkr4=03&fw2=&ek=050026740&ek=050033920&ek=050016450&ek=050004200&ek=050032790&ek=050001460&ek=050024800&rn=0500"
+
+DEFAULT_MAX_WORKERS = 3
+DEFAULT_MIN_INTERVAL = 3.0  # 秒（負荷対策。以前の1ページずつ3秒待っていたのと同じ間隔で始める）
+DEFAULT_BATCH_SIZE = 500
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 物件のブロックだけを木にする（ヘッダーや広告などは解析しない）
+ONLY_ITEMS = SoupStrainer("div", class_="cassetteitem")
+
+
+# --- 🗄 データベース ---
+
+def listing_key(name, station, floor_plan, price):
+    """物件を見分けるキー（内容のハッシュ）"""
+    text = f"{name}\x1f{station}\x1f{floor_plan}\x1f{price}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def init_db(conn):
+    """テーブルの準備（既存のデータは消さない）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS properties (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            station TEXT,
+            price INTEGER,
+            age INTEGER,
+            floor_plan TEXT,
+            listing_key TEXT,
+            first_seen TEXT,
+            last_seen TEXT
+        )
+    ''')
+    migrate_listing_key(conn)
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_properties_key ON properties (listing_key)')
+    # どの実行でどのページまで保存したか
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_progress (
+            run_id TEXT,
+            page INTEGER,
+            rows INTEGER,
+            done_at TEXT,
+            PRIMARY KEY (run_id, page)
+        )
+    ''')
+    # 実行ごとの日付（物件の first_seen / last_seen に使う。途中から再開しても変えない）
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_runs (
+            run_id TEXT PRIMARY KEY,
+            seen_on TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+def migrate_listing_key(conn):
+    """listing_key などの列が無い古いテーブルを移行する
+
+    重複していた行は、一番古い（id が小さい）行だけを残す。
+    """
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(properties)')}
+    if 'listing_key' in columns:
+        return
+    today = date.today().isoformat()
+    with conn:
+        conn.execute('ALTER TABLE properties ADD COLUMN listing_key TEXT')
+        conn.execute('ALTER TABLE properties ADD COLUMN first_seen TEXT')
+        conn.execute('ALTER TABLE properties ADD COLUMN last_seen TEXT')
+        rows = conn.execute('SELECT id, name, station, floor_plan, price FROM properties').fetchall()
+        conn.executemany(
+            'UPDATE properties SET listing_key = ?, first_seen = ?, last_seen = ? WHERE id = ?',
+            [(listing_key(name, station, floor_plan, price), today, today, id_)
+             for id_, name, station, floor_plan, price in rows],
+        )
+        conn.execute('''
+            DELETE FROM properties WHERE id NOT IN (
+                SELECT MIN(id) FROM properties GROUP BY listing_key
+            )
+        ''')
+
+
+# 新しい物件は追加、既にある物件は「最後に見た日」と築年数だけ更新する
+# 同じ日に同じ物件をもう一度見ても（複数ページに載っていても）何も書き込まない
+UPSERT_SQL = '''
+    INSERT INTO properties (name, station, price, age, floor_plan, listing_key, first_seen, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (listing_key) DO UPDATE SET
+        last_seen = excluded.last_seen,
+        age = excluded.age
+    WHERE properties.last_seen < excluded.last_seen
+       OR properties.age IS NOT excluded.age
+'''
+
+
+PROGRESS_SQL = "INSERT OR REPLACE INTO scrape_progress (run_id, page, rows, done_at) VALUES (?, ?, ?, datetime('now'))"
+
+
+def done_pages(conn, run_id):
+    """この実行で保存済みのページ"""
+    return {row[0] for row in conn.execute('SELECT page FROM scrape_progress WHERE run_id = ?', (run_id,))}
+
+
+def start_run(conn, run_id, seen_on=None):
+    """実行の日付を決めて scrape_runs に記録し、その日付（'YYYY-MM-DD'）を返す
+
+    続きから再開するときは、最初に記録した日付をそのまま使う（seen_on を渡しても変えない）。
+    last_seen は文字列のまま大小を比べるので、日付は ISO 形式でなければならない。
+    """
+    row = conn.execute('SELECT seen_on FROM scrape_runs WHERE run_id = ?', (run_id,)).fetchone()
+    if row:
+        return row[0]
+    seen_on = date.fromisoformat(seen_on).isoformat() if seen_on else date.today().isoformat()
+    with conn:
+        conn.execute('INSERT INTO scrape_runs (run_id, seen_on) VALUES (?, ?)', (run_id, seen_on))
+    return seen_on
+
+
+def run_date(conn, run_id):
+    """記録してある実行の日付（無ければ None）"""
+    row = conn.execute('SELECT seen_on FROM scrape_runs WHERE run_id = ?', (run_id,)).fetchone()
+    return row[0] if row else None
+
+
+def delisted_listings(conn, seen_on):
+    """seen_on の実行で一度も見なかった物件 (id, name, station, price, floor_plan, last_seen)
+
+    その日の実行で全ページを取り終えてから使う（取れなかったページの物件も含まれてしまうため）。
+    """
+    return conn.execute(
+        'SELECT id, name, station, price, floor_plan, last_seen FROM properties '
+        'WHERE last_seen < ? ORDER BY id', (seen_on,)
+    ).fetchall()
+
+
+def save_rows(conn, rows, batch_size=DEFAULT_BATCH_SIZE, seen_on=None):
+    """行のイテラブルを batch_size 件ずつ UPSERT する（コミットはしない）
+
+    実際に追加・更新した件数を返す（変化のなかった行は数えない）。
+    """
+    rows = iter(rows)
+    changed = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return changed
+        changed += save_keyed_rows(conn, with_keys(batch), seen_on)
+
+
+def with_keys(rows):
+    """(name, station, price, age, floor_plan) に listing_key を付けた行にする"""
+    return [
+        (name, station, price, age, floor_plan, listing_key(name, station, floor_plan, price))
+        for name, station, price, age, floor_plan in rows
+    ]
+
+
+def save_keyed_rows(conn, rows, seen_on=None):
+    """listing_key 付きの行をまとめて UPSERT し、追加・更新した件数を返す（コミットはしない）"""
+    seen_on = seen_on or date.today().isoformat()
+    # rowcount は properties の行だけを数える（全文検索のトリガーが書いた分は入らない）
+    return conn.executemany(UPSERT_SQL, [row + (seen_on, seen_on) for row in rows]).rowcount
+
+
+# --- 🌐 取得 ---
+
+class RateLimiter:
+    """リクエストの開始間隔を min_interval 秒以上あける（スレッド間で共有）"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def create_session(max_workers=DEFAULT_MAX_WORKERS):
+    """keep-alive の接続を使い回す Session"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_page(session, page, base_url=BASE_URL, limiter=None, timeout=30):
+    """一覧の1ページ分の HTML を取得"""
+    if limiter:
+        limiter.wait()
+    res = session.get(f"{base_url}&page={page}", timeout=timeout)
+    res.raise_for_status()
+    res.encoding = 'utf-8'
+    return res.text
+
+
+# --- 🔍 解析 ---
+
+def parse_price(text):
+    """'5.5万円' → 55000"""
+    return int(float(text.replace("万円", "")) * 10000)
+
+
+def parse_page(html):
+    """一覧ページの HTML から (name, station, price, age, floor_plan) を1行ずつ返す"""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=ONLY_ITEMS)
+    for item in soup.find_all("div", class_="cassetteitem"):
+        title_elem = item.find("div", class_="cassetteitem_content-title")
+        name = title_elem.text.strip() if title_elem else "不明"
+
+        station_elem = item.find("div", class_="cassetteitem_detail-col1")
+        station = station_elem.text.strip() if station_elem else "不明"
+
+        table = item.find("table", class_="cassetteitem_other")
+        tbody = table.find("tbody") if table else None
+        if not tbody:
+            continue
+        for tr in tbody.find_all("tr"):
+            try:
+                tds = tr.find_all("td")
+                price_elem = tds[3].find("li")
+                if price_elem:
+                    price = parse_price(price_elem.text.strip())
+                    floor_plan = tds[2].text.strip()
+                    yield (name, station, price, 0, floor_plan)
+            except (IndexError, ValueError):
+                continue
+
+
+# --- 🚀 実行 ---
+
+def run(db_path='最終課題.db', pages=range(1, 4), base_url=BASE_URL, run_id=None,
+        max_workers=DEFAULT_MAX_WORKERS, min_interval=DEFAULT_MIN_INTERVAL,
+        batch_size=DEFAULT_BATCH_SIZE, archive_dir=None, seen_on=None):
+    """指定ページをスクレイピングして保存する。追加・更新した件数を返す
+
+    run_id が同じなら保存済みのページは飛ばす（既定は今日の日付なので、同じ日の再実行は続きから）。
+    物件の first_seen / last_seen には実行の日付 seen_on（既定は今日。再開したときは最初の日付）を使う。
+    archive_dir を渡すと、取得した HTML を 'suumo.list' / '<run_id>/<ページ>' としてアーカイブに残す
+    （実行の日付も 'suumo.run' / '<run_id>' として残し、replay() で同じ日付を使う）。
+    """
+    run_id = run_id or date.today().isoformat()
+    conn = sqlite3.connect(db_path)
+    init_db(conn)
+    analytics.ensure_stats(conn)
+    seen_on = start_run(conn, run_id, seen_on)
+
+    todo = [p for p in pages if p not in done_pages(conn, run_id)]
+    if len(todo) < len(pages):
+        print(f"保存済みの {len(pages) - len(todo)} ページを飛ばします")
+
+    session = create_session(max_workers)
+    limiter = RateLimiter(min_interval)
+    archive = _pipeline("archive").Archive(archive_dir) if archive_dir else None
+    total = 0
+    failed = []
+    try:
+        if archive is not None:
+            archive.append(RUN_SOURCE, run_id, seen_on)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(fetch_page, session, p, base_url, limiter): p for p in todo}
+            # 取得できたページから順に、解析しながらそのまま保存する
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    html = future.result()
+                except requests.RequestException as e:
+                    print(f"Page {page} の取得に失敗: {e}")
+                    failed.append(page)
+                    continue
+                if archive is not None:
+                    archive.append(ARCHIVE_SOURCE, f"{run_id}/{page}", html)
+                with conn:
+                    saved = save_rows(conn, parse_page(html), batch_size, seen_on)
+                    conn.execute(PROGRESS_SQL, (run_id, page, saved))
+                total += saved
+                print(f"--- Page {page}: {saved} 件を追加・更新しました ---")
+        groups = analytics.refresh(conn)
+        print(f"家賃の集計: {groups} グループを更新しました")
+        if not failed:
+            print(f"{seen_on} に見なかった物件（掲載終了）: {len(delisted_listings(conn, seen_on))} 件")
+    finally:
+        session.close()
+        conn.close()
+        if archive is not None:
+            archive.close()
+    return total
+
+
+# --- 📦 保存しておいた HTML の取り込み（複数プロセス） ---
+# 解析（BeautifulSoup）は CPU を使うので、ページごとに別プロセスで解析し、
+# 書き込みは1つのプロセスが大きなトランザクションでまとめて行う（../pipeline/ingest.py）
+
+ARCHIVE_SOURCE = "suumo.list"
+RUN_SOURCE = "suumo.run"   # 実行の日付（本文は 'YYYY-MM-DD'）
+PAGE_NUMBER = re.compile(r"(\d+)(?!.*\d)")
+
+
+def _pipeline(name):
+    """../pipeline のモジュールを import する"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "pipeline")
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    return __import__(name)
+
+
+def page_of(path):
+    """ファイル名の最後の数字をページ番号にする（'page_12.html' → 12）"""
+    match = PAGE_NUMBER.search(os.path.basename(path))
+    return int(match.group(1)) if match else 0
+
+
+def parse_saved_page(item):
+    """(run_id, page, ファイルのパスかアーカイブの Ref) の HTML を解析する（解析プロセスで呼ばれる）"""
+    run_id, page, source = item
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = _pipeline("archive").read_ref(source).decode("utf-8")
+    return (run_id, page), with_keys(parse_page(html))
+
+
+def open_ingest_db(db_path):
+    """書き込みプロセスの接続（テーブルと集計のトリガーを用意する）"""
+    conn = sqlite3.connect(db_path)
+    init_db(conn)
+    analytics.ensure_stats(conn)
+    return conn
+
+
+def write_page(conn, key, rows):
+    """1ページ分を保存し、scrape_progress に記録する（日付は scrape_runs にある実行の日付、無ければ今日）"""
+    run_id, page = key
+    saved = save_keyed_rows(conn, rows, run_date(conn, run_id))
+    conn.execute(PROGRESS_SQL, (run_id, page, saved))
+    return saved
+
+
+def finish_ingest(conn):
+    groups = analytics.refresh(conn)
+    print(f"家賃の集計: {groups} グループを更新しました")
+
+
+def backfill(paths, db_path='最終課題.db', run_id=None, workers=None, commit_every=None, seen_on=None):
+    """保存しておいた一覧ページの HTML を複数プロセスで取り込む。(集計, 失敗したページ [(run_id, page)]) を返す
+
+    run_id（既定は今日の日付）で保存済みのページは飛ばす。seen_on は run() と同じ。
+    """
+    run_id = run_id or date.today().isoformat()
+    conn = open_ingest_db(db_path)
+    try:
+        start_run(conn, run_id, seen_on)
+        done = done_pages(conn, run_id)
+    finally:
+        conn.close()
+    items = [(run_id, page_of(path), path) for path in paths]
+    return _ingest_pages([item for item in items if item[1] not in done], db_path, workers, commit_every)
+
+
+def replay(archive_dir, db_path='最終課題.db', since=None, until=None, workers=None, commit_every=None):
+    """アーカイブに残した一覧ページを、ネットワークなしで解析し直して取り込む。(集計, 失敗したページ) を返す
+
+    パーサーを直したあとに使う。ページごとの run_id は取得したときのものをそのまま使う（保存済みでも飛ばさない）。
+    物件の日付は scrape_runs に記録してある実行の日付、無ければアーカイブに残した実行の日付、
+    それも無ければ取得した日にする。
+    since / until は取得時刻（UNIX 時刻）の範囲。
+    """
+    with _pipeline("archive").Archive(archive_dir) as archive:
+        records = archive.records(ARCHIVE_SOURCE, since=since, until=until, disk_order=True)
+        run_dates = {record.key: archive.read(record).decode("utf-8") for record in archive.records(RUN_SOURCE)}
+    items = []
+    fetched_on = {}
+    for record in records:
+        run_id, _, page = record.key.rpartition("/")
+        items.append((run_id, int(page), record.ref))
+        fetched_on.setdefault(run_id, run_dates.get(run_id) or date.fromtimestamp(record.fetched_at).isoformat())
+    conn = open_ingest_db(db_path)
+    try:
+        for run_id, day in fetched_on.items():
+            start_run(conn, run_id, day)
+    finally:
+        conn.close()
+    return _ingest_pages(items, db_path, workers, commit_every)
+
+
+def _ingest_pages(items, db_path, workers, commit_every):
+    ingest = _pipeline("ingest")
+    stats, errors = ingest.ingest(
+        items, db_path, parse_saved_page, open_ingest_db, write_page, finish_ingest,
+        workers=workers, commit_every=commit_every or ingest.DEFAULT_COMMIT_EVERY,
+    )
+    for (run_id, page, _), ex in errors:
+        print(f"{run_id} の Page {page} の解析に失敗: {ex}")
+    return stats, [(run_id, page) for (run_id, page, _), _ in errors]
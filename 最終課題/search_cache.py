@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+from property_db import PAGE_SIZE, count_rows, fetch_page, use_fts
+
+# 検索結果（件数 + 先頭ページ）のキャッシュ
+#   - 最近使ったキーワードから順に max_entries 件まで覚えておく（LRU）
+#   - properties が書き換えられたら、PRAGMA data_version の変化で気づいて全部捨てる
+#   - 前回のキーワードを伸ばした検索（「つく」→「つくば」など）は、
+#     前回の結果が全件そろっていればメモリ上で絞り込むだけで済ませる
+#     （全文検索と2文字索引では並び順と rank の意味が違うので、同じ探し方どうしのときだけ）
+
+
+def _matches(row, keyword):
+    """行が keyword を含むか（2文字索引 / trigram と同じく英字の大小は区別しない）"""
+    keyword = keyword.lower()
+    return keyword in row[1].lower() or keyword in row[2].lower()
+
+
+class SearchCache:
+    def __init__(self, conn, lock=None, max_entries=64):
+        self.conn = conn
+        self.lock = lock or threading.Lock()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.narrowed = 0  # 前のキーワードの結果から絞り込んだ回数
+        self.misses = 0
+        self._entries = OrderedDict()  # keyword -> (total, rows)
+        self._version = None
+
+    def _check_version(self):
+        """DBが書き換えられていたらキャッシュを捨てる（lock を持った状態で呼ぶ）"""
+        # data_version は他の接続がコミットすると変わる。自分の書き込みは total_changes で見る
+        version = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes)
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _narrow(self, keyword):
+        """keyword の先頭部分で、全件そろっている結果があればそこから絞り込む
+
+        2文字索引の結果（rank 0・id 順）から全文検索の結果を作ると、次のページを rank で続けられなくなるので、
+        先頭部分も keyword と同じ探し方（use_fts）のときだけ使う。
+        """
+        fts = use_fts(keyword)
+        for length in range(len(keyword) - 1, 0, -1):
+            if use_fts(keyword[:length]) != fts:
+                break
+            cached = self._entries.get(keyword[:length])
+            if cached is not None and cached[0] == len(cached[1]):
+                rows = [row for row in cached[1] if _matches(row, keyword)]
+                return len(rows), rows
+        return None
+
+    def _put(self, keyword, result):
+        self._entries[keyword] = result
+        self._entries.move_to_end(keyword)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def search(self, keyword):
+        """(件数, 先頭ページの行) を返す"""
+        with self.lock:
+            self._check_version()
+            cached = self._entries.get(keyword)
+            if cached is not None:
+                self._entries.move_to_end(keyword)
+                self.hits += 1
+                return cached
+
+            result = self._narrow(keyword) if keyword else None
+            if result is not None:
+                self.narrowed += 1
+            else:
+                self.misses += 1
+                result = (count_rows(self.conn, keyword), fetch_page(self.conn, keyword, None, PAGE_SIZE))
+            self._put(keyword, result)
+            return result
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
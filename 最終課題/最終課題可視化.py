@@ -1,6 +1,23 @@
+import asyncio
+import threading
+from collections import deque
+
 import flet as ft
 import sqlite3
 
+import analytics
+from property_db import DB_PATH, PAGE_SIZE, connect, fetch_page, fetch_page_before
+from search_cache import SearchCache
+
+# 表に同時に並べておくページ数（これを超えたら反対側のページを捨てる）
+WINDOW_PAGES = 4
+
+# 入力が止まってから検索を始めるまでの待ち時間（秒）
+DEBOUNCE_SECONDS = 0.25
+
+# 分析タブのグラフに並べるグループ数（件数の多い順）
+STATS_GROUPS = 15
+
 def main(page: ft.Page):
     # アプリの基本設定
     page.title = "物件データ検索アプリ"
@@ -10,40 +27,29 @@ def main(page: ft.Page):
     page.padding = 20
 
     # -----------------------------------------
-    # 1. データベースからデータを取得する関数
+    # 1. データベースへの接続（アプリ全体で1本を使い回す）
     # -----------------------------------------
-    def get_data_from_db(keyword=""):
-        conn = sqlite3.connect('最終課題/最終課題.db')
-        cur = conn.cursor()
-        
-        if keyword:
-            query = """
-                SELECT name, station, price, age, floor_plan 
-                FROM properties 
-                WHERE station LIKE ? OR name LIKE ?
-            """
-            cur.execute(query, (f'%{keyword}%', f'%{keyword}%'))
-        else:
-            cur.execute("SELECT name, station, price, age, floor_plan FROM properties LIMIT 100")
-            
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+    conn = connect()
+    db_lock = threading.Lock()
+
+    # 検索結果のキャッシュ（同じ接続とロックを使う）
+    search_cache = SearchCache(conn, db_lock)
 
     # -----------------------------------------
     # 2. データを画面の「表」に変換する関数
     # -----------------------------------------
     def create_table_rows(data):
+        # data の各行は (id, 物件名, 駅, 家賃, 築年数, 間取り, 関連度)
         rows = []
         for row in data:
             rows.append(
                 ft.DataRow(
                     cells=[
-                        ft.DataCell(ft.Text(row[0], size=12, weight="bold")), # 物件名
-                        ft.DataCell(ft.Text(row[1], size=12)),                # 駅
-                        ft.DataCell(ft.Text(f"{row[2]:,}円")),                 # 家賃
-                        ft.DataCell(ft.Text(f"築{row[3]}年")),                # 築年数
-                        ft.DataCell(ft.Text(row[4])),                         # 間取り
+                        ft.DataCell(ft.Text(row[1], size=12, weight="bold")), # 物件名
+                        ft.DataCell(ft.Text(row[2], size=12)),                # 駅
+                        ft.DataCell(ft.Text(f"{row[3]:,}円")),                 # 家賃
+                        ft.DataCell(ft.Text(f"築{row[4]}年")),                # 築年数
+                        ft.DataCell(ft.Text(row[5])),                         # 間取り
                     ]
                 )
             )
@@ -71,54 +77,286 @@ def main(page: ft.Page):
     )
 
     # -----------------------------------------
-    # 4. イベント処理（検索ボタン）
+    # 4. 表示中のページの管理
     # -----------------------------------------
-    def search_click(e):
-        keyword = search_field.value
-        results = get_data_from_db(keyword)
-        data_table.rows = create_table_rows(results)
-        
-        if len(results) == 0:
-            status_text.value = f"「{keyword}」に一致するデータは見つかりませんでした。"
+    # 表には最大 WINDOW_PAGES ページ分だけ行を作る。
+    # 下までスクロールしたら次のページを読み、上に戻ったら前のページを読み直す。
+    view = {
+        "keyword": "",
+        "total": 0,
+        "pages": deque(),     # 表示中のページ（各ページは (取得した行, 表の行) のタプル）
+        "at_end": False,      # 最後のページまで読んだか
+        "first_index": 0,     # 表示中の先頭行が何件目か（0始まり）
+    }
+    view_lock = threading.Lock()
+
+    def make_page(rows):
+        # 表の行はページを読んだときに1回だけ作る
+        return (rows, create_table_rows(rows))
+
+    def refresh_table():
+        data_table.rows = [table_row for _, table_rows in view["pages"] for table_row in table_rows]
+        shown = len(data_table.rows)
+        if view["total"] == 0:
+            if view["keyword"]:
+                status_text.value = f"「{view['keyword']}」に一致するデータは見つかりませんでした。"
+            else:
+                status_text.value = "データがありません。"
             status_text.color = ft.Colors.RED
         else:
-            status_text.value = f"検索結果: {len(results)} 件"
+            first = view["first_index"] + 1
+            status_text.value = f"検索結果: {view['total']:,} 件（{first:,}〜{first + shown - 1:,} 件目を表示中）"
             status_text.color = ft.Colors.BLACK
-            
+
+    def load_first_page(keyword):
+        """検索をやり直して先頭ページを表示"""
+        total, rows = search_cache.search(keyword)
+        show_first_page(keyword, total, rows)
+
+    def show_first_page(keyword, total, rows):
+        view["keyword"] = keyword
+        view["total"] = total
+        view["pages"] = deque([make_page(rows)]) if rows else deque()
+        # 全件そろっている結果（キャッシュで絞り込んだものなど）は、続きを読みに行かない
+        view["at_end"] = len(rows) < PAGE_SIZE or len(rows) >= total
+        view["first_index"] = 0
+        refresh_table()
+
+    def load_next_page():
+        """下のページを読み足す。増えすぎたら先頭のページを捨てる"""
+        if view["at_end"] or not view["pages"]:
+            return False
+        last_row = view["pages"][-1][0][-1]
+        with db_lock:
+            rows = fetch_page(conn, view["keyword"], last_row, PAGE_SIZE)
+        if len(rows) < PAGE_SIZE:
+            view["at_end"] = True
+        if not rows:
+            return False
+        view["pages"].append(make_page(rows))
+        if len(view["pages"]) > WINDOW_PAGES:
+            view["first_index"] += len(view["pages"].popleft()[0])
+        refresh_table()
+        return True
+
+    def load_prev_page():
+        """捨てた上のページを読み直す。増えすぎたら末尾のページを捨てる"""
+        if view["first_index"] == 0 or not view["pages"]:
+            return False
+        first_row = view["pages"][0][0][0]
+        with db_lock:
+            rows = fetch_page_before(conn, view["keyword"], first_row, PAGE_SIZE)
+        if not rows:
+            return False
+        view["pages"].appendleft(make_page(rows))
+        view["first_index"] = max(0, view["first_index"] - len(rows))
+        if len(view["pages"]) > WINDOW_PAGES:
+            view["pages"].pop()
+            view["at_end"] = False
+        refresh_table()
+        return True
+
+    def on_table_scroll(e):
+        # 読み込み中に次のスクロールイベントが来ても二重に読まない
+        if not view_lock.acquire(blocking=False):
+            return
+        try:
+            changed = False
+            if e.pixels >= e.max_scroll_extent - 100:
+                changed = load_next_page()
+            elif e.pixels <= e.min_scroll_extent + 10:
+                changed = load_prev_page()
+            if changed:
+                page.update()
+        finally:
+            view_lock.release()
+
+    # -----------------------------------------
+    # 5. イベント処理（検索ボタン・入力中の検索）
+    # -----------------------------------------
+    # 実行中の入力中検索（新しい入力が来たらキャンセルする）
+    search_task = [None]
+
+    def cancel_search_task():
+        if search_task[0] and not search_task[0].done():
+            search_task[0].cancel()
+
+    def search_click(e):
+        cancel_search_task()
+        with view_lock:
+            load_first_page(search_field.value)
         page.update()
 
+    async def search_as_you_type(keyword):
+        # 入力が続いている間は、ここで待っている間にキャンセルされる
+        await asyncio.sleep(DEBOUNCE_SECONDS)
+        total, rows = await asyncio.to_thread(search_cache.search, keyword)
+        if keyword != search_field.value:
+            return  # 検索中にさらに入力されたので、この結果は捨てる
+        with view_lock:
+            show_first_page(keyword, total, rows)
+        page.update()
+
+    def on_search_change(e):
+        cancel_search_task()
+        search_task[0] = page.run_task(search_as_you_type, e.control.value)
+
     search_field = ft.TextField(
         label="駅名や物件名で検索", 
         width=400, 
         prefix_icon=ft.Icons.SEARCH,
-        on_submit=search_click
+        on_submit=search_click,
+        on_change=on_search_change,
     )
     search_button = ft.ElevatedButton(text="検索", on_click=search_click)
 
+    # -----------------------------------------
+    # 6. 分析タブ（集計表 price_stats だけを読んでグラフにする）
+    # -----------------------------------------
+    stats_kind = ft.Dropdown(
+        label="集計の単位",
+        width=200,
+        value="station",
+        options=[ft.dropdown.Option("station", "駅別"), ft.dropdown.Option("floor_plan", "間取り別")],
+    )
+    stats_text = ft.Text("", color=ft.Colors.GREY)
+    range_chart = ft.BarChart(
+        interactive=True,
+        min_y=0,
+        left_axis=ft.ChartAxis(labels_size=60, title=ft.Text("家賃（円）"), title_size=20),
+        horizontal_grid_lines=ft.ChartGridLines(color=ft.Colors.GREY_300, width=1, dash_pattern=[3, 3]),
+        height=320,
+    )
+    hist_chart = ft.BarChart(
+        interactive=True,
+        min_y=0,
+        left_axis=ft.ChartAxis(labels_size=40, title=ft.Text("件数"), title_size=20),
+        horizontal_grid_lines=ft.ChartGridLines(color=ft.Colors.GREY_300, width=1, dash_pattern=[3, 3]),
+        height=220,
+    )
+
+    def range_groups(stats):
+        # 棒の下から 10%〜25%、25%〜中央値、中央値〜75%、75%〜90% を塗り分ける
+        groups = []
+        for i, row in enumerate(stats):
+            value, n, p10, p25, median, p75, p90 = row[1:8]
+            groups.append(ft.BarChartGroup(x=i, bar_rods=[ft.BarChartRod(
+                from_y=p10, to_y=p90, width=18, border_radius=0,
+                tooltip=f"{value or '不明'}（{n:,} 件）\n中央値 {median:,.0f}円\n25%〜75%: {p25:,.0f}〜{p75:,.0f}円",
+                rod_stack_items=[
+                    ft.BarChartRodStackItem(p10, p25, ft.Colors.TEAL_100),
+                    ft.BarChartRodStackItem(p25, median, ft.Colors.TEAL_400),
+                    ft.BarChartRodStackItem(median, p75, ft.Colors.TEAL_700),
+                    ft.BarChartRodStackItem(p75, p90, ft.Colors.TEAL_100),
+                ],
+            )]))
+        return groups
+
+    def render_stats():
+        with db_lock:
+            stats = analytics.load_stats(conn, stats_kind.value, STATS_GROUPS)
+            overall = analytics.load_stats(conn, "all")
+        if not overall:
+            stats_text.value = "集計がありません（スクレイピング後、または python analytics.py で作られます）"
+            range_chart.bar_groups = []
+            hist_chart.bar_groups = []
+            return
+        n, p10, p25, median, p75, p90 = overall[0][2:8]
+        stats_text.value = (f"全 {n:,} 件　中央値 {median:,.0f}円　"
+                            f"25%〜75%: {p25:,.0f}〜{p75:,.0f}円　10%〜90%: {p10:,.0f}〜{p90:,.0f}円")
+
+        range_chart.bar_groups = range_groups(stats)
+        range_chart.max_y = max((row[7] for row in stats), default=0) * 1.05 or None
+        range_chart.bottom_axis = ft.ChartAxis(labels_size=40, labels=[
+            ft.ChartAxisLabel(value=i, label=ft.Text((row[1] or "不明")[:6], size=10))
+            for i, row in enumerate(stats)
+        ])
+
+        hist = overall[0][12]
+        hist_chart.bar_groups = [
+            ft.BarChartGroup(x=i, bar_rods=[ft.BarChartRod(
+                from_y=0, to_y=count, width=10, border_radius=0, color=ft.Colors.BLUE_300,
+                tooltip=f"{i}万円台：{count:,} 件" if i * analytics.HIST_STEP < analytics.HIST_MAX
+                else f"{i}万円以上：{count:,} 件",
+            )])
+            for i, count in enumerate(hist)
+        ]
+        hist_chart.max_y = max(hist) * 1.1 or None
+        hist_chart.bottom_axis = ft.ChartAxis(labels_size=30, labels=[
+            ft.ChartAxisLabel(value=i, label=ft.Text(f"{i}万", size=10))
+            for i in range(0, len(hist), 5)
+        ])
+
+    def on_stats_kind_change(e):
+        render_stats()
+        page.update()
+
+    stats_kind.on_change = on_stats_kind_change
+
+    async def refresh_stats():
+        # 前回から変わったグループがあれば集計し直す（変化がなければ何も読まない）
+        # 集計は専用の接続で行い、db_lock を持たない（集計中も検索やスクロールを止めない）
+        def work():
+            stats_conn = sqlite3.connect(DB_PATH)
+            try:
+                return analytics.refresh(stats_conn)
+            finally:
+                stats_conn.close()
+        try:
+            groups = await asyncio.to_thread(work)
+        except sqlite3.Error:
+            return
+        if groups:
+            render_stats()
+            page.update()
+
     # 初期処理
     try:
-        initial_data = get_data_from_db()
-        data_table.rows = create_table_rows(initial_data)
-        status_text.value = f"全データ表示中（最新{len(initial_data)}件）"
+        load_first_page("")
+        if view["total"]:
+            status_text.value = f"全データ {view['total']:,} 件（新しく載った順・スクロールで続きを表示）"
+        render_stats()
     except sqlite3.OperationalError:
         status_text.value = "エラー：データベースが見つからないか空です。"
         status_text.color = ft.Colors.RED
 
+    list_tab = ft.Column([
+        ft.Row([search_field, search_button], alignment=ft.MainAxisAlignment.CENTER),
+        status_text,
+        ft.Container(
+            content=ft.Column(
+                [data_table], scroll=ft.ScrollMode.AUTO,
+                on_scroll=on_table_scroll, on_scroll_interval=100,
+            ),
+            height=500,
+            border=ft.border.all(1, ft.Colors.GREY_50),
+            border_radius=10,
+            padding=10
+        )
+    ])
+    stats_tab = ft.Column([
+        ft.Row([stats_kind, stats_text]),
+        ft.Text("家賃の分布（濃い部分が 25%〜75%、境目が中央値、両端が 10% と 90%）", size=14, weight="bold"),
+        range_chart,
+        ft.Text("家賃のヒストグラム（全物件）", size=14, weight="bold"),
+        hist_chart,
+    ], scroll=ft.ScrollMode.AUTO)
+
     page.add(
         ft.Column([
             title_text,
             ft.Divider(),
-            ft.Row([search_field, search_button], alignment=ft.MainAxisAlignment.CENTER),
-            status_text,
-            ft.Container(
-                content=ft.Column([data_table], scroll=ft.ScrollMode.AUTO),
-                height=500,
-                border=ft.border.all(1, ft.Colors.GREY_50),
-                border_radius=10,
-                padding=10
-            )
-        ])
+            ft.Tabs(
+                selected_index=0,
+                tabs=[
+                    ft.Tab(text="物件一覧", content=ft.Container(list_tab, padding=10)),
+                    ft.Tab(text="家賃の分析", content=ft.Container(stats_tab, padding=10)),
+                ],
+                expand=True,
+            ),
+        ], expand=True)
     )
+    page.run_task(refresh_stats)
 
 if __name__ == "__main__":
     ft.app(target=main)
\ No newline at end of file